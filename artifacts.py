@@ -0,0 +1,192 @@
+import os
+import re
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Tool results longer than this are stored and replaced by a handle with a preview
+ARTIFACT_INLINE_CHARS = int(os.getenv("ARTIFACT_INLINE_CHARS", 1500))
+ARTIFACT_PREVIEW_CHARS = int(os.getenv("ARTIFACT_PREVIEW_CHARS", 300))
+ARTIFACT_STORE_MB = float(os.getenv("ARTIFACT_STORE_MB", 64))
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(_HERE, ".artifacts"))
+
+HANDLE_RE = re.compile(r"^artifact:[0-9a-f]{12}$")
+_HANDLE_IN_TEXT_RE = re.compile(r"artifact:[0-9a-f]{12}")
+CHUNK_CHARS = 64 * 1024
+
+
+def file_id(path: str) -> str:
+    """The id part of a file artifact's handle: the start of the SHA-256 of its bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def is_handle(value) -> bool:
+    """True when a value is an artifact handle such as 'artifact:3f2a9c01d4e5'."""
+    return isinstance(value, str) and HANDLE_RE.match(value.strip()) is not None
+
+
+def find_handles(text: str) -> list:
+    """The artifact handles mentioned in a text, in order of first appearance."""
+    return list(dict.fromkeys(_HANDLE_IN_TEXT_RE.findall(text))) if isinstance(text, str) else []
+
+
+class ArtifactStore:
+    """Keeps large tool outputs in the process so only a handle goes into the prompt.
+
+    An artifact is either text held in memory or a file on disk (such as the
+    CSV tables written by vectorize.py). Handles are derived from the content,
+    so the same output always gets the same handle, and storing it twice keeps
+    one copy. In-memory text is evicted least recently used first once the
+    store exceeds `max_bytes`; file artifacts only hold their path. Files in
+    `directory` are named after their handle, so a handle to a file written by
+    another process (a tool worker, or an earlier run) still resolves.
+
+    Args:
+        max_bytes: Memory budget for text artifacts.
+        inline_chars: Results up to this length are left inline.
+        preview_chars: Length of the preview shown next to a handle.
+        directory: Where file artifacts are looked up by handle.
+    """
+
+    def __init__(self, max_bytes: int = int(ARTIFACT_STORE_MB * 1024 * 1024),
+                 inline_chars: int = ARTIFACT_INLINE_CHARS, preview_chars: int = ARTIFACT_PREVIEW_CHARS,
+                 directory: str = ARTIFACT_DIR):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.inline_chars = inline_chars
+        self.preview_chars = preview_chars
+        # handle -> {"text" or "path", "chars", "source"}
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._stats = {"stored": 0, "chars_out_of_prompt": 0, "resolved": 0}
+        self._lock = threading.Lock()
+
+    def put(self, text: str, source: str = "") -> str:
+        """Store text and return its handle."""
+        handle = "artifact:" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        with self._lock:
+            if handle in self._entries:
+                self._entries.move_to_end(handle)
+                return handle
+            self._entries[handle] = {"text": text, "chars": len(text), "source": source}
+            self._bytes += len(text)
+            self._stats["stored"] += 1
+            self._evict()
+        return handle
+
+    def put_file(self, path: str, source: str = "") -> str:
+        """Register a file as an artifact and return its handle."""
+        handle = "artifact:" + file_id(path)
+        with self._lock:
+            if handle not in self._entries:
+                self._stats["stored"] += 1
+            self._entries[handle] = {"path": os.path.abspath(path), "chars": os.path.getsize(path),
+                                     "source": source}
+            self._entries.move_to_end(handle)
+        return handle
+
+    def text(self, handle: str):
+        """The text behind a handle if it is held in memory; None for files and unknown handles."""
+        with self._lock:
+            entry = self._entries.get(handle.strip())
+            return entry.get("text") if entry else None
+
+    def source(self, handle: str) -> str:
+        """The tool a handle's artifact came from ("" when unknown)."""
+        with self._lock:
+            entry = self._entries.get(handle.strip())
+            return entry["source"] if entry else ""
+
+    def _evict(self):
+        # Called with the lock held; the newest entry always stays
+        for handle in list(self._entries):
+            if self._bytes <= self.max_bytes or len(self._entries) == 1:
+                break
+            entry = self._entries[handle]
+            if "text" in entry:
+                del self._entries[handle]
+                self._bytes -= entry["chars"]
+
+    def _entry(self, handle: str) -> dict:
+        handle = handle.strip()
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                paths = glob.glob(os.path.join(glob.escape(self.directory), f"*-{handle.split(':')[1]}.*"))
+                if not paths:
+                    raise KeyError(f"Unknown or expired artifact {handle}")
+                entry = self._entries[handle] = {"path": paths[0], "chars": os.path.getsize(paths[0]), "source": ""}
+            self._entries.move_to_end(handle)
+            self._stats["resolved"] += 1
+            return entry
+
+    def chunks(self, value: str, size: int = CHUNK_CHARS):
+        """Yield the text of a handle piece by piece; any other string is yielded as is."""
+        if not is_handle(value):
+            yield value
+            return
+        entry = self._entry(value)
+        if "text" in entry:
+            text = entry["text"]
+            for i in range(0, len(text), size):
+                yield text[i:i + size]
+            return
+        with open(entry["path"], encoding="utf-8") as f:
+            for block in iter(lambda: f.read(size), ""):
+                yield block
+
+    def resolve(self, value: str) -> str:
+        """Return the full text behind a handle; any other string is returned unchanged."""
+        return "".join(self.chunks(value)) if is_handle(value) else value
+
+    def shrink(self, result, source: str = ""):
+        """Replace a long tool result by its handle, length and a preview.
+
+        Short results are returned unchanged. A result that is itself a handle
+        is described rather than stored again.
+        """
+        text = result if isinstance(result, str) else str(result)
+        if is_handle(text):
+            handle = text.strip()
+            entry = self._entry(handle)
+            return f"{handle} ({entry['chars']} chars from {entry['source'] or 'a tool'})"
+        if len(text) <= self.inline_chars:
+            return result
+        handle = self.put(text, source)
+        preview = text[:self.preview_chars].rstrip()
+        shrunk = (f"{handle} ({len(text)} chars stored as an artifact; pass the handle to tools that accept "
+                  f"one instead of copying the text). Preview: {preview} …")
+        with self._lock:
+            self._stats["chars_out_of_prompt"] += len(text) - len(shrunk)
+        return shrunk
+
+    def stats(self) -> dict:
+        """Artifacts stored, handles resolved and characters kept out of the prompt."""
+        with self._lock:
+            return {**self._stats, "bytes_in_memory": self._bytes}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the shared artifact store.
+
+    Environment variables:
+        ARTIFACT_INLINE_CHARS: Longest tool result left inline (default: 1500)
+        ARTIFACT_PREVIEW_CHARS: Preview length shown next to a handle (default: 300)
+        ARTIFACT_STORE_MB: Memory budget for stored text (default: 64)
+        ARTIFACT_DIR: Directory for file artifacts such as result tables (default: .artifacts)
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
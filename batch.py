@@ -0,0 +1,122 @@
+import argparse
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import main
+from main import run_agent
+from rich.console import Console
+from rich.panel import Panel
+
+# Batch progress goes to its own console so it still shows when the agent console is quiet
+console = Console()
+
+
+def load_prompts(path: str) -> list:
+    """Load prompts from a JSONL file.
+
+    Each line is a JSON object. The prompt is taken from "prompt" if present,
+    otherwise from "title" and "body" (the shape of requests.jsonl). The id
+    comes from "id" or "request_id", falling back to the line number.
+
+    Returns:
+        list: (prompt_id, prompt) tuples in file order.
+    """
+    prompts = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            prompt = record.get("prompt")
+            if not prompt:
+                prompt = "\n\n".join(part for part in (record.get("title"), record.get("body")) if part)
+            prompt_id = record.get("id", record.get("request_id", line_number))
+            prompts.append((prompt_id, prompt))
+    return prompts
+
+
+def _run_one(prompt_id, prompt: str, stream: bool, parallel_tools: bool) -> dict:
+    start = time.perf_counter()
+    # Known up front, so a run that fails can still be resumed with main.py --resume
+    record = {"id": prompt_id, "prompt": prompt, "run_id": uuid.uuid4().hex[:12]}
+    try:
+        result = run_agent(prompt, stream=stream, show_progress=False, parallel_tools=parallel_tools,
+                           run_id=record["run_id"])
+        record.update(status=result["status"], loops=result["loops"],
+                      messages=result["messages"], convergence=result["convergence"])
+        if "partial" in result:
+            record["partial"] = result["partial"]
+    except Exception as e:
+        record.update(status="error", error=str(e))
+    record["elapsed"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(prompts: list, output_path: str, concurrency: int = 4, stream: bool = False,
+              parallel_tools: bool = False) -> dict:
+    """Run many agent loops concurrently and write each result as soon as it finishes.
+
+    Args:
+        prompts: (prompt_id, prompt) tuples, as returned by load_prompts.
+        output_path: JSONL file to write one result per line to.
+        concurrency: Maximum number of agent loops running at once.
+        stream: Use streaming mode for every run.
+        parallel_tools: Run every tool call in a response concurrently.
+
+    Returns:
+        dict: Count of results per status.
+    """
+    counts = {}
+    with open(output_path, "w") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_run_one, prompt_id, prompt, stream, parallel_tools) for prompt_id, prompt in prompts]
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+            console.print(f"[bold]{record['id']}[/bold]: {record['status']} in {record['elapsed']}s")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many AI Tool Assistant prompts concurrently")
+    parser.add_argument("input", help="JSONL file of prompts")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL file to write results to")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Maximum agent loops running at once")
+    parser.add_argument("--stream", action="store_true", default=main.MODEL_STREAM, help="Use streaming mode")
+    parser.add_argument("--parallel-tools", action="store_true", default=main.PARALLEL_TOOL_CALLS,
+                        help="Run every tool call in a response concurrently")
+    parser.add_argument("--response-cache", choices=main.CACHE_MODES, default=main.RESPONSE_CACHE,
+                        help="Cache model responses so a re-run replays finished turns (readthrough)")
+    parser.add_argument("--trace", default=main.TRACE_FILE, help="Append timing spans to this JSONL file")
+    parser.add_argument("--metrics", default=main.TRACE_METRICS_FILE,
+                        help="Write a Prometheus-style metrics snapshot to this file at the end")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show each run's loop output (interleaved)")
+    args = parser.parse_args()
+
+    prompts = load_prompts(args.input)
+    console.print(Panel(f"🤖 Running {len(prompts)} prompts, {args.concurrency} at a time", style="bold blue"))
+
+    # Per-run loop output from concurrent sessions would interleave; only show the summary lines
+    main.console.quiet = not args.verbose
+    # Load the deferred imports once here rather than inside the first few concurrent runs
+    main.warm_up()
+    cache = main.get_response_cache(args.response_cache)
+    main.get_tracer(args.trace)
+    start = time.perf_counter()
+    counts = run_batch(prompts, args.output, args.concurrency, args.stream, args.parallel_tools)
+
+    if args.metrics:
+        main.tracer.write_metrics(args.metrics)
+    console.print(f"[dim]{main.format_time_breakdown(main.tracer.snapshot())}[/dim]")
+
+    summary = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+    turns_saved = main.tracer.counter("agent_turns_saved_total")
+    if turns_saved:
+        summary += f", {turns_saved:g} turns saved by stopping stalled runs"
+    if cache is not None:
+        summary += f", {cache.stats['hits']} cached turns replayed"
+    console.print(Panel(f"✅ {len(prompts)} prompts in {time.perf_counter() - start:.1f}s ({summary}). "
+                        f"Results written to {args.output}", style="green"))
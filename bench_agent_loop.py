@@ -0,0 +1,194 @@
+import argparse
+import functools
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from stub_server import ScriptedStubServer
+from search_cache import get_search_cache
+import checkpoint
+
+# The default script: a search, some math and an encoding, then all_work_is_finished
+SCRIPT = [
+    [("tavily_context_search", {"query": "box turtle habitat", "max_results": 3})],
+    [("my_super_cool_function", {"x_int": 3, "y_int": 4})],
+    [("encode_a_secret", {"secret_to_encode": "turtle"})],
+]
+
+
+class _RecordingServer(ScriptedStubServer):
+    """Scripted stub that records when each session's requests arrive."""
+
+    def __init__(self, script: list, **kwargs):
+        super().__init__(script, **kwargs)
+        self.arrivals = {}
+        self._lock = threading.Lock()
+
+    def respond(self, payload: dict) -> dict:
+        now = time.perf_counter()
+        messages = payload.get("messages", [])
+        session = messages[1]["content"] if len(messages) > 1 else ""
+        with self._lock:
+            self.arrivals.setdefault(session, []).append(now)
+        return super().respond(payload)
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _instrument(main):
+    """Time every tool dispatch and the tool execution inside it.
+
+    Tools run on the executor's threads and processes, so their time is taken
+    around `tool_executor.run`, which the dispatching thread waits in.
+
+    Returns:
+        list: Dispatch overheads in seconds (process_tool_call time minus the time spent in the executor).
+    """
+    overheads = []
+    local = threading.local()
+    executor_run = main.tool_executor.run
+
+    @functools.wraps(executor_run)
+    def timed_run(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return executor_run(*args, **kwargs)
+        finally:
+            # Batched calls run outside process_tool_call, where nothing has been counted yet
+            local.tool_time = getattr(local, "tool_time", 0.0) + time.perf_counter() - start
+
+    main.tool_executor.run = timed_run
+
+    original = main.process_tool_call
+
+    def timed_dispatch(tool_call):
+        local.tool_time = 0.0
+        start = time.perf_counter()
+        try:
+            return original(tool_call)
+        finally:
+            overheads.append(time.perf_counter() - start - local.tool_time)
+
+    main.process_tool_call = timed_dispatch
+    return overheads
+
+
+def run_scenario(sessions: int, latency: float, jitter: float, search_latency: float,
+                 stream: bool, parallel_tools: bool) -> dict:
+    """Run `sessions` agent loops against the scripted stub in this process and collect metrics.
+
+    One session goes through main.main() exactly as the CLI does; several run
+    concurrently through run_agent, the way batch.py drives them.
+    """
+    with _RecordingServer(SCRIPT, latency=latency, jitter=jitter, search_latency=search_latency) as server:
+        # Everything points at the stub: no request leaves the machine
+        os.environ["TAVILY_API_BASE_URL"] = server.base_url
+        os.environ["TAVILY_API_KEY"] = os.environ.get("TAVILY_API_KEY") or "tvly-stub"
+        os.environ["MODEL_BASE_URL"] = server.url
+        import main
+        main.MODEL_BASE_URL = server.url
+        main.console.quiet = True
+        main.get_response_cache("off")
+        # Repeats within the run may hit the tool cache, but nothing is carried over from earlier runs
+        main.tool_cache.directory = ""
+        search_cache = get_search_cache()
+        search_cache.directory = ""
+        search_cache.clear()
+        # Runs are checkpointed as usual, into a directory that goes away afterwards
+        checkpoint.CHECKPOINT_DIR = tempfile.mkdtemp(prefix="bench-runs-")
+        main.warm_up()
+        overheads = _instrument(main)
+
+        ends = {}
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            if sessions == 1:
+                prompt = "session 0"
+                sys.argv = ["main.py", "-p", prompt] + (["--stream"] if stream else []) + \
+                    (["--parallel-tools"] if parallel_tools else [])
+                main.main()
+                ends[prompt] = time.perf_counter()
+            else:
+                def run(i):
+                    main.run_agent(f"session {i}", stream=stream, show_progress=False, parallel_tools=parallel_tools)
+                    ends[f"session {i}"] = time.perf_counter()
+
+                with ThreadPoolExecutor(max_workers=sessions) as pool:
+                    list(pool.map(run, range(sessions)))
+        elapsed = time.perf_counter() - start
+        shutil.rmtree(checkpoint.CHECKPOINT_DIR, ignore_errors=True)
+
+    # A turn runs from one model request to the next; the last one ends when its session returns
+    turn_latencies = []
+    for session, arrivals in server.arrivals.items():
+        marks = arrivals + [ends[session]]
+        turn_latencies.extend(b - a for a, b in zip(marks, marks[1:]))
+
+    return {
+        "sessions": sessions,
+        "turns": len(turn_latencies),
+        "elapsed_s": elapsed,
+        "turns_per_s": len(turn_latencies) / elapsed,
+        "p50_ms": percentile(turn_latencies, 50) * 1000,
+        "p95_ms": percentile(turn_latencies, 95) * 1000,
+        "p99_ms": percentile(turn_latencies, 99) * 1000,
+        "dispatch_us": statistics.mean(overheads) * 1e6 if overheads else 0.0,
+        "dispatch_p95_us": percentile(overheads, 95) * 1e6,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run(session_counts: list, latency_ms: float, jitter_ms: float, search_ms: float, stream: bool,
+        parallel_tools: bool) -> list:
+    """Run each scenario in a fresh interpreter, so peak RSS is per scenario, and print a table."""
+    results = []
+    for sessions in session_counts:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", "--sessions", str(sessions),
+                   "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms), "--search-ms", str(search_ms)]
+        command += (["--stream"] if stream else []) + (["--parallel-tools"] if parallel_tools else [])
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    mode = ("streaming" if stream else "non-streaming") + (", parallel tools" if parallel_tools else "")
+    print(f"{len(SCRIPT) + 1} turns per session, {mode}, model latency {latency_ms:.0f}±{jitter_ms:.0f} ms, "
+          f"search latency {search_ms:.0f} ms")
+    print(f"{'sessions':>8}{'turns':>7}{'turns/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'dispatch us':>13}{'p95 us':>9}{'peak RSS MB':>13}")
+    for r in results:
+        print(f"{r['sessions']:>8}{r['turns']:>7}{r['turns_per_s']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{r['dispatch_us']:>13.0f}{r['dispatch_p95_us']:>9.0f}{r['peak_rss_mb']:>13.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the agent loop end to end against local stub servers")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32], help="Concurrent sessions per scenario")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated model latency per turn")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Uniform jitter on the model latency")
+    parser.add_argument("--search-ms", type=float, default=10.0, help="Simulated search latency")
+    parser.add_argument("--stream", action="store_true", help="Use streaming mode")
+    parser.add_argument("--parallel-tools", action="store_true", help="Run a turn's tool calls concurrently")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_scenario(args.sessions[0], args.latency_ms / 1000, args.jitter_ms / 1000, args.search_ms / 1000,
+                              args.stream, args.parallel_tools)
+        print(json.dumps(result))
+    else:
+        run(args.sessions, args.latency_ms, args.jitter_ms, args.search_ms, args.stream, args.parallel_tools)
@@ -0,0 +1,103 @@
+"""Regenerates the saved HTML pages used by bench_extract.py.
+
+The pages are deterministic stand-ins for the kinds of pages search_and_scrape
+pulls in: a long encyclopedia article, a script-heavy news page, a
+documentation page with code blocks and a forum thread with many small posts.
+Run from the repo root: python bench_corpus/make_corpus.py
+"""
+import os
+import random
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORDS = ("turtle tortoise shell desert river basin New Mexico Rio Grande box ornate painted "
+         "slider snapping reptile habitat nesting eggs hatchling species population survey "
+         "conservation wildlife burrow spring summer drought monsoon temperature carapace "
+         "plastron diet insects plants water pond grassland county state federal protected "
+         "the a of and in to with for on by from is are was were that this which as at").split()
+
+
+def sentence(rng, n=None):
+    words = [rng.choice(WORDS) for _ in range(n or rng.randint(8, 24))]
+    return " ".join(words).capitalize() + "."
+
+
+def paragraph(rng, sentences=5):
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def head(rng, title, css_rules=400, scripts=3, script_size=20000):
+    css = "\n".join(f".c{i} {{ margin: {i % 13}px; color: #{rng.randrange(0xffffff):06x}; }}" for i in range(css_rules))
+    js = "\n".join(f"<script>window.__d{i} = {{\"k\": \"{'x' * script_size}\"}};</script>" for i in range(scripts))
+    return (f"<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\"><title>{title}</title>"
+            f"<style>{css}</style>{js}</head>\n")
+
+
+def nav(rng, links=200):
+    items = "".join(f"<li><a href=\"/wiki/{rng.choice(WORDS)}_{i}\">{rng.choice(WORDS).title()}</a></li>"
+                    for i in range(links))
+    return f"<nav class=\"sidebar\"><ul>{items}</ul></nav>\n"
+
+
+def article_page(rng):
+    body = [head(rng, "Turtles of New Mexico"), "<body>", "<header><div class=\"logo\">Wiki</div></header>", nav(rng)]
+    body.append("<main><article><h1>Turtles of New Mexico</h1>")
+    for section in range(12):
+        body.append(f"<h2 id=\"s{section}\">{sentence(rng, 3)}</h2>")
+        for _ in range(6):
+            body.append(f"<p>{paragraph(rng)} <a href=\"#cite{rng.randint(1, 99)}\">[{rng.randint(1, 99)}]</a></p>")
+    rows = "".join(f"<tr><td>{rng.choice(WORDS)}</td><td>{rng.randint(1, 9999)}</td><td>{sentence(rng, 4)}</td></tr>"
+                   for _ in range(120))
+    body.append(f"<table class=\"wikitable\"><tr><th>Species</th><th>Count</th><th>Notes</th></tr>{rows}</table>")
+    refs = "".join(f"<li id=\"cite{i}\">{sentence(rng, 10)} &mdash; <i>Journal</i> {1950 + i}.</li>" for i in range(100))
+    body.append(f"<h2>References</h2><ol>{refs}</ol></article></main>")
+    body.append(f"<footer>{paragraph(rng, 3)}</footer></body></html>")
+    return "\n".join(body)
+
+
+def news_page(rng):
+    body = [head(rng, "Drought threatens desert turtles", css_rules=1500, scripts=15, script_size=25000), "<body>",
+            "<header><nav><a href=\"/\">Home</a><a href=\"/news\">News</a></nav></header>"]
+    body.append("<div class=\"ad\"><iframe src=\"/ad\"></iframe></div><article><h1>Drought threatens desert turtles</h1>")
+    for i in range(20):
+        body.append(f"<p>{paragraph(rng, 4)}</p>")
+        if i % 4 == 0:
+            body.append(f"<aside class=\"related\"><h3>Related</h3><p>{sentence(rng)}</p></aside>"
+                        f"<script>track({i}, \"{'y' * 2000}\");</script>")
+    body.append("</article><section class=\"comments\"><h2>Comments</h2>")
+    for i in range(150):
+        body.append(f"<div class=\"comment\"><span class=\"user\">user{i}</span><p>{sentence(rng)}</p>"
+                    f"<form><button>Reply</button></form></div>")
+    body.append(f"</section><footer>{paragraph(rng, 2)}</footer></body></html>")
+    return "\n".join(body)
+
+
+def docs_page(rng):
+    body = [head(rng, "Survey API reference", scripts=2), "<body>", nav(rng, links=400), "<main>"]
+    for section in range(40):
+        body.append(f"<h2>survey.{rng.choice(WORDS)}_{section}()</h2><p>{paragraph(rng, 3)}</p>")
+        code = "\n".join(f"    result = survey.count(&quot;{rng.choice(WORDS)}&quot;, year={2000 + i}) &lt; {i}"
+                         for i in range(25))
+        body.append(f"<pre><code>def example():\n{code}\n</code></pre>")
+        body.append("<dl>" + "".join(f"<dt>{rng.choice(WORDS)}</dt><dd>{sentence(rng)}</dd>" for _ in range(6)) + "</dl>")
+    body.append("</main><footer>Docs footer</footer></body></html>")
+    return "\n".join(body)
+
+
+def forum_page(rng):
+    body = [head(rng, "Forum: turtle sightings", scripts=4), "<body>", "<header>Forum</header>"]
+    for i in range(600):
+        body.append(f"<div class=\"post\" id=\"p{i}\"><div class=\"meta\"><span>user{i % 37}</span>"
+                    f"<span class=\"date\">2024-0{i % 9 + 1}-1{i % 10}</span></div>"
+                    f"<div class=\"body\"><div class=\"text\">{sentence(rng)} {sentence(rng)}</div></div>"
+                    f"<!-- post {i} --><div class=\"sig\"><em>{rng.choice(WORDS)}</em></div></div>")
+    body.append("<footer>Forum footer</footer></body></html>")
+    return "\n".join(body)
+
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    for name, build in [("article", article_page), ("news", news_page), ("docs", docs_page), ("forum", forum_page)]:
+        path = os.path.join(HERE, f"{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(build(rng))
+        print(f"{path}: {os.path.getsize(path):,} bytes")
@@ -0,0 +1,62 @@
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+from extract import EXTRACTORS, SCRAPE_MAX_CHARS
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_corpus")
+
+
+def load_corpus(directory: str = CORPUS_DIR) -> dict:
+    """Load every saved .html page in the corpus directory as bytes."""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, "rb") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def bench_engine(extract, pages: dict, max_chars: int, repeat: int) -> dict:
+    """Measure throughput (MB/s over the raw HTML) and peak traced memory for one engine."""
+    total_bytes = sum(len(html) for html in pages.values()) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages.values():
+            extract(html, max_chars=max_chars)
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured in a separate pass; tracing slows the timed loop down
+    peak = 0
+    for html in pages.values():
+        tracemalloc.start()
+        extract(html, max_chars=max_chars)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    chars = sum(len(extract(html, max_chars=max_chars)) for html in pages.values())
+    return {"mb_per_s": total_bytes / elapsed / 1e6, "peak_mb": peak / 1e6, "chars": chars}
+
+
+def run(engines: list, max_chars: int, repeat: int):
+    pages = load_corpus()
+    size = sum(len(html) for html in pages.values())
+    budget = f"{max_chars:,} chars" if max_chars else "unlimited"
+    print(f"Corpus: {len(pages)} pages, {size / 1e6:.2f} MB; budget {budget} per page; {repeat} repeats")
+    print(f"{'engine':<8}{'MB/s':>10}{'peak MB':>10}{'text chars':>12}")
+    for name in engines:
+        try:
+            result = bench_engine(EXTRACTORS[name], pages, max_chars, repeat)
+        except ImportError as e:
+            print(f"{name:<8}  skipped ({e})")
+            continue
+        print(f"{name:<8}{result['mb_per_s']:>10.1f}{result['peak_mb']:>10.2f}{result['chars']:>12,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML-to-text extraction engines on the saved corpus")
+    parser.add_argument("--engines", nargs="+", default=list(EXTRACTORS), choices=list(EXTRACTORS))
+    parser.add_argument("--max-chars", type=int, default=SCRAPE_MAX_CHARS, help="Per-page text budget (0 for none)")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus for timing")
+    args = parser.parse_args()
+    run(args.engines, args.max_chars or None, args.repeat)
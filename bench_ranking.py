@@ -0,0 +1,85 @@
+import argparse
+import math
+import re
+import time
+from collections import Counter
+from bench_extract import load_corpus
+from extract import extract_text
+from ranking import PassageRanker, split_chunks, RANK_CHUNK_CHARS, RANK_TOP_K, RANK_CHAR_BUDGET
+from search_cache import query_words
+
+QUERIES = ["box turtle nesting habitat", "snapping turtles in the Rio Grande basin", "drought monsoon temperature survey"]
+
+
+def build_corpus(megabytes: float) -> list:
+    """Repeat the text of the saved pages until the corpus holds about `megabytes` of text."""
+    texts = [extract_text(html, max_chars=None) for html in load_corpus().values()]
+    pages, size, i = [], 0, 0
+    while size < megabytes * 1e6:
+        text = texts[i % len(texts)]
+        pages.append((f"page{i}", text))
+        size += len(text)
+        i += 1
+    return pages
+
+
+def bench_ranker(query: str, pages: list, chunk_chars: int, top_k: int, char_budget: int) -> dict:
+    """Time streaming pages into a PassageRanker, then scoring and selecting the top passages."""
+    start = time.perf_counter()
+    ranker = PassageRanker(query, chunk_chars)
+    for url, text in pages:
+        ranker.add(text, url)
+    added = time.perf_counter()
+    passages = ranker.top(top_k, char_budget)
+    done = time.perf_counter()
+    return {"passages": len(ranker), "add_s": added - start, "top_s": done - added, "total_s": done - start,
+            "best": passages[0]["score"] if passages else 0.0}
+
+
+def bench_baseline(query: str, pages: list, chunk_chars: int) -> float:
+    """Time a plain-Python BM25 over the same passages: tokenize each one and score it term by term."""
+    start = time.perf_counter()
+    terms = set(query_words(query))
+    word_re = re.compile(r"[a-z0-9]+")
+    counts, lengths = [], []
+    for _, text in pages:
+        for chunk in split_chunks(text, chunk_chars):
+            words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+                     for w in word_re.findall(chunk.lower())]
+            counts.append(Counter(w for w in words if w in terms))
+            lengths.append(len(words))
+    n, average = len(counts), sum(lengths) / max(1, len(lengths))
+    df = Counter(term for c in counts for term in c)
+    idf = {term: math.log1p((n - df[term] + 0.5) / (df[term] + 0.5)) for term in terms}
+    scores = [sum(idf[t] * c[t] * 2.2 / (c[t] + 1.2 * (0.25 + 0.75 * length / average)) for t in c)
+              for c, length in zip(counts, lengths)]
+    sorted(range(n), key=scores.__getitem__, reverse=True)
+    return time.perf_counter() - start
+
+
+def run(megabytes: float, chunk_chars: int, top_k: int, char_budget: int, baseline: bool):
+    pages = build_corpus(megabytes)
+    size = sum(len(text) for _, text in pages)
+    print(f"Corpus: {len(pages)} pages, {size / 1e6:.1f} MB of text; {chunk_chars}-char passages, "
+          f"top {top_k} within {char_budget:,} chars")
+    header = f"{'query':<42}{'passages':>10}{'MB/s':>8}{'passages/s':>12}{'top ms':>8}"
+    print(header + (f"{'python MB/s':>13}{'speedup':>9}" if baseline else ""))
+    for query in QUERIES:
+        result = bench_ranker(query, pages, chunk_chars, top_k, char_budget)
+        line = (f"{query[:40]:<42}{result['passages']:>10,}{size / result['total_s'] / 1e6:>8.1f}"
+                f"{result['passages'] / result['total_s']:>12,.0f}{result['top_s'] * 1000:>8.1f}")
+        if baseline:
+            elapsed = bench_baseline(query, pages, chunk_chars)
+            line += f"{size / elapsed / 1e6:>13.1f}{elapsed / result['total_s']:>8.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark passage ranking throughput over a large local corpus")
+    parser.add_argument("--mb", type=float, default=50, help="Corpus size in MB of extracted text")
+    parser.add_argument("--chunk-chars", type=int, default=RANK_CHUNK_CHARS)
+    parser.add_argument("--top-k", type=int, default=RANK_TOP_K)
+    parser.add_argument("--char-budget", type=int, default=RANK_CHAR_BUDGET)
+    parser.add_argument("--no-baseline", action="store_true", help="Skip the plain-Python BM25 comparison")
+    args = parser.parse_args()
+    run(args.mb, args.chunk_chars, args.top_k, args.char_budget, not args.no_baseline)
@@ -0,0 +1,86 @@
+import argparse
+import json
+import random
+import time
+import tracemalloc
+import message_log
+from message_log import MessageLog, encode_payload
+from help import generate_schema
+from mysearch2 import tavily_context_search, tavily_multi_search
+
+TOOLS = [generate_schema(fn) for fn in (tavily_context_search, tavily_multi_search)] * 3
+
+
+def synthetic_turn(rng: random.Random, turn: int) -> dict:
+    """A tool-result message of 1-3 KB, like a search context fed back to the model."""
+    words = ["turtle", "desert", "río", "shell", "habitat", "New Mexico", "🐢", "nesting", "survey"]
+    text = " ".join(rng.choice(words) for _ in range(rng.randint(150, 450)))
+    return {"role": "user", "content": f"✅ Called tavily_context_search (turn {turn}). Result: {text}"}
+
+
+def naive_body(payload: dict) -> bytes:
+    # What requests.post(json=payload) does on every turn
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def simulate(turns: int, encode, make_messages) -> dict:
+    """Grow a history one turn at a time, building the full request body after each turn."""
+    rng = random.Random(0)
+    messages = make_messages([{"role": "system", "content": "system"}, {"role": "user", "content": "task"}])
+    cpu = 0.0
+    body_bytes = 0
+    for turn in range(turns):
+        messages.append(synthetic_turn(rng, turn))
+        payload = {"model": "stub", "messages": messages, "tools": TOOLS, "tool_choice": "auto"}
+        start = time.process_time()
+        body = encode(payload)
+        cpu += time.process_time() - start
+        body_bytes += len(body)
+    return {"cpu_s": cpu, "body_mb": body_bytes / 1e6}
+
+
+def fresh_encoded_bytes(turns: int) -> int:
+    """Bytes MessageLog actually passes through json.dumps over the run (the rest is reused)."""
+    encoded = 0
+    original = message_log.encode_json
+
+    def counting(value):
+        nonlocal encoded
+        result = original(value)
+        encoded += len(result)
+        return result
+
+    message_log.encode_json = counting
+    try:
+        simulate(turns, encode_payload, MessageLog)
+    finally:
+        message_log.encode_json = original
+    return encoded
+
+
+def peak_memory(turns: int, encode, make_messages) -> float:
+    tracemalloc.start()
+    simulate(turns, encode, make_messages)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def run(turn_counts: list):
+    variants = [("json.dumps", naive_body, list), ("MessageLog", encode_payload, MessageLog)]
+    print(f"{'turns':>6}  {'encoder':<12}{'CPU ms':>10}{'JSON-encoded MB':>18}{'bodies MB':>12}{'peak MB':>10}")
+    for turns in turn_counts:
+        for name, encode, make_messages in variants:
+            result = simulate(turns, encode, make_messages)
+            # json.dumps re-encodes every body in full
+            encoded = fresh_encoded_bytes(turns) / 1e6 if make_messages is MessageLog else result["body_mb"]
+            peak = peak_memory(turns, encode, make_messages)
+            print(f"{turns:>6}  {name:<12}{result['cpu_s'] * 1000:>10.1f}{encoded:>18.2f}"
+                  f"{result['body_mb']:>12.2f}{peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-turn request body serialization")
+    parser.add_argument("--turns", type=int, nargs="+", default=[100, 1000], help="History lengths to simulate")
+    args = parser.parse_args()
+    run(args.turns)
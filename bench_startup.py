@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from stub_server import StubServer, make_completion
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUDGET_PATH = os.path.join(HERE, "startup_budget.json")
+
+FINISH = make_completion("", tool_calls=[{
+    "id": "call_0", "type": "function",
+    "function": {"name": "all_work_is_finished", "arguments": '{"is_finished": true}'},
+}])
+
+
+def parse_importtime(stderr: str, module: str = "main") -> tuple:
+    """Parse `python -X importtime` output.
+
+    Returns:
+        tuple: (cumulative microseconds for `module`, {direct dependency: cumulative microseconds})
+    """
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # One space after the bar, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0 and name == module:
+            return int(cumulative), children
+        if depth == 0:
+            # A top-level import before `module` (site, encodings); its children are not ours
+            children = {}
+        elif depth == 1:
+            children[name] = int(cumulative)
+    raise ValueError(f"{module} not found in -X importtime output")
+
+
+def parse_statement_time(stderr: str) -> int:
+    """Cumulative microseconds of everything a `-c` statement imported (the top-level imports after site)."""
+    total, after_site = 0, False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  "):
+            continue
+        if after_site:
+            total += int(cumulative)
+        after_site = after_site or name.strip() == "site"
+    return total
+
+
+def import_profile(module: str = "main", runs: int = 5, baseline: list = ()) -> tuple:
+    """Median import time of `module` in a fresh interpreter, with its slowest direct imports.
+
+    With `baseline` modules, each run is paired with a run importing just
+    those, and the median of the differences is what `module` adds on top of
+    them. The pairs run back to back, so a machine that is slower or busier
+    for a while slows both sides alike.
+
+    Returns:
+        tuple: (median ms, {direct import: median ms}, median ms added on top of the baseline or None)
+    """
+    totals, children, overheads = [], {}, []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=HERE, capture_output=True, text=True, check=True)
+        total, deps = parse_importtime(result.stderr, module)
+        totals.append(total)
+        for name, micros in deps.items():
+            children.setdefault(name, []).append(micros)
+        if baseline:
+            result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {', '.join(baseline)}"],
+                                    cwd=HERE, capture_output=True, text=True, check=True)
+            overheads.append(total - parse_statement_time(result.stderr))
+    return (statistics.median(totals) / 1000, {name: statistics.median(v) / 1000 for name, v in children.items()},
+            statistics.median(overheads) / 1000 if overheads else None)
+
+
+def loaded_modules(module: str, candidates: list) -> list:
+    """Which of `candidates` a fresh interpreter has loaded after importing `module`."""
+    code = f"import sys, {module}; print(' '.join(m for m in {candidates!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+class _FirstRequestServer(StubServer):
+    """Stub model that records when the first request arrives and ends the run at once."""
+
+    first_request = None
+
+    def respond(self, payload: dict) -> dict:
+        if self.first_request is None:
+            self.first_request = time.perf_counter()
+        return FINISH
+
+
+def first_request_time(runs: int = 3) -> float:
+    """Median wall time from launching `main.py -p ...` to its first model request, in milliseconds."""
+    times = []
+    for _ in range(runs):
+        with _FirstRequestServer() as server:
+            # The benchmark run is not worth a checkpoint
+            env = {**os.environ, "MODEL_BASE_URL": server.url, "CHECKPOINT": "0"}
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "main.py", "-p", "startup benchmark"], cwd=HERE, env=env,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60)
+            if server.first_request is None:
+                raise RuntimeError("main.py exited without calling the model")
+            times.append((server.first_request - start) * 1000)
+    return statistics.median(times)
+
+
+def load_budget(path: str = BUDGET_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def run(runs: int = 9, top: int = 10, budget_path: str = BUDGET_PATH) -> bool:
+    """Print the startup profile and compare it with the budget. Returns True when within budget.
+
+    The import budget is for what main adds on top of the third-party modules
+    it has to load (`baseline_modules`), not the absolute import time: that
+    mostly measures how fast this machine imports requests and rich, and
+    swings by a third from run to run.
+    """
+    budget = load_budget(budget_path)
+    import_ms, deps, overhead_ms = import_profile("main", runs, budget["baseline_modules"])
+    first_ms = first_request_time(max(3, runs // 2))
+    deferred = loaded_modules("main", budget["deferred_modules"])
+
+    print(f"import main: {import_ms:.1f} ms (median of {runs}), {overhead_ms:.1f} ms on top of "
+          f"{', '.join(budget['baseline_modules'])}")
+    print(f"{'direct import':<24}{'cumulative ms':>14}")
+    for name, ms in sorted(deps.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{name:<24}{ms:>14.1f}")
+    print(f"\nfirst model request: {first_ms:.1f} ms after launch")
+
+    failures = []
+    if overhead_ms > budget["import_overhead_ms"]:
+        failures.append(f"import main added {overhead_ms:.1f} ms to its baseline imports "
+                        f"(budget {budget['import_overhead_ms']} ms)")
+    if first_ms > budget["first_request_ms"]:
+        failures.append(f"first request after {first_ms:.1f} ms (budget {budget['first_request_ms']} ms)")
+    if deferred:
+        failures.append(f"import main loads deferred modules: {', '.join(deferred)}")
+
+    print()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"✅ Within budget (import +{budget['import_overhead_ms']} ms, "
+              f"first request {budget['first_request_ms']} ms)")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark main.py startup against the startup budget")
+    parser.add_argument("--runs", type=int, default=9, help="Interpreter launches per measurement")
+    parser.add_argument("--top", type=int, default=10, help="Number of direct imports to list")
+    parser.add_argument("--budget", default=BUDGET_PATH, help="JSON file with the startup budget")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero when the budget is exceeded")
+    args = parser.parse_args()
+    ok = run(args.runs, args.top, args.budget)
+    if args.check and not ok:
+        sys.exit(1)
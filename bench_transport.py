@@ -0,0 +1,55 @@
+import argparse
+import statistics
+import time
+import requests
+from stub_server import StubServer
+from transport import ModelTransport
+
+PAYLOAD = {
+    "model": "stub",
+    "messages": [{"role": "user", "content": "hello"}],
+    "tool_choice": "auto",
+}
+HEADERS = {"Content-Type": "application/json"}
+
+
+def time_turns(post, url: str, turns: int) -> list:
+    """Time `turns` sequential model requests and return per-turn latencies in seconds."""
+    latencies = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        response = post(url, headers=HEADERS, json=PAYLOAD)
+        response.json()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run(turns: int = 15, handshake_ms: float = 20.0, latency_ms: float = 0.0):
+    """Compare a bare requests.post per turn against the pooled transport."""
+    results = {}
+    with StubServer(latency=latency_ms / 1000, handshake_delay=handshake_ms / 1000) as server:
+        results["requests.post"] = (time_turns(requests.post, server.url, turns), server.connections)
+
+        before = server.connections
+        transport = ModelTransport(pool_size=1)
+        results["ModelTransport"] = (time_turns(transport.post, server.url, turns), server.connections - before)
+        transport.close()
+
+    print(f"{turns} turns, simulated handshake {handshake_ms:.1f} ms, server latency {latency_ms:.1f} ms")
+    print(f"{'client':<16}{'connections':>12}{'mean ms':>10}{'p50 ms':>10}{'total ms':>10}")
+    for name, (latencies, connections) in results.items():
+        print(f"{name:<16}{connections:>12}{statistics.mean(latencies) * 1000:>10.2f}"
+              f"{statistics.median(latencies) * 1000:>10.2f}{sum(latencies) * 1000:>10.1f}")
+
+    saved = statistics.mean(results["requests.post"][0]) - statistics.mean(results["ModelTransport"][0])
+    print(f"\nSaved per turn: {saved * 1000:.2f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs. per-request model transport")
+    parser.add_argument("--turns", type=int, default=15, help="Number of model requests (default: MAX_LOOP_COUNT default)")
+    parser.add_argument("--handshake-ms", type=float, default=20.0, help="Simulated per-connection handshake cost")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated server inference latency")
+    args = parser.parse_args()
+    run(args.turns, args.handshake_ms, args.latency_ms)
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import contextlib
+import contextvars
+from artifacts import find_handles, get_artifact_store
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT = os.getenv("CHECKPOINT", "1").strip().lower() not in ("0", "false", "no", "off")
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", os.path.join(_HERE, ".runs"))
+
+# The checkpoint of the run whose turn is executing in this context
+_active = contextvars.ContextVar("run_checkpoint", default=None)
+
+
+def _encode(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+
+
+def call_key(tool_name: str, arguments: dict) -> str:
+    """Identifies a tool call by its name and canonical arguments."""
+    canonical = json.dumps([tool_name, arguments], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def checkpoint_path(run_id: str, directory: str = None) -> str:
+    """Where a run's checkpoint is kept."""
+    return os.path.join(CHECKPOINT_DIR if directory is None else directory, f"{run_id}.jsonl")
+
+
+def load_run(run_id: str, directory: str = None) -> dict:
+    """Rebuild a run's state from its checkpoint.
+
+    A line cut short by a crash is ignored.
+
+    Returns:
+        dict: run_id, task, options, messages (the history as it was after
+        the last completed turn, compaction included), turn (the turn to
+        continue with), response and tools (what the interrupted turn had
+        already done), artifacts (handle -> text and source of the artifacts
+        its tool results refer to) and status (None unless the run ended).
+
+    Raises:
+        FileNotFoundError: When there is no checkpoint for the run.
+    """
+    state = {"run_id": run_id, "task": None, "options": {}, "messages": [], "turn": 0,
+             "response": None, "tools": {}, "artifacts": {}, "status": None}
+    with open(checkpoint_path(run_id, directory), encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            kind = record.get("type")
+            if kind == "start":
+                state.update(task=record["task"], options=record["options"])
+            elif kind in ("turn", "end"):
+                for index, message in record.get("replaced", {}).items():
+                    state["messages"][int(index)] = message
+                state["messages"].extend(record.get("appended", []))
+                if kind == "end":
+                    state["status"] = record["status"]
+                elif record["turn"] != state["turn"]:
+                    state.update(turn=record["turn"], response=None, tools={})
+            elif kind == "response" and record["turn"] == state["turn"]:
+                state["response"] = record["message"]
+            elif kind == "tool" and record["turn"] == state["turn"]:
+                state["tools"].setdefault(record["key"], []).append(record["result"])
+            elif kind == "artifact":
+                state["artifacts"][record["handle"]] = {"text": record["text"], "source": record.get("source", "")}
+    if state["task"] is None:
+        raise FileNotFoundError(f"Checkpoint for run {run_id} has no start record")
+    return state
+
+
+class RunCheckpoint:
+    """Append-only record of an agent run, for continuing it after a crash or Ctrl-C.
+
+    Nothing is ever rewritten: each event adds one JSON line to
+    `<directory>/<run_id>.jsonl`, flushed straight away.
+
+    - "start": the task and the run's options.
+    - "turn": written as each turn begins. It holds the messages added
+      since the previous one and any that compaction replaced, so the
+      history can be rebuilt exactly.
+    - "response": the model's reply, as soon as it arrives.
+    - "tool": each tool result, as soon as the call finishes.
+    - "artifact": the text behind an artifact handle in a tool result,
+      written before the result. Artifacts otherwise only live in the
+      process's memory, and a resumed run's tools may be passed the handle.
+    - "end": the final messages and status. An ended run has nothing left
+      to resume, so its file is deleted straight after.
+
+    A resumed run starts again at the interrupted turn. That turn's
+    recorded response and tool results are played back instead of calling
+    the model and the tools again.
+
+    Args:
+        run_id: The run's id, which names the file.
+        state: The result of `load_run` when resuming.
+        directory: Where checkpoints are kept (default: CHECKPOINT_DIR).
+    """
+
+    def __init__(self, run_id: str, state: dict = None, directory: str = None):
+        self.run_id = run_id
+        self.path = checkpoint_path(run_id, directory)
+        self.turn = None
+        self.stats = {"replayed_responses": 0, "replayed_tools": 0}
+        self._file = None
+        self._lock = threading.Lock()
+        # The message objects already on disk, by position; compaction replaces list entries
+        self._written = list(state["messages"]) if state else []
+        self._last_turn = state["turn"] if state else None
+        self._response = (state or {}).get("response")
+        self._tools = {key: list(results) for key, results in (state or {}).get("tools", {}).items()}
+        # Handles whose text is in the file; a resumed run puts their text back in the artifact store
+        self._artifacts = set()
+        store = get_artifact_store()
+        for handle, artifact in (state or {}).get("artifacts", {}).items():
+            store.put(artifact["text"], artifact["source"])
+            self._artifacts.add(handle)
+
+    @classmethod
+    def start(cls, run_id: str, task: str, options: dict, directory: str = None) -> "RunCheckpoint":
+        """Begin the checkpoint of a new run."""
+        checkpoint = cls(run_id, directory=directory)
+        checkpoint._append({"type": "start", "run_id": run_id, "task": task, "options": options,
+                            "time": time.time()})
+        return checkpoint
+
+    def _append(self, record: dict):
+        line = _encode(record)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+                if self._file.tell() and not self._ends_with_newline():
+                    # A crash cut the last line short; start on a fresh one
+                    line = "\n" + line
+            self._file.write(line)
+            self._file.flush()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _changes(self, messages: list) -> dict:
+        # Called with the lock held
+        replaced = {str(i): messages[i] for i in range(min(len(self._written), len(messages)))
+                    if messages[i] is not self._written[i]}
+        appended = list(messages[len(self._written):])
+        self._written = list(messages)
+        return {"replaced": replaced, "appended": appended} if replaced or appended else {}
+
+    def begin_turn(self, turn: int, messages: list):
+        """Save the messages the previous turn added and start recording `turn` (0-based)."""
+        with self._lock:
+            changes = self._changes(messages)
+            resumed = turn == self._last_turn
+            self.turn, self._last_turn = turn, turn
+        if not resumed:
+            # Whatever was left to replay belonged to an earlier turn
+            self._response, self._tools = None, {}
+        if changes or not resumed:
+            self._append({"type": "turn", "turn": turn, **changes})
+
+    def record_response(self, message: dict):
+        self._append({"type": "response", "turn": self.turn, "message": message})
+
+    def replay_response(self):
+        """The response recorded for the interrupted turn, once; None when the model must be asked."""
+        with self._lock:
+            message, self._response = self._response, None
+            if message is not None:
+                self.stats["replayed_responses"] += 1
+        return message
+
+    def record_tool(self, tool_name: str, arguments: dict, result: str):
+        store = get_artifact_store()
+        for handle in find_handles(result):
+            with self._lock:
+                if handle in self._artifacts:
+                    continue
+                self._artifacts.add(handle)
+            # File artifacts are on disk already; only text held in memory needs saving
+            text = store.text(handle)
+            if text is not None:
+                self._append({"type": "artifact", "handle": handle, "source": store.source(handle), "text": text})
+        self._append({"type": "tool", "turn": self.turn, "key": call_key(tool_name, arguments),
+                      "tool": tool_name, "result": result})
+
+    def replay_tool(self, tool_name: str, arguments: dict):
+        """The recorded result of this call on the interrupted turn, or None when it must run."""
+        with self._lock:
+            results = self._tools.get(call_key(tool_name, arguments))
+            if not results:
+                return None
+            self.stats["replayed_tools"] += 1
+            return results.pop(0)
+
+    def end(self, status: str, loops: int, messages: list):
+        """Record the end of the run and delete its checkpoint."""
+        with self._lock:
+            changes = self._changes(messages)
+        self._append({"type": "end", "status": status, "loops": loops, **changes})
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                # Left behind, it still loads as an ended run that --resume declines
+                pass
+
+
+def current_checkpoint():
+    """The checkpoint of the run executing in this context, if any."""
+    return _active.get()
+
+
+@contextlib.contextmanager
+def activate(checkpoint):
+    """Make `checkpoint` the current one for the duration of a turn (a no-op for None)."""
+    token = _active.set(checkpoint)
+    try:
+        yield checkpoint
+    finally:
+        _active.reset(token)
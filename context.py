@@ -0,0 +1,161 @@
+import os
+import re
+import json
+from collections import Counter
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 0))
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", 4))
+CONTEXT_COMPACTION = os.getenv("CONTEXT_COMPACTION", "truncate")
+CONTEXT_KEEP_CHARS = int(os.getenv("CONTEXT_KEEP_CHARS", 600))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "estimate")
+
+COMPACTION_STRATEGIES = ("truncate", "summarize", "drop")
+
+# Per-message framing tokens the chat template adds around each message
+_MESSAGE_OVERHEAD = 4
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-zA-Z][a-zA-Z'-]{2,}")
+_STOPWORDS = set("the and for are was were that this with from have has had not but you your its they them "
+                 "their there which what when where who will would can could should into about than then".split())
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a string (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def get_token_counter(name: str = CONTEXT_TOKENIZER):
+    """Return a token counting function.
+
+    "estimate" (the default) needs no dependencies. "tiktoken" counts exactly
+    with the cl100k_base encoding when tiktoken is installed, and falls back to
+    the estimate otherwise.
+    """
+    if name == "tiktoken":
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding("cl100k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            print(f"⚠️ tiktoken unavailable ({e}). Falling back to estimated token counts.")
+    return estimate_tokens
+
+
+def summarize_text(text: str, max_chars: int) -> str:
+    """Extractive summary: keep the highest-scoring sentences, in their original order, within max_chars.
+
+    Sentences are scored by the average corpus frequency of their content words,
+    so the sentences most about the text's main topic are kept.
+    """
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+    if not sentences:
+        return text[:max_chars]
+
+    frequencies = Counter(w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS)
+
+    def score(sentence):
+        words = [w for w in _WORD_RE.findall(sentence.lower()) if w not in _STOPWORDS]
+        return sum(frequencies[w] for w in words) / (len(words) + 1)
+
+    chosen, used = set(), 0
+    for index in sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True):
+        if used + len(sentences[index]) + 1 > max_chars:
+            continue
+        chosen.add(index)
+        used += len(sentences[index]) + 1
+    if not chosen:
+        return sentences[0][:max_chars]
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+class ContextManager:
+    """Keeps the prompt within a token budget by compacting older turns.
+
+    The system prompt, the user's task and the latest `keep_turns` turns are
+    never touched. When the history is over budget, older message contents are
+    compacted oldest first until it fits. Compacted messages are replaced with
+    new dicts rather than edited in place.
+
+    Args:
+        budget: Maximum prompt tokens (messages plus `fixed_tokens`).
+        keep_turns: Number of most recent turns to keep verbatim.
+        strategy: "truncate" keeps the head of old contents, "summarize" keeps
+            their most representative sentences and "drop" removes them.
+        keep_chars: Characters of each compacted content to keep.
+        count_tokens: Function returning the token count of a string.
+    """
+
+    def __init__(self, budget: int, keep_turns: int = CONTEXT_KEEP_TURNS, strategy: str = CONTEXT_COMPACTION,
+                 keep_chars: int = CONTEXT_KEEP_CHARS, count_tokens=None):
+        if strategy not in COMPACTION_STRATEGIES:
+            raise ValueError(f"Unknown compaction strategy '{strategy}'. Choose from {', '.join(COMPACTION_STRATEGIES)}")
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.strategy = strategy
+        self.keep_chars = keep_chars
+        self.count_tokens = count_tokens or get_token_counter()
+        # id(message) -> (message, tokens); holding the message keeps its id from being reused
+        self._counts = {}
+
+    def message_tokens(self, message: dict) -> int:
+        """Token count of one message, computed once per message object."""
+        cached = self._counts.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        tokens = _MESSAGE_OVERHEAD + self.count_tokens(message.get("content") or "")
+        if message.get("tool_calls"):
+            tokens += self.count_tokens(json.dumps(message["tool_calls"]))
+        self._counts[id(message)] = (message, tokens)
+        return tokens
+
+    def total_tokens(self, messages: list, fixed_tokens: int = 0) -> int:
+        return fixed_tokens + sum(self.message_tokens(m) for m in messages)
+
+    def _compactable(self, messages: list) -> list:
+        """Indexes of messages outside the protected head and the last `keep_turns` turns."""
+        # A turn starts at each user or assistant message; tool results belong to the turn that asked for them
+        turn_starts = [i for i in range(2, len(messages)) if messages[i].get("role") in ("user", "assistant")]
+        if len(turn_starts) <= self.keep_turns:
+            return []
+        protected_from = turn_starts[-self.keep_turns] if self.keep_turns else len(messages)
+        return list(range(2, protected_from))
+
+    def _compact_content(self, content: str) -> str:
+        if self.strategy == "drop":
+            return f"[older output removed to save context: {len(content)} chars]"
+        if self.strategy == "summarize":
+            return f"{summarize_text(content, self.keep_chars)} [summarized from {len(content)} chars]"
+        return f"{content[:self.keep_chars]} … [truncated {len(content) - self.keep_chars} chars]"
+
+    def compact(self, messages: list, fixed_tokens: int = 0) -> tuple:
+        """Compact `messages` in place until they fit the budget.
+
+        Args:
+            messages: The conversation history.
+            fixed_tokens: Tokens sent with every request outside the messages, such as the tool schemas.
+
+        Returns:
+            tuple: (tokens_before, tokens_after)
+        """
+        before = self.total_tokens(messages, fixed_tokens)
+        total = before
+        if total <= self.budget:
+            return before, total
+
+        # Oldest turns are compacted first
+        for index in self._compactable(messages):
+            if total <= self.budget:
+                break
+            message = messages[index]
+            content = message.get("content") or ""
+            # Short contents, including ones compacted on an earlier turn, are left alone
+            if len(content) <= self.keep_chars + 100:
+                continue
+            replacement = {**message, "content": self._compact_content(content)}
+            total += self.message_tokens(replacement) - self.message_tokens(message)
+            messages[index] = replacement
+
+        # Forget counts for messages that were replaced
+        live = {id(m) for m in messages}
+        self._counts = {key: value for key, value in self._counts.items() if key in live}
+        return before, total
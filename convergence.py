@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+
+CONVERGENCE = os.getenv("CONVERGENCE", "1").strip().lower() not in ("0", "false", "no", "off")
+# Stalled turns answered with a nudge before tool_choice is forced
+CONVERGENCE_PATIENCE = int(os.getenv("CONVERGENCE_PATIENCE", 2))
+
+
+def _digest(value) -> str:
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _call_key(tool_call: dict) -> str:
+    function = tool_call.get("function", {})
+    arguments = function.get("arguments")
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        except ValueError:
+            pass
+    return _digest([function.get("name"), arguments])
+
+
+def _output_key(result: str):
+    # Results echo their arguments first; only the output itself says whether anything new was learned
+    text = str(result)
+    output = text.split("Result: ", 1)[1] if "Result: " in text else text
+    # Tools run for their effect (write_to_file) return None: seeing that again is not a stall
+    return None if output.strip() in ("", "None") else _digest(output)
+
+
+class ConvergenceMonitor:
+    """Spots an agent loop that has stopped making progress and escalates until it ends.
+
+    A turn is stalled when the response is identical to the previous one, has
+    no tool call, only repeats calls already made this run, or only produces
+    tool outputs already seen. Consecutive stalled turns escalate:
+
+    1. For the first `patience` stalls, the next message carries a pointed nudge.
+    2. The next stall also forces `tool_choice` to "required".
+    3. One more ends the run early with what it has so far.
+
+    Any turn that makes progress resets the count.
+
+    Args:
+        max_loops: The run's turn limit, for counting the turns saved by stopping early.
+        patience: Stalled turns answered with a nudge before tool_choice is forced.
+    """
+
+    def __init__(self, max_loops: int, patience: int = CONVERGENCE_PATIENCE):
+        self.max_loops = max_loops
+        self.patience = patience
+        self.stalls = 0
+        self.reasons = []
+        self.stats = {"stalled_turns": 0, "nudges": 0, "forced": 0}
+        self._last_response = None
+        self._calls = set()
+        self._outputs = set()
+        self._partial = None
+
+    def observe(self, content: str, tool_calls: list, results: list) -> str:
+        """Record a finished turn and decide how to react.
+
+        Args:
+            content: The assistant's text.
+            tool_calls: The tool calls it made.
+            results: The results of the calls that ran.
+
+        Returns:
+            str: "continue", "nudge", "force" or "stop".
+        """
+        content = (content or "").strip()
+        response = _digest([content, sorted(_call_key(c) for c in tool_calls)])
+        calls = {_call_key(c) for c in tool_calls}
+        outputs = {_output_key(r) for r in results} - {None}
+
+        reasons = []
+        if response == self._last_response:
+            reasons.append("repeated the previous response")
+        if not tool_calls:
+            reasons.append("answered without calling a tool")
+        elif calls <= self._calls:
+            reasons.append("repeated tool calls it had already made")
+        elif outputs and outputs <= self._outputs:
+            reasons.append("got no tool output it had not seen before")
+
+        self._last_response = response
+        self._calls |= calls
+        self._outputs |= outputs
+        if content or results:
+            self._partial = content or str(results[-1])
+
+        if not reasons:
+            self.stalls = 0
+            self.reasons = []
+            return "continue"
+        self.stalls += 1
+        self.reasons = reasons
+        self.stats["stalled_turns"] += 1
+        if self.stalls <= self.patience:
+            self.stats["nudges"] += 1
+            return "nudge"
+        if self.stalls == self.patience + 1:
+            self.stats["forced"] += 1
+            return "force"
+        return "stop"
+
+    def tool_choice(self) -> str:
+        """tool_choice for the next request: "required" while escalated, otherwise "auto"."""
+        return "required" if self.stalls > self.patience else "auto"
+
+    def nudge(self) -> str:
+        """Message telling the model what it keeps doing and what to do instead."""
+        return (f"⚠️ No progress for {self.stalls} turn(s): you {' and '.join(self.reasons)}. "
+                f"Do not repeat yourself. Call a tool you have not called with these arguments yet, or, if the "
+                f"task is complete, call 'all_work_is_finished' with is_finished=true now.")
+
+    def partial_result(self):
+        """The latest assistant text or tool result, returned when the run is stopped early."""
+        return self._partial
+
+    def report(self, loops: int, stopped: bool) -> dict:
+        """Stall counts and the turns saved by stopping early."""
+        return {**self.stats, "stopped_early": stopped, "turns_saved": self.max_loops - loops if stopped else 0}
@@ -0,0 +1,136 @@
+import os
+import re
+from html import unescape
+
+SCRAPE_EXTRACTOR = os.getenv("SCRAPE_EXTRACTOR", "fast")
+SCRAPE_MAX_CHARS = int(os.getenv("SCRAPE_MAX_CHARS", 20000))
+
+# Elements whose whole subtree is boilerplate or not text
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "head",
+             "nav", "header", "footer", "aside", "form", "button", "select"}
+# Elements that end a line of text
+BLOCK_TAGS = {"p", "div", "br", "li", "ul", "ol", "tr", "td", "th", "table", "section", "article",
+              "main", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "dd", "dt", "hr"}
+
+_TOKEN_RE = re.compile(r"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<[!?][^>]*>|<(/?)([a-zA-Z][a-zA-Z0-9]*)[^>]*>", re.S)
+_SPACE_RE = re.compile(r"\s+")
+_CLOSE_RE = {tag: re.compile(rf"</{tag}\s*>", re.I) for tag in SKIP_TAGS}
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([a-zA-Z0-9_-]+)""", re.I)
+
+
+def _to_str(html, encoding: str = None) -> str:
+    if isinstance(html, bytes):
+        if not encoding:
+            # Pages declare their charset near the top, if at all
+            match = _META_CHARSET_RE.search(html, 0, 2048)
+            encoding = match.group(1).decode() if match else "utf-8"
+        try:
+            return html.decode(encoding, errors="replace")
+        except LookupError:
+            return html.decode("utf-8", errors="replace")
+    return html
+
+
+def extract_bs4(html, max_chars: int = None, encoding: str = None) -> str:
+    """Extract page text with BeautifulSoup's html.parser (the original scraper logic)."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding if isinstance(html, bytes) else None)
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    text = soup.get_text()
+    # Clean up text
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    return text[:max_chars] if max_chars else text
+
+
+def extract_lxml(html, max_chars: int = None, encoding: str = None) -> str:
+    """Extract page text with lxml's C parser, dropping the same boilerplate as the fast engine.
+
+    Requires `pip install lxml`.
+    """
+    import lxml.html
+
+    parser = lxml.html.HTMLParser(encoding=encoding) if isinstance(html, bytes) and encoding else None
+    doc = lxml.html.document_fromstring(html, parser=parser)
+    for element in list(doc.iter(*SKIP_TAGS)):
+        element.drop_tree()
+    text = _SPACE_RE.sub(" ", doc.text_content()).strip()
+    return text[:max_chars] if max_chars else text
+
+
+def extract_fast(html, max_chars: int = None, encoding: str = None) -> str:
+    """Extract page text in a single forward scan, without building a tree.
+
+    Boilerplate subtrees (SKIP_TAGS) are jumped over in one search, and the
+    scan stops as soon as `max_chars` characters of text have been collected,
+    so the cost of a page is bounded by the budget rather than the page size.
+    """
+    html = _to_str(html, encoding)
+    pieces = []
+    collected = 0
+    pos = 0
+    length = len(html)
+
+    while pos < length:
+        match = _TOKEN_RE.search(html, pos)
+        end = match.start() if match else length
+        if end > pos:
+            text = _SPACE_RE.sub(" ", unescape(html[pos:end]))
+            pieces.append(text)
+            if text != " ":
+                collected += len(text)
+                if max_chars and collected >= max_chars:
+                    break
+        if not match:
+            break
+
+        pos = match.end()
+        closing, tag = match.group(1), match.group(2)
+        if not tag:
+            # Comment, doctype or processing instruction
+            continue
+        tag = tag.lower()
+        if not closing and tag in SKIP_TAGS and not match.group(0).endswith("/>"):
+            close = _CLOSE_RE[tag].search(html, pos)
+            pos = close.end() if close else length
+        elif tag in BLOCK_TAGS:
+            pieces.append("\n")
+
+    lines = (_SPACE_RE.sub(" ", line).strip() for line in "".join(pieces).split("\n"))
+    text = " ".join(line for line in lines if line)
+    return text[:max_chars] if max_chars else text
+
+
+EXTRACTORS = {
+    "fast": extract_fast,
+    "bs4": extract_bs4,
+    "lxml": extract_lxml,
+}
+
+
+def get_extractor(name: str = None):
+    """Return the extraction function registered under `name` (default: SCRAPE_EXTRACTOR)."""
+    name = name or SCRAPE_EXTRACTOR
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}'. Available: {', '.join(EXTRACTORS)}")
+    return EXTRACTORS[name]
+
+
+def extract_text(html, engine: str = None, max_chars: int = SCRAPE_MAX_CHARS, encoding: str = None) -> str:
+    """Extract readable text from an HTML page with the configured engine.
+
+    Args:
+        html: Page content as bytes or str.
+        engine: Name of a registered extractor (default: SCRAPE_EXTRACTOR).
+        max_chars: Maximum characters of text to return (None for no limit).
+        encoding: Encoding to decode bytes with.
+
+    Returns:
+        str: The page text as a single whitespace-normalized string.
+    """
+    return get_extractor(engine)(html, max_chars=max_chars, encoding=encoding)
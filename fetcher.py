@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+SCRAPE_MAX_WORKERS = int(os.getenv("SCRAPE_MAX_WORKERS", 8))
+SCRAPE_HOST_INTERVAL = float(os.getenv("SCRAPE_HOST_INTERVAL", 1.0))
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", 2_000_000))
+SCRAPE_DEADLINE = float(os.getenv("SCRAPE_DEADLINE", 15.0))
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host by at least `min_interval` seconds.
+
+    Requests to different hosts never wait on each other.
+    """
+
+    def __init__(self, min_interval: float = 1.0):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str, deadline: float = None) -> bool:
+        """Wait for this host's next free slot.
+
+        Returns:
+            bool: False, without waiting, if the slot falls after `deadline`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            if deadline is not None and slot > deadline:
+                return False
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+        return True
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the shared scraping session, creating its connection pool on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers["User-Agent"] = USER_AGENT
+            adapter = HTTPAdapter(pool_connections=SCRAPE_MAX_WORKERS, pool_maxsize=SCRAPE_MAX_WORKERS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def fetch_page(url: str, limiter: HostRateLimiter = None, deadline: float = None,
+               max_bytes: int = SCRAPE_MAX_BYTES, timeout: float = 10) -> dict:
+    """Download one page, stopping early on non-HTML content, oversize bodies or the deadline.
+
+    Returns:
+        dict: "url", plus "content" (bytes) and "encoding" on success, or "error".
+        "truncated" is True if the body was cut at `max_bytes` or the deadline.
+    """
+    if limiter and not limiter.acquire(urlparse(url).netloc, deadline):
+        return {"url": url, "error": "Deadline exceeded before this host was free"}
+
+    try:
+        with get_session().get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+
+            # Decide from the headers alone, before downloading the body
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                return {"url": url, "error": f"Skipped non-HTML content type {content_type}"}
+
+            chunks, size, truncated = [], 0, False
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes or (deadline is not None and time.monotonic() > deadline):
+                    truncated = True
+                    break
+            content = b"".join(chunks)[:max_bytes]
+            # requests assumes ISO-8859-1 for text/* without a charset; let the extractor sniff instead
+            encoding = response.encoding if "charset=" in response.headers.get("Content-Type", "").lower() else None
+            return {"url": url, "content": content, "encoding": encoding, "truncated": truncated}
+    except Exception as e:
+        return {"url": url, "error": str(e)}
+
+
+def _fetch(urls: list, max_workers: int, host_interval: float, max_bytes: int, deadline: float, timeout: float):
+    # Yields (index, page) as each download finishes, then a deadline error for every page still in flight
+    if not urls:
+        return
+    limiter = HostRateLimiter(host_interval)
+    end = time.monotonic() + deadline
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)))
+    futures = {pool.submit(fetch_page, url, limiter, end, max_bytes, timeout): i for i, url in enumerate(urls)}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=max(0.0, end - time.monotonic())):
+            pending.discard(future)
+            yield futures[future], future.result()
+    except FutureTimeout:
+        pass
+    finally:
+        # Don't wait for stragglers; their threads finish in the background
+        pool.shutdown(wait=False, cancel_futures=True)
+    for future in sorted(pending, key=futures.get):
+        yield futures[future], {"url": urls[futures[future]], "error": "Deadline exceeded"}
+
+
+def fetch_pages(urls: list, max_workers: int = SCRAPE_MAX_WORKERS, host_interval: float = SCRAPE_HOST_INTERVAL,
+                max_bytes: int = SCRAPE_MAX_BYTES, deadline: float = SCRAPE_DEADLINE, timeout: float = 10) -> list:
+    """Download many pages concurrently over a shared connection pool.
+
+    Politeness comes from a per-host rate limiter instead of a global sleep, so
+    pages on different hosts download side by side.
+
+    Args:
+        urls: Pages to download.
+        max_workers: Maximum downloads in flight at once.
+        host_interval: Minimum seconds between requests to the same host.
+        max_bytes: Maximum body size to read per page.
+        deadline: Seconds after which whatever has been fetched is returned.
+        timeout: Per-request connect/read timeout in seconds.
+
+    Returns:
+        list: One fetch_page result per URL, in input order. Pages still in
+        flight at the deadline get an "error" entry.
+    """
+    pages = [None] * len(urls)
+    for i, page in _fetch(urls, max_workers, host_interval, max_bytes, deadline, timeout):
+        pages[i] = page
+    return pages
+
+
+def iter_pages(urls: list, max_workers: int = SCRAPE_MAX_WORKERS, host_interval: float = SCRAPE_HOST_INTERVAL,
+               max_bytes: int = SCRAPE_MAX_BYTES, deadline: float = SCRAPE_DEADLINE, timeout: float = 10):
+    """Like `fetch_pages`, but yields each page as soon as it has downloaded.
+
+    The caller can process one page while the others are still downloading.
+    Pages still in flight at the deadline are yielded last, with an "error".
+    Takes the same arguments as `fetch_pages`.
+    """
+    for _, page in _fetch(urls, max_workers, host_interval, max_bytes, deadline, timeout):
+        yield page
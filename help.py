@@ -5,7 +5,7 @@ def my_unique_addition(x:int, y:int)->int:
 # r = inspect.getsource(my_unique_addition)
 # print(r)
 # inspect.get
-print(my_unique_addition.__name__)
+# print(my_unique_addition.__name__)
 
 # sig = inspect.signature(my_unique_addition)
 # print("--- SIG --------")
@@ -19,27 +19,111 @@ print(my_unique_addition.__name__)
 
 
 import inspect
-from typing import get_origin, get_args
+import re
+import types
+import typing
+from typing import get_origin, get_args, Literal, Union
 
 def python_type_to_json_schema_type(python_type) -> str:
     """Convert Python type annotations to JSON Schema type strings."""
-    if python_type is None or python_type == type(None):
-        return "null"
-    elif python_type == int:
-        return "integer"
-    elif python_type == float:
-        return "number"
-    elif python_type == str:
-        return "string"
-    elif python_type == bool:
-        return "boolean"
-    elif python_type == list or get_origin(python_type) == list:
-        return "array"
-    elif python_type == dict or get_origin(python_type) == dict:
-        return "object"
-    else:
-        # For complex types or unknown types, default to string
-        return "string"
+    return python_type_to_json_schema(python_type).get("type", "string")
+
+_SCALAR_TYPES = {int: "integer", float: "number", str: "string", bool: "boolean", type(None): "null"}
+
+def python_type_to_json_schema(python_type) -> dict:
+    """Convert a Python type annotation to a JSON Schema fragment.
+
+    Handles Optional/Union, Literal, list[X]/tuple[X, ...], TypedDicts,
+    dict[str, X] and the scalar types. Unknown types fall back to {"type": "string"}.
+    """
+    if python_type is None:
+        return {"type": "null"}
+    if python_type in _SCALAR_TYPES:
+        return {"type": _SCALAR_TYPES[python_type]}
+    
+    origin = get_origin(python_type)
+    args = get_args(python_type)
+    
+    if origin is Union or (hasattr(types, "UnionType") and origin is types.UnionType):
+        options = [a for a in args if a is not type(None)]
+        # Optional[X] is just X; whether it may be omitted is decided by its default
+        if len(options) == 1:
+            return python_type_to_json_schema(options[0])
+        return {"anyOf": [python_type_to_json_schema(a) for a in options]}
+    if origin is Literal:
+        values = list(args)
+        schema = {"enum": values}
+        value_types = {_SCALAR_TYPES.get(type(v)) for v in values}
+        if len(value_types) == 1 and None not in value_types:
+            schema["type"] = value_types.pop()
+        return schema
+    if python_type in (list, tuple, set) or origin in (list, tuple, set):
+        schema = {"type": "array"}
+        item_types = [a for a in args if a is not Ellipsis]
+        if len(set(item_types)) == 1:
+            schema["items"] = python_type_to_json_schema(item_types[0])
+        return schema
+    if typing.is_typeddict(python_type):
+        fields = typing.get_type_hints(python_type)
+        schema = {"type": "object",
+                  "properties": {k: python_type_to_json_schema(v) for k, v in fields.items()},
+                  "required": [k for k in fields if k in python_type.__required_keys__]}
+        if python_type.__doc__:
+            schema["description"] = inspect.cleandoc(python_type.__doc__)
+        return schema
+    if python_type is dict or origin is dict:
+        schema = {"type": "object"}
+        if len(args) == 2:
+            schema["additionalProperties"] = python_type_to_json_schema(args[1])
+        return schema
+    
+    # For complex types or unknown types, default to string
+    return {"type": "string"}
+
+_SECTION_RE = re.compile(r"^(Args|Arguments|Parameters|Returns|Return|Yields|Raises|Examples?|Notes?):\s*$")
+_PARAM_RE = re.compile(r"^(\*{0,2}\w+)\s*(?:\(([^)]*)\))?\s*:\s*(.*)$")
+
+def parse_docstring(docstring: str) -> tuple:
+    """Split a Google-style docstring into its description and per-argument descriptions.
+
+    Returns:
+        tuple: (description without the Args section, {argument name: description})
+    """
+    description, params = [], {}
+    section, current, indent = None, None, None
+    for line in (docstring or "").splitlines():
+        stripped = line.strip()
+        header = _SECTION_RE.match(stripped)
+        if header:
+            section = "args" if header.group(1) in ("Args", "Arguments", "Parameters") else "other"
+            current, indent = None, None
+            if section == "other":
+                description.append(line)
+            continue
+        if section != "args":
+            description.append(line)
+            continue
+        if not stripped:
+            current = None
+            continue
+        line_indent = len(line) - len(line.lstrip())
+        match = _PARAM_RE.match(stripped)
+        if match and (indent is None or line_indent <= indent):
+            indent = line_indent
+            current = match.group(1).lstrip("*")
+            params[current] = match.group(3).strip()
+        elif current:
+            # Continuation of the previous argument's description
+            params[current] = f"{params[current]} {stripped}".strip()
+    return "\n".join(description).strip(), params
+
+def _json_default(value):
+    """Return the default if it can be shown in a JSON schema, else None."""
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(v, (str, int, float, bool)) for v in value):
+        return list(value)
+    return None
 
 def generate_schema(function: callable) -> dict:
     """Generates a JSON Schema representing a Python function's structure.
@@ -51,31 +135,48 @@ def generate_schema(function: callable) -> dict:
         A dictionary representing the JSON Schema of the function. 
     """
 
+    description, param_docs = parse_docstring(inspect.getdoc(function))
     schema = {
         "type": "function",
         "function": {
             "name": function.__name__,
-            "description": inspect.getdoc(function) if inspect.getdoc(function) else "",
+            "description": description,
         }
     }
 
     # Extract parameters from the function signature
     signature = inspect.signature(function)
+    try:
+        # Resolves string annotations (from __future__ import annotations)
+        hints = typing.get_type_hints(function)
+    except Exception:
+        hints = {}
     properties = {}
     required_params = []
     
     for param_name, param in signature.parameters.items():
-        param_type = param.annotation
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        param_type = hints.get(param_name, param.annotation)
+        has_default = param.default is not inspect.Parameter.empty
         if param_type != inspect.Parameter.empty:
             # Convert Python type to JSON Schema type
-            json_type = python_type_to_json_schema_type(param_type)
-            properties[param_name] = {"type": json_type}
+            prop = python_type_to_json_schema(param_type)
+        elif has_default and param.default is not None and type(param.default) in _SCALAR_TYPES:
+            # No annotation, but the default shows the type
+            prop = {"type": _SCALAR_TYPES[type(param.default)]}
         else:
             # No type annotation available - use string as default valid type
-            properties[param_name] = {"type": "string"}
+            prop = {"type": "string"}
+        
+        if param_name in param_docs:
+            prop["description"] = param_docs[param_name]
+        if has_default and _json_default(param.default) is not None:
+            prop["default"] = _json_default(param.default)
+        properties[param_name] = prop
         
         # Check if parameter is required (no default value)
-        if param.default == inspect.Parameter.empty:
+        if not has_default:
             required_params.append(param_name)
     
     schema["function"]["parameters"] = {
@@ -86,51 +187,63 @@ def generate_schema(function: callable) -> dict:
 
     return schema
 
-import requests
-from bs4 import BeautifulSoup
-from duckduckgo_search import DDGS
-import time
+from fetcher import fetch_pages, iter_pages, SCRAPE_DEADLINE
+from extract import extract_text, SCRAPE_MAX_CHARS
+from ranking import PassageRanker, RANK_TOP_K, RANK_CHAR_BUDGET
+from search_cache import cached_search
+
+def _scraped_something(results) -> bool:
+    return any(not result['text'].startswith("Error:") for result in results)
 
-def search_and_scrape(query, n=3):
+@cached_search("search_and_scrape", exclude=("deadline",), cache_if=_scraped_something)
+def search_and_scrape(query, n=3, deadline=SCRAPE_DEADLINE, engine=None, max_chars=SCRAPE_MAX_CHARS,
+                      top_k=RANK_TOP_K, char_budget=RANK_CHAR_BUDGET):
     """
     Search DuckDuckGo and scrape text from top N results.
     
+    Pages are downloaded concurrently (see fetcher.fetch_pages), so scraping
+    N results takes about as long as the slowest page.
+    
+    With top_k set, only the passages most relevant to the query come back
+    (see ranking.PassageRanker). Each page is extracted, chunked and scored
+    as soon as it arrives, while the rest are still downloading.
+    
     Args:
         query (str): Search query
         n (int): Number of top results to scrape (default: 3)
+        deadline (float): Seconds to wait for pages before returning what was fetched
+        engine (str): Text extraction engine from extract.EXTRACTORS (default: SCRAPE_EXTRACTOR)
+        max_chars (int): Maximum characters of text to keep per page
+        top_k (int): Number of passages to return across all pages (0 for whole pages)
+        char_budget (int): Maximum characters across the returned passages
     
     Returns:
-        list: List of dictionaries with 'url' and 'text' keys
+        list: List of dictionaries with 'url' and 'text' keys, best passage
+        first and with a 'score' when ranked, followed by pages that failed
     """
     results = []
+    ranker = PassageRanker(query) if top_k else None
     
     try:
         # Search DuckDuckGo
+        from duckduckgo_search import DDGS
         with DDGS() as ddgs:
             search_results = list(ddgs.text(query, max_results=n))
         
-        # Scrape each URL
-        for result in search_results:
-            url = result['href']
+        # Fetch every URL at once and extract text from each page; ranked pages are handled as they arrive
+        urls = [result['href'] for result in search_results]
+        pages = iter_pages(urls, deadline=deadline) if ranker else fetch_pages(urls, deadline=deadline)
+        for page in pages:
+            url = page['url']
             try:
-                response = requests.get(url, timeout=10, headers={
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                })
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.decompose()
+                if 'error' in page:
+                    raise RuntimeError(page['error'])
                 
-                text = soup.get_text()
-                # Clean up text
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                text = ' '.join(chunk for chunk in chunks if chunk)
-                
-                results.append({'url': url, 'text': text})
-                time.sleep(1)  # Be respectful to servers
+                text = extract_text(page['content'], engine=engine, max_chars=max_chars, encoding=page.get('encoding'))
+                if ranker:
+                    ranker.add(text, url)
+                else:
+                    results.append({'url': url, 'text': text})
                 
             except Exception as e:
                 print(f"Error scraping {url}: {e}")
@@ -138,6 +251,9 @@ def search_and_scrape(query, n=3):
                 
     except Exception as e:
         print(f"Search error: {e}")
+    
+    if ranker:
+        results = ranker.top(top_k, char_budget) + results
         
     return results
 
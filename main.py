@@ -1,49 +1,70 @@
 import sys
-import requests
 import os
 import json
-import numpy as np
+import time
 import inspect
 import argparse
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
 from rich.panel import Panel
-from rich.prompt import Prompt
-from rich.json import JSON
-from rich.text import Text
-from rich.progress import Progress, SpinnerColumn, TextColumn
 # from help import generate_schema, search_and_scrape
-from help import generate_schema
-from mysearch2 import tavily_context_search
+from tool_registry import ToolRegistry
+from mysearch2 import tavily_context_search, tavily_multi_search, search_succeeded
+from tool_cache import ToolCache, TOOL_CACHE
+from search_cache import get_search_cache
+from router import get_router
+from streaming import consume_stream
+from context import ContextManager, CONTEXT_TOKEN_BUDGET
+from message_log import MessageLog, encode_payload
+from response_cache import get_response_cache, CACHE_MODES, RESPONSE_CACHE
+from tracing import get_tracer, TRACE_FILE, TRACE_METRICS_FILE
+from vectorize import elementwise, run_batched, Linspace
+from artifacts import get_artifact_store
+from tool_executor import ToolExecutor, ToolError
+from convergence import ConvergenceMonitor, CONVERGENCE
+from tool_call_parser import ToolCallParser, TOOL_CALL_FALLBACK
+from checkpoint import RunCheckpoint, load_run, activate, current_checkpoint, CHECKPOINT
 
 # load dotenv
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
 console = Console()
+tracer = get_tracer()
+artifacts = get_artifact_store()
 MODEL_NAME = os.getenv("MODEL_NAME", "qwen3:0.6b")
+# One endpoint, or several comma-separated ones to balance requests across (see router.py)
 MODEL_BASE_URL = os.getenv("MODEL_BASE_URL", "http://localhost:11434/v1/models")
 MODEL_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
 MAX_LOOP_COUNT = int(os.getenv("MAX_LOOP_COUNT", 15))
+MODEL_STREAM = os.getenv("MODEL_STREAM", "").lower() in ("1", "true", "yes")
+PARALLEL_TOOL_CALLS = os.getenv("PARALLEL_TOOL_CALLS", "").lower() in ("1", "true", "yes")
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", 8))
+
 
-print(f"Using model: {MODEL_NAME} from {MODEL_BASE_URL}")
-# print the first 10 characters of the API key if it exists
-if MODEL_API_KEY:
-    print(f"Using API key: {MODEL_API_KEY[:10]}... (truncated for security)")
 
+@elementwise
+def my_super_cool_function(x_int: float | list[float] | Linspace, y_int: float | list[float] | Linspace) -> float:
+    """Does some cool math and returns a number.
 
-def my_super_cool_function(x_int, y_int) -> float:
-    """Does some cool math and returns a number."""
-    # convert to float. 
-    x_int = float(x_int)
-    y_int = float(y_int)
-    r = np.sin(x_int) * np.cos(y_int)
-    return r
+    Pass lists or {"start", "stop", "num"} ranges to evaluate many points in one
+    call; a single number is paired with every point of the other argument.
+    Large results come back as a summary with the full table saved to a CSV file.
+    """
+    # numpy is only needed here, so it is imported on first call rather than at startup
+    import numpy as np
+    return np.sin(x_int) * np.cos(y_int)
 
 def encode_a_secret(secret_to_encode: str) -> str:
-    """Encodes a secret string with a simple transformation."""
-    code = [f"xx{a}" for a in secret_to_encode]
-    return "".join(code)
+    """Encodes a secret string with a simple transformation.
+
+    Args:
+        secret_to_encode: The text to encode, or an artifact handle (artifact:...) from an earlier result.
+    """
+    return "".join(f"xx{a}" for chunk in artifacts.chunks(secret_to_encode) for a in chunk)
 
 def all_work_is_finished(is_finished: bool):
     """A function to call when all work is sufficiently finished. This will exit the program."""
@@ -53,139 +74,728 @@ def all_work_is_finished(is_finished: bool):
         
 # function for writing to a file. 
 def write_to_file(filename: str, content: str):
-    """Writes content to a file."""
+    """Writes content to a file.
+
+    Args:
+        filename: Path of the file to write.
+        content: The text to write, or an artifact handle (artifact:...) to write that artifact's full contents.
+    """
     try:
         with open(filename, 'w') as f:
-            f.write(content)
+            for chunk in artifacts.chunks(content):
+                f.write(chunk)
     except Exception as e:
         console.print(Panel(f"❌ Error writing to file {filename}: {e}", style="red"))
 
-# Setup tools
-tool_list = [my_super_cool_function, encode_a_secret, all_work_is_finished, tavily_context_search, write_to_file]
-tool_list_schema = [generate_schema(t) for t in tool_list]
-tool_map = {t.__name__: t for t in tool_list}
+# Setup tools. A (tool, options) entry registers the tool with options:
+#   cacheable: repeated calls with the same arguments are served from the tool cache
+#   ttl: seconds a cached result may be served for
+#   persist: also keep cached results on disk for later runs
+#   cache_if: function of the result deciding whether it may be cached
+#   executor: "thread" (default, I/O-bound), "process" (CPU-bound) or "inline" (see tool_executor.py)
+#   timeout: seconds a call may run before it is stopped (default: TOOL_TIMEOUT)
+SEARCH_OPTIONS = {"cacheable": True, "ttl": 3600, "persist": True, "cache_if": search_succeeded, "timeout": 30}
+tool_list = [
+    (my_super_cool_function, {"cacheable": True, "executor": "process"}),
+    (encode_a_secret, {"cacheable": True}),
+    (all_work_is_finished, {"executor": "inline"}),
+    (tavily_context_search, SEARCH_OPTIONS),
+    (tavily_multi_search, SEARCH_OPTIONS),
+    write_to_file,
+]
+registry = ToolRegistry()
+for entry in tool_list:
+    tool, options = entry if isinstance(entry, tuple) else (entry, {})
+    registry.register(tool, **options)
+tool_map = registry.functions
+tool_cache = ToolCache()
+tool_executor = ToolExecutor(tool_map)
+tool_call_parser = ToolCallParser(registry.schemas)
+
+SYSTEM_PROMPT = "You are helpful AI assistent that works in a loop. You can call tools when necessary. After thinking, return in valid tool calling format. Call 'all_work_is_finished' with is_finished=true when the task is complete.\n\nOnly call one tool per response/iteration of the loop."
+SYSTEM_PROMPT_PARALLEL = "You are helpful AI assistent that works in a loop. You can call tools when necessary. After thinking, return in valid tool calling format. Call 'all_work_is_finished' with is_finished=true when the task is complete.\n\nYou may call several tools in one response when they do not depend on each other's results; they run at the same time."
+
+# Tools that must run after every other call in the same turn
+BARRIER_TOOLS = {"all_work_is_finished"}
 
 # API setup
 headers = {"Content-Type": "application/json"}
 if MODEL_API_KEY:
     headers["Authorization"] = f"Bearer {MODEL_API_KEY}"
 
+def _abbreviate(arguments: dict, limit: int = 10) -> dict:
+    """Shorten long list and text arguments so they are not echoed back into the conversation."""
+    def short(value):
+        if isinstance(value, list) and len(value) > limit:
+            return f"[{', '.join(map(str, value[:3]))}, … ({len(value)} values)]"
+        if isinstance(value, str) and len(value) > artifacts.preview_chars:
+            return f"{value[:artifacts.preview_chars // 3]}… ({len(value)} chars)"
+        return value
+    return {k: short(v) for k, v in arguments.items()}
+
+def _describe_error(tool_name: str, error: Exception) -> str:
+    """A failed call as JSON, so the model can tell a timeout from a bad argument."""
+    if isinstance(error, ToolError):
+        return json.dumps(error.to_dict())
+    return json.dumps({"error": "exception", "tool": tool_name, "type": type(error).__name__, "message": str(error)})
+
 def call_tool(tool_name: str, arguments: dict) -> str:
-    """Execute a tool and return the result message."""
+    """Execute a tool and return the result message.
+
+    On the turn a resumed run was interrupted in, a call that already ran
+    returns its recorded result instead of running again (see checkpoint.py).
+    """
+    checkpoint = current_checkpoint()
+    if checkpoint:
+        replayed = checkpoint.replay_tool(tool_name, arguments)
+        if replayed is not None:
+            return replayed
+    result = _run_tool(tool_name, arguments)
+    if checkpoint:
+        checkpoint.record_tool(tool_name, arguments, result)
+    return result
+
+def _run_tool(tool_name: str, arguments: dict) -> str:
     if tool_name not in tool_map:
         return f"Tool '{tool_name}' not found in available tools."
     
-    try:
-        fn = tool_map[tool_name]
-        result = fn(**arguments)
-        return f"✅ Called {tool_name} with {arguments}. Result: {result}"
-    except Exception as e:
-        return f"❌ Error calling {tool_name}: {str(e)}"
+    with tracer.span("tool", tool=tool_name) as span:
+        # A tool that raises SystemExit (all_work_is_finished) is counted as "exit"
+        span["status"] = "exit"
+        try:
+            options = registry.options(tool_name)
+            span["executor"] = options.get("executor", "thread")
 
-def make_api_call(payload: dict) -> dict:
-    """Make API call to Ollama with progress indicator."""
+            def run():
+                return tool_executor.run(tool_name, span["executor"], options.get("timeout"), kwargs=arguments)
+            if TOOL_CACHE and options.get("cacheable"):
+                result, hit = tool_cache.call(tool_name, arguments, run,
+                                              ttl=options.get("ttl"), persist=options.get("persist", False),
+                                              cache_if=options.get("cache_if"), version=registry.version(tool_name))
+                span["cached"] = hit
+                tracer.count("agent_tool_cache_total", tool=tool_name, result="hit" if hit else "miss")
+            else:
+                result = run()
+            span["status"] = "ok"
+            # Long results stay in the artifact store; the prompt only gets a handle and a preview
+            result = artifacts.shrink(result, source=tool_name)
+            return f"✅ Called {tool_name} with {_abbreviate(arguments)}. Result: {result}"
+        except Exception as e:
+            span["status"] = e.kind if isinstance(e, ToolError) else "error"
+            return f"❌ Error calling {tool_name}: {_describe_error(tool_name, e)}"
+        finally:
+            tracer.count("agent_tool_calls_total", tool=tool_name, status=span["status"])
+
+def render(*objects, **kwargs):
+    """Print to the console, timed as a render span."""
+    with tracer.span("render"):
+        console.print(*objects, **kwargs)
+
+def make_api_call(payload: dict, show_progress: bool = True) -> dict:
+    """Make API call to Ollama with progress indicator.
+
+    When the response cache is on, identical requests are answered from disk
+    (see response_cache.py). A resumed run replays the response its
+    interrupted turn had already received (see checkpoint.py).
+    """
+    checkpoint = current_checkpoint()
+    replayed = checkpoint.replay_response() if checkpoint else None
+    if replayed is not None:
+        render("[dim]♻️ Replaying the response received before the run was interrupted[/dim]")
+        return {"choices": [{"message": replayed}]}
+    cache = get_response_cache()
+    if cache is not None:
+        response = cache.fetch(payload, lambda: _post_model(payload, show_progress))
+    else:
+        response = _post_model(payload, show_progress)
+    if checkpoint:
+        checkpoint.record_response(response.get("choices", [{}])[0].get("message", {}))
+    return response
+
+def _post_model(payload: dict, show_progress: bool) -> dict:
+    if not show_progress:
+        return _send_request(payload)
+    from rich.progress import Progress, SpinnerColumn, TextColumn
     with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}")) as progress:
         task = progress.add_task("🤖 Thinking...", total=None)
-        response = requests.post(MODEL_BASE_URL, headers=headers, json=payload)
+        return _send_request(payload)
+
+def _send_request(payload: dict) -> dict:
+    with tracer.span("encode"):
+        body = encode_payload(payload)
+    with tracer.span("model_request", bytes_sent=len(body)) as span:
+        response = get_router(MODEL_BASE_URL).post(headers=headers, data=body)
+        span["endpoint"] = str(response.url)
+        # Time until the response headers arrived; the rest of the span is reading the body
+        span["to_headers"] = round(response.elapsed.total_seconds(), 6)
+        span["status"] = response.status_code
+        span["bytes_received"] = len(response.content)
+        # The router hands back the last overload response once retries run out; that ends the run
+        response.raise_for_status()
+    with tracer.span("decode"):
         return response.json()
 
+def make_streaming_api_call(payload: dict, on_tool_call=None):
+    """Make a streaming API call, rendering text live and dispatching tools as soon as their arguments arrive.
+
+    Returns:
+        tuple: (message, metrics) with the assembled assistant message and the
+        time-to-first-token / time-to-tool-dispatch for this turn.
+    """
+    # Whether live text is on screen without a trailing newline yet
+    text_open = False
+    # Live text arrives in many small pieces; their render time is recorded as one span
+    render_start, render_seconds = time.time(), 0.0
+    
+    def render_text(text):
+        nonlocal text_open, render_seconds
+        started = time.perf_counter()
+        console.print(text, end="", markup=False, highlight=False)
+        render_seconds += time.perf_counter() - started
+        text_open = True
+    
+    def dispatch(tool_call):
+        nonlocal text_open
+        if text_open:
+            console.print()
+            text_open = False
+        if on_tool_call:
+            on_tool_call(tool_call)
+    
+    checkpoint = current_checkpoint()
+    replayed = checkpoint.replay_response() if checkpoint else None
+    if replayed is not None:
+        render("[dim]♻️ Replaying the response received before the run was interrupted[/dim]")
+        for tool_call in replayed.get("tool_calls") or []:
+            dispatch(tool_call)
+        return replayed, {"time_to_first_token": None, "time_to_tool_dispatch": None, "usage": None, "duration": 0.0}
+    
+    start = time.perf_counter()
+    with tracer.span("encode"):
+        body = encode_payload({**payload, "stream": True})
+    with tracer.span("model_request", bytes_sent=len(body), stream=True) as span:
+        response = get_router(MODEL_BASE_URL).post(headers=headers, data=body, stream=True)
+        span["endpoint"] = str(response.url)
+        try:
+            response.raise_for_status()
+            message, metrics = consume_stream(response.iter_lines(), start, on_text=render_text, on_tool_call=dispatch)
+        finally:
+            response.close()
+        metrics["duration"] = time.perf_counter() - start
+        span["time_to_first_token"] = metrics["time_to_first_token"]
+    if checkpoint:
+        checkpoint.record_response(message)
+    if render_seconds:
+        tracer.record("render", render_start, render_seconds, {"stream": True})
+    if text_open:
+        console.print()
+    return message, metrics
+
+def process_tool_call(tool_call: dict) -> str:
+    """Parse a single tool call from the model, run it and return the result message."""
+    try:
+        func_info = tool_call['function']
+        tool_name = func_info['name']
+        arguments = func_info['arguments']
+        
+        if isinstance(arguments, str):
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        
+        render(f"🔧 Calling tool: [bold]{tool_name}[/bold] with {_abbreviate(arguments)}")
+        result = call_tool(tool_name, arguments)
+        render(result)
+        return result
+        
+    except Exception as e:
+        error_msg = f"❌ Error processing tool call: {str(e)}"
+        render(error_msg, style="red")
+        return error_msg
+
+def process_batched_calls(tool_name: str, tool_calls: list) -> list:
+    """Run several calls to one elementwise tool as a single vectorized evaluation.
+
+    Returns:
+        list: A result message per call, in order.
+    """
+    results = [None] * len(tool_calls)
+    batch, indexes = [], []
+    checkpoint = current_checkpoint()
+    for i, tool_call in enumerate(tool_calls):
+        try:
+            arguments = tool_call["function"]["arguments"]
+            if isinstance(arguments, str):
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            # Calls that already ran before a resumed run was interrupted are not evaluated again
+            results[i] = checkpoint.replay_tool(tool_name, arguments) if checkpoint else None
+            if results[i] is None:
+                batch.append(arguments)
+                indexes.append(i)
+        except Exception as e:
+            results[i] = f"❌ Error processing tool call: {str(e)}"
+    if not batch:
+        return results
+
+    render(f"🔧 Calling tool: [bold]{tool_name}[/bold] for {len(batch)} calls in one batch")
+    options = registry.options(tool_name)
+    with tracer.span("tool", tool=tool_name, batched=len(batch)) as span:
+        span["executor"] = options.get("executor", "thread")
+        try:
+            outcomes = tool_executor.run(tool_name, span["executor"], options.get("timeout"), fn=run_batched,
+                                         args=(batch,))
+            span["status"] = "ok"
+        except Exception as e:
+            outcomes = [e] * len(batch)
+            span["status"] = e.kind if isinstance(e, ToolError) else "error"
+    for i, arguments, outcome in zip(indexes, batch, outcomes):
+        ok = not isinstance(outcome, Exception)
+        tracer.count("agent_tool_calls_total", tool=tool_name, status="ok" if ok else "error")
+        if ok:
+            outcome = artifacts.shrink(outcome, source=tool_name)
+        results[i] = f"✅ Called {tool_name} with {_abbreviate(arguments)}. Result: {outcome}" if ok \
+            else f"❌ Error calling {tool_name}: {_describe_error(tool_name, outcome)}"
+        if checkpoint:
+            checkpoint.record_tool(tool_name, arguments, results[i])
+        render(results[i])
+    return results
+
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+class ParallelToolCalls:
+    """Runs one turn's tool calls concurrently on the shared tool thread pool.
+
+    Calls start as soon as they are submitted, so a streamed turn can begin
+    executing its first call while later ones are still arriving. Calls to
+    BARRIER_TOOLS are held back until every other call has finished.
+
+    Calls to elementwise tools (see vectorize.py) are held until the turn's
+    calls are all in; several calls to the same one then run as one
+    vectorized evaluation.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.vectorized = {}
+        self.batched = {}
+        self.finished = False
+
+    def _start(self, fn, *args):
+        # The copied context carries the run's trace attributes into the tool thread
+        return _tool_pool.submit(contextvars.copy_context().run, fn, *args)
+
+    def submit(self, tool_call: dict):
+        name = tool_call.get("function", {}).get("name")
+        if hasattr(tool_map.get(name), "kernel"):
+            self.vectorized.setdefault(name, []).append(len(self.entries))
+            self.entries.append((tool_call, None))
+            return
+        future = None if name in BARRIER_TOOLS else self._start(process_tool_call, tool_call)
+        self.entries.append((tool_call, future))
+
+    def _start_vectorized(self):
+        for name, indexes in self.vectorized.items():
+            if len(indexes) == 1:
+                tool_call = self.entries[indexes[0]][0]
+                self.entries[indexes[0]] = (tool_call, self._start(process_tool_call, tool_call))
+                continue
+            batch = self._start(process_batched_calls, name, [self.entries[i][0] for i in indexes])
+            for position, i in enumerate(indexes):
+                self.batched[i] = position
+                self.entries[i] = (self.entries[i][0], batch)
+        self.vectorized = {}
+
+    def results(self) -> list:
+        """Wait for every call and return their results in submission order."""
+        self._start_vectorized()
+        results = [future.result() if future else None for _, future in self.entries]
+        # A batched call's future holds the whole batch's results
+        for i, position in self.batched.items():
+            results[i] = results[i][position]
+        for i, (tool_call, future) in enumerate(self.entries):
+            if future is None:
+                try:
+                    results[i] = process_tool_call(tool_call)
+                except SystemExit:
+                    # Report the other results before ending the run
+                    self.finished = True
+                    results[i] = "✅ Work completed."
+        return results
+
+def recover_tool_calls(message: dict) -> list:
+    """Tool calls the model wrote into its text instead of `tool_calls` (see tool_call_parser.py)."""
+    if not TOOL_CALL_FALLBACK:
+        return []
+    calls = tool_call_parser.recover(message)
+    tracer.count("agent_tool_call_fallback_total", result="recovered" if calls else "none")
+    if calls:
+        render(f"[yellow]🩹 Recovered {len(calls)} tool call(s) from the response text[/yellow]")
+    return calls
+
+def _format_seconds(seconds) -> str:
+    return "n/a" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+def _format_speed(usage: dict) -> str:
+    if not usage.get("tokens_per_s"):
+        return ""
+    return f", {usage['completion_tokens']} tokens at {usage['tokens_per_s']:.1f} tok/s"
+
+def run_agent(user_input: str, stream: bool = False, max_loops: int = None, show_progress: bool = True,
+              parallel_tools: bool = False, context_budget: int = CONTEXT_TOKEN_BUDGET,
+              convergence: bool = CONVERGENCE, run_id: str = None, checkpoint: bool = CHECKPOINT,
+              restore: dict = None, on_event=None) -> dict:
+    """Run the agent loop for one task with its own message history.
+
+    Args:
+        user_input: The task for the assistant.
+        stream: Stream responses and dispatch tools as soon as their arguments are complete.
+        max_loops: Maximum number of model turns (default: MAX_LOOP_COUNT).
+        show_progress: Show the spinner while waiting for the model. Only one
+            spinner can be live per console, so concurrent runs turn it off.
+        parallel_tools: Accept every tool call in a response and run them
+            concurrently, returning results as `role: tool` messages.
+        context_budget: Prompt token budget; older turns are compacted once
+            it is exceeded (0 disables compaction).
+        convergence: Watch for stalled turns, escalating from a nudge to a
+            forced tool call to stopping early (see convergence.py).
+        run_id: Id of the run, which names its checkpoint (default: a new one).
+        checkpoint: Record the run to disk as it goes so it can be resumed
+            (see checkpoint.py).
+        restore: State from `checkpoint.load_run` to continue from instead
+            of starting afresh (see `--resume`).
+        on_event: Called from the run's thread with a progress event dict:
+            "turn" as each turn starts, "response" with the model's text and
+            tool calls, "tools" with the turn's tool results and "done" with
+            the final status. Every event has a `type` and the `run_id`.
+
+    Returns:
+        dict: status ("finished", "max_loops" or "stalled"), loops used, the
+        final message history, per-turn stream metrics, per-turn prompt token
+        counts before and after compaction, the convergence report and, when
+        checkpointing, what a resumed run replayed. A stalled run also has a
+        `partial` result: its latest text or tool result.
+    """
+    # Each message is encoded once; later turns only encode what is new
+    messages = MessageLog(restore["messages"] if restore else [
+        {"role": "system", "content": SYSTEM_PROMPT_PARALLEL if parallel_tools else SYSTEM_PROMPT},
+        {"role": "user", "content": user_input}
+    ])
+    
+    stream_metrics = []
+    context_stats = []
+    context = ContextManager(context_budget) if context_budget else None
+    # The tool schemas go out with every request and count against the budget
+    schema_tokens = context.count_tokens(json.dumps(registry.schemas())) if context else 0
+    max_loops = max_loops or MAX_LOOP_COUNT
+    # Tags this run's trace spans and names its checkpoint
+    run_id = run_id or uuid.uuid4().hex[:12]
+    monitor = ConvergenceMonitor(max_loops) if convergence else None
+    run_checkpoint = None
+    if checkpoint:
+        options = {"stream": stream, "max_loops": max_loops, "parallel_tools": parallel_tools,
+                   "context_budget": context_budget, "convergence": convergence}
+        run_checkpoint = RunCheckpoint(run_id, restore) if restore else RunCheckpoint.start(run_id, user_input, options)
+    
+    def emit(kind, **data):
+        if on_event:
+            on_event({"type": kind, "run_id": run_id, **data})
+    
+    def emit_response(turn, message, tool_calls):
+        emit("response", turn=turn, content=message.get("content") or "",
+             tool_calls=[{"name": c.get("function", {}).get("name"), "arguments": c.get("function", {}).get("arguments")}
+                         for c in tool_calls])
+    
+    def run_result(status, loops):
+        if run_checkpoint:
+            run_checkpoint.end(status, loops, messages)
+        emit("done", status=status, loops=loops)
+        result = {"status": status, "loops": loops, "messages": messages, "run_id": run_id,
+                  "stream_metrics": stream_metrics, "context_stats": context_stats,
+                  "convergence": monitor.report(loops, status == "stalled") if monitor else None,
+                  "checkpoint": run_checkpoint.stats if run_checkpoint else None}
+        if status == "stalled":
+            result["partial"] = monitor.partial_result()
+            tracer.count("agent_turns_saved_total", result["convergence"]["turns_saved"])
+        return result
+    
+    def check_progress(content, tool_calls, results):
+        """Feed the turn to the monitor; returns the nudge to send, "stop", or None."""
+        if not monitor:
+            return None
+        action = monitor.observe(content, tool_calls, results)
+        if action == "continue":
+            return None
+        tracer.count("agent_stalls_total", action=action)
+        if action == "stop":
+            render(Panel(f"🛑 No progress for {monitor.stalls} turns; stopping early.", style="yellow"))
+            return "stop"
+        render(f"[yellow]🔁 {monitor.nudge()}[/yellow]")
+        return monitor.nudge()
+    
+    for loop_count in range(restore["turn"] if restore else 0, max_loops):
+        with tracer.bind(run_id=run_id, turn=loop_count + 1), activate(run_checkpoint), \
+                tracer.span("turn") as turn_span:
+            console.print(f"\n[dim]--- Loop {loop_count + 1}/{max_loops} ---[/dim]")
+            if run_checkpoint:
+                # Saves what the previous turn added before this one can fail
+                run_checkpoint.begin_turn(loop_count, messages)
+            emit("turn", turn=loop_count + 1, max_loops=max_loops)
+        
+            if context:
+                before, after = context.compact(messages, fixed_tokens=schema_tokens)
+                context_stats.append({"before": before, "after": after})
+                compacted = f" → {after} after compaction" if after != before else ""
+                console.print(f"[dim]📏 Prompt tokens: {before}{compacted} (budget {context_budget})[/dim]")
+        
+            payload = {
+                "model": MODEL_NAME,
+                "messages": messages,
+                "tools": registry.schemas(),
+                "tool_choice": monitor.tool_choice() if monitor else "auto"
+            }
+        
+            # Process tool calls or handle no tool call scenario
+            tool_results = []
+        
+            try:
+                parallel_calls = ParallelToolCalls() if parallel_tools else None
+            
+                if stream:
+                    # Tools are dispatched from inside the stream as soon as their arguments are complete
+                    def dispatch(tool_call):
+                        if tool_results:
+                            console.print("[red]⚠️ Multiple tool calls detected! Only the first will be processed.[/red]")
+                            return
+                        tool_results.append(process_tool_call(tool_call))
+            
+                    message, metrics = make_streaming_api_call(
+                        payload, on_tool_call=parallel_calls.submit if parallel_tools else dispatch)
+                    stream_metrics.append(metrics)
+                    tool_calls = message.get("tool_calls", [])
+                    if not tool_calls:
+                        tool_calls = recover_tool_calls(message)
+                        for tool_call in tool_calls:
+                            (parallel_calls.submit if parallel_tools else dispatch)(tool_call)
+                    emit_response(loop_count + 1, message, tool_calls)
+                    # Generation speed is measured from the first token, after the prompt was processed
+                    generating = metrics["duration"] - (metrics["time_to_first_token"] or 0)
+                    turn_span.update(tracer.record_usage(metrics["usage"], generating))
+                    console.print(f"[dim]⏱ first token: {_format_seconds(metrics['time_to_first_token'])}, "
+                                  f"tool dispatch: {_format_seconds(metrics['time_to_tool_dispatch'])}"
+                                  f"{_format_speed(turn_span)}[/dim]")
+            
+                    if os.getenv("DEBUG"):
+                        from rich.json import JSON
+                        console.print(Panel(JSON.from_data(message), title="Assembled Streamed Message"))
+                else:
+                    # Make API call
+                    request_start = time.perf_counter()
+                    resp_json = make_api_call(payload, show_progress=show_progress)
+                    model_seconds = time.perf_counter() - request_start
+                    turn_span.update(tracer.record_usage(resp_json.get("usage"), model_seconds))
+                    console.print(f"[dim]⏱ model: {_format_seconds(model_seconds)}{_format_speed(turn_span)}[/dim]")
+            
+                    # Show raw response in debug mode
+                    if os.getenv("DEBUG"):
+                        from rich.json import JSON
+                        console.print(Panel(JSON.from_data(resp_json), title="Raw Response"))
+            
+                    # Parse response
+                    choice = resp_json.get("choices", [{}])[0]
+                    message = choice.get("message", {})
+                    tool_calls = message.get("tool_calls") or recover_tool_calls(message)
+                    emit_response(loop_count + 1, message, tool_calls)
+            
+                    if parallel_tools:
+                        for tool_call in tool_calls:
+                            parallel_calls.submit(tool_call)
+                    else:
+                        # only allow 1 tool call per response
+                        if len(tool_calls) > 1:
+                            console.print("[red]⚠️ Multiple tool calls detected! Only the first will be processed.[/red]")
+                            tool_calls = [tool_calls[0]]
+                    
+                        for tool_call in tool_calls:
+                            tool_results.append(process_tool_call(tool_call))
+            
+                if parallel_tools and tool_calls:
+                    results = parallel_calls.results()
+                    emit("tools", turn=loop_count + 1, results=results)
+                    # Tool results must follow the assistant message that requested them
+                    for i, tool_call in enumerate(tool_calls):
+                        tool_call["id"] = tool_call.get("id") or f"call_{loop_count}_{i}"
+                    messages.append({"role": "assistant", "content": message.get("content") or "", "tool_calls": tool_calls})
+                    nudge = None
+                    if not parallel_calls.finished:
+                        nudge = check_progress(message.get("content"), tool_calls, results)
+                    if nudge and nudge != "stop":
+                        # Carried by the last tool message, so the turn keeps the assistant/tool shape
+                        results = results[:-1] + [f"{results[-1]}\n\n{nudge}"]
+                    for tool_call, result in zip(tool_calls, results):
+                        messages.append({"role": "tool", "tool_call_id": tool_call["id"], "content": result})
+                    if parallel_calls.finished:
+                        return run_result("finished", loop_count + 1)
+                    if nudge == "stop":
+                        return run_result("stalled", loop_count + 1)
+                    continue
+            except SystemExit:
+                # all_work_is_finished exits; end this run instead of the whole process
+                return run_result("finished", loop_count + 1)
+        
+            if tool_results:
+                emit("tools", turn=loop_count + 1, results=list(tool_results))
+            nudge = check_progress(message.get("content"), tool_calls, list(tool_results))
+            if nudge == "stop":
+                return run_result("stalled", loop_count + 1)
+        
+            if not tool_calls:
+                # No tool call - show assistant response and add to context
+                content = message.get("content") or "No response content"
+                # Streamed text was already rendered live
+                if not stream:
+                    render(Panel(content, title="🤖 Assistant Response", style="blue"))
+            
+                # Add descriptive message about no tool call to context
+                no_tool_message = (
+                    f"💭 Assistant provided a text response without calling any tools. "
+                    f"Response: '{content}'. If you need to use tools to complete the task, "
+                    f"please call the appropriate function. If the task is complete, "
+                    f"call 'all_work_is_finished' with is_finished=true.  When calling this tool make sure to use the 'tool_calls' format."
+                )
+                # A stalled run gets the monitor's sharper nudge instead (already rendered)
+                if nudge:
+                    tool_results.append(nudge)
+                else:
+                    tool_results.append(no_tool_message)
+                    render(f"[dim]{no_tool_message}[/dim]")
+            elif nudge:
+                tool_results.append(nudge)
+        
+            # Add results back to conversation
+            tool_response = "\n".join(tool_results)
+            messages.append({
+                "role": "user", 
+                "content": f"{tool_response}\n\nGiven this information, decide what to do next or call 'all_work_is_finished' if the task is complete."
+            })
+    
+    return run_result("max_loops", max_loops)
+
+def format_time_breakdown(snapshot: dict) -> str:
+    """One line showing where the time went, e.g. for telling a slow model from a slow tool."""
+    parts = [f"{name} {snapshot[name]['seconds']:.2f}s ({snapshot[name]['count']}x)"
+             for name in ("model_request", "decode", "tool", "render", "encode") if name in snapshot]
+    total = snapshot.get("turn", {}).get("seconds", 0.0)
+    return f"⏱ {total:.2f}s over {snapshot.get('turn', {}).get('count', 0)} turns: " + ", ".join(parts)
+
+def warm_up():
+    """Load everything that is otherwise deferred to first use.
+
+    Importing this module only pulls in what the first model request needs;
+    numpy, the Tavily client and the Rich widgets are imported by the code that
+    uses them. Long-lived processes (batch runs, servers) call this once up
+    front so the first turn does not pay for those imports.
+    """
+    import numpy  # noqa: F401
+    import tavily  # noqa: F401
+    from rich.progress import Progress  # noqa: F401
+    from rich.json import JSON  # noqa: F401
+    registry.schemas()
+    # Forked after the imports above, so the tool workers start with them loaded
+    tool_executor.start()
+
+
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description="AI Tool Assistant")
     parser.add_argument("-p", "--prompt", type=str, help="Initial prompt to send to the AI assistant")
+    parser.add_argument("--stream", action="store_true", default=MODEL_STREAM,
+                        help="Stream responses and dispatch tools as soon as their arguments are complete")
+    parser.add_argument("--parallel-tools", action="store_true", default=PARALLEL_TOOL_CALLS,
+                        help="Run every tool call in a response concurrently instead of only the first")
+    parser.add_argument("--context-budget", type=int, default=CONTEXT_TOKEN_BUDGET,
+                        help="Prompt token budget; older turns are compacted when it is exceeded (0 disables)")
+    parser.add_argument("--response-cache", choices=CACHE_MODES, default=RESPONSE_CACHE,
+                        help="Record model responses to disk, replay them offline, or both (readthrough)")
+    parser.add_argument("--trace", default=TRACE_FILE, help="Append timing spans to this JSONL file")
+    parser.add_argument("--metrics", default=TRACE_METRICS_FILE,
+                        help="Write a Prometheus-style metrics snapshot to this file when the run ends")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue an interrupted run from its last completed turn (see checkpoint.py)")
     args = parser.parse_args()
+    get_response_cache(args.response_cache)
+    get_tracer(args.trace)
+
+    print(f"Using model: {MODEL_NAME} from {MODEL_BASE_URL}")
+    # print the first 10 characters of the API key if it exists
+    if MODEL_API_KEY:
+        print(f"Using API key: {MODEL_API_KEY[:10]}... (truncated for security)")
     
     console.print(Panel("🤖 AI Tool Assistant", style="bold blue"))
     console.print("Available tools:", style="bold")
-    for tool in tool_list:
+    for tool in registry.functions.values():
         console.print(f"  • {tool.__name__}: {tool.__doc__}")
     
-    # Use provided prompt or ask user for input
-    if args.prompt:
+    # Resume a run, use provided prompt or ask user for input
+    if args.resume:
+        try:
+            state = load_run(args.resume)
+        except FileNotFoundError:
+            console.print(f"[red]No checkpoint found for run {args.resume}[/red]")
+            return
+        if state["status"]:
+            console.print(f"[yellow]Run {args.resume} already ended ({state['status']}); nothing to resume.[/yellow]")
+            return
+        user_input = state["task"]
+        console.print(f"\n[bold cyan]Resuming run {args.resume} at loop {state['turn'] + 1}:[/bold cyan] {user_input}")
+    elif args.prompt:
         user_input = args.prompt
         console.print(f"\n[bold cyan]Using provided prompt:[/bold cyan] {user_input}")
     else:
+        from rich.prompt import Prompt
         user_input = Prompt.ask("\n[bold cyan]What would you like me to help you with?[/bold cyan]")
     
-    messages = [
-        {"role": "system", "content": "You are helpful AI assistent that works in a loop. You can call tools when necessary. After thinking, return in valid tool calling format. Call 'all_work_is_finished' with is_finished=true when the task is complete.\n\nOnly call one tool per response/iteration of the loop."},
-        {"role": "user", "content": user_input}
-    ]
-    
-    max_loops = MAX_LOOP_COUNT
-    for loop_count in range(max_loops):
-        console.print(f"\n[dim]--- Loop {loop_count + 1}/{max_loops} ---[/dim]")
-        
-        payload = {
-            "model": MODEL_NAME,
-            "messages": messages,
-            "tools": tool_list_schema,
-            "tool_choice": "auto"
-        }
-        
-        # Make API call
-        resp_json = make_api_call(payload)
-        
-        # Show raw response in debug mode
-        if os.getenv("DEBUG"):
-            console.print(Panel(JSON.from_data(resp_json), title="Raw Response"))
-        
-        # Parse response
-        choice = resp_json.get("choices", [{}])[0]
-        message = choice.get("message", {})
-        tool_calls = message.get("tool_calls", [])
-        
-        # only allow 1 tool call per response
-        if len(tool_calls) > 1:
-            console.print("[red]⚠️ Multiple tool calls detected! Only the first will be processed.[/red]")
-            tool_calls = [tool_calls[0]]
-        
-        # Process tool calls or handle no tool call scenario
-        tool_results = []
-        
-        if not tool_calls:
-            # No tool call - show assistant response and add to context
-            content = message.get("content", "No response content")
-            console.print(Panel(content, title="🤖 Assistant Response", style="blue"))
-            
-            # Add descriptive message about no tool call to context
-            no_tool_message = (
-                f"💭 Assistant provided a text response without calling any tools. "
-                f"Response: '{content}'. If you need to use tools to complete the task, "
-                f"please call the appropriate function. If the task is complete, "
-                f"call 'all_work_is_finished' with is_finished=true.  When calling this tool make sure to use the 'tool_calls' format."
-            )
-            tool_results.append(no_tool_message)
-            console.print(f"[dim]{no_tool_message}[/dim]")
+    run_id = args.resume or uuid.uuid4().hex[:12]
+    try:
+        if args.resume:
+            # The run keeps the options it was started with
+            result = run_agent(user_input, run_id=run_id, checkpoint=True, restore=state, **state["options"])
         else:
-            # Process tool calls
-            for tool_call in tool_calls:
-                try:
-                    func_info = tool_call['function']
-                    tool_name = func_info['name']
-                    arguments = func_info['arguments']
-                    
-                    if isinstance(arguments, str):
-                        arguments = json.loads(arguments)
-                    
-                    console.print(f"🔧 Calling tool: [bold]{tool_name}[/bold] with {arguments}")
-                    result = call_tool(tool_name, arguments)
-                    tool_results.append(result)
-                    console.print(result)
-                    
-                except Exception as e:
-                    error_msg = f"❌ Error processing tool call: {str(e)}"
-                    tool_results.append(error_msg)
-                    console.print(error_msg, style="red")
-        
-        # Add results back to conversation
-        tool_response = "\n".join(tool_results)
-        messages.append({
-            "role": "user", 
-            "content": f"{tool_response}\n\nGiven this information, decide what to do next or call 'all_work_is_finished' if the task is complete."
-        })
-    
-    console.print(Panel("⚠️ Maximum loops reached. Exiting.", style="yellow"))
+            result = run_agent(user_input, stream=args.stream, parallel_tools=args.parallel_tools,
+                               context_budget=args.context_budget, run_id=run_id)
+    except BaseException:
+        if CHECKPOINT or args.resume:
+            console.print(f"\n[yellow]💾 Progress is saved; continue with: python main.py --resume {run_id}[/yellow]")
+        raise
+    finally:
+        if args.metrics:
+            tracer.write_metrics(args.metrics)
+    if result["status"] == "max_loops":
+        console.print(Panel("⚠️ Maximum loops reached. Exiting.", style="yellow"))
+    elif result["status"] == "stalled":
+        console.print(Panel(f"{result['partial'] or 'No result.'}",
+                            title=f"⚠️ Stopped early, {result['convergence']['turns_saved']} turns saved",
+                            style="yellow"))
+    console.print(f"[dim]{format_time_breakdown(tracer.snapshot())}[/dim]")
+    cache_stats = tool_cache.stats()
+    if cache_stats:
+        hits = sum(counts["hits"] for counts in cache_stats.values())
+        misses = sum(counts["misses"] for counts in cache_stats.values())
+        console.print(f"[dim]🗃 Tool cache: {hits} hits, {misses} misses[/dim]")
+    search_stats = get_search_cache().stats
+    if search_stats["exact"] or search_stats["similar"]:
+        console.print(f"[dim]🔎 Search cache: {search_stats['exact']} exact and {search_stats['similar']} "
+                      f"similar-query hits, {search_stats['misses']} misses[/dim]")
+    fallback = tool_call_parser.stats()
+    if fallback["recovered_turns"]:
+        console.print(f"[dim]🩹 Tool calls recovered from text in {fallback['recovered_turns']} of "
+                      f"{fallback['turns']} turns without tool_calls ({fallback['calls']} calls, "
+                      f"{fallback['repaired']} repaired)[/dim]")
+    replayed = result["checkpoint"] or {}
+    if replayed.get("replayed_responses") or replayed.get("replayed_tools"):
+        console.print(f"[dim]♻️ Resumed: {replayed['replayed_responses']} model responses and "
+                      f"{replayed['replayed_tools']} tool results replayed instead of redone[/dim]")
+    artifact_stats = artifacts.stats()
+    if artifact_stats["stored"]:
+        console.print(f"[dim]📦 Artifacts: {artifact_stats['stored']} stored, {artifact_stats['resolved']} passed by "
+                      f"handle, {artifact_stats['chars_out_of_prompt']} chars kept out of the prompt[/dim]")
 
 if __name__ == "__main__":
     try:
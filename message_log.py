@@ -0,0 +1,73 @@
+import json
+
+
+def encode_json(value) -> bytes:
+    """Encode a value as compact UTF-8 JSON."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode("utf-8")
+
+
+class MessageLog(list):
+    """A message history that remembers the encoded JSON of every message.
+
+    Messages are treated as immutable once appended: to change one, replace the
+    list entry with a new dict (as ContextManager.compact does). Each message
+    is then encoded exactly once, and building a request body only encodes the
+    messages added since the last turn.
+    """
+
+    def __init__(self, messages=()):
+        super().__init__(messages)
+        # id(message) -> (message, encoded); holding the message keeps its id from being reused
+        self._fragments = {}
+
+    def fragments(self) -> list:
+        """Return the encoded JSON of each message, encoding only the new or replaced ones."""
+        fragments = {}
+        for message in self:
+            cached = self._fragments.get(id(message))
+            if cached is None or cached[0] is not message:
+                cached = (message, encode_json(message))
+            fragments[id(message)] = cached
+        # Rebuilding the map also drops entries for replaced messages
+        self._fragments = fragments
+        return [fragments[id(message)][1] for message in self]
+
+    def encode(self) -> bytes:
+        return b"[" + b",".join(self.fragments()) + b"]"
+
+
+# id(value) -> (value, encoded) for large payload values reused across requests, such as the tool schemas
+_static_fragments = {}
+
+
+def encode_static(value) -> bytes:
+    """Encode a payload value that is the same object on every request, caching it by identity."""
+    cached = _static_fragments.get(id(value))
+    if cached is None or cached[0] is not value:
+        if len(_static_fragments) > 32:
+            _static_fragments.clear()
+        cached = (value, encode_json(value))
+        _static_fragments[id(value)] = cached
+    return cached[1]
+
+
+def encode_payload(payload: dict) -> bytes:
+    """Assemble a chat completions request body from cached fragments.
+
+    A MessageLog under "messages" contributes its cached message fragments and
+    the "tools" list is cached by identity; every other field is small and
+    encoded fresh.
+
+    Returns:
+        bytes: The UTF-8 JSON request body.
+    """
+    parts = []
+    for key, value in payload.items():
+        if key == "messages" and isinstance(value, MessageLog):
+            encoded = value.encode()
+        elif key == "tools":
+            encoded = encode_static(value)
+        else:
+            encoded = encode_json(value)
+        parts.append(encode_json(key) + b":" + encoded)
+    return b"{" + b",".join(parts) + b"}"
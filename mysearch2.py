@@ -1,15 +1,68 @@
 import os
+import json
+import contextvars
 import time
 import inspect
-from typing import get_origin, get_args
-from tavily import TavilyClient
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import get_origin, get_args, TYPE_CHECKING
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from context import get_token_counter
+from tool_executor import time_remaining
+from search_cache import cached_search
+from ranking import PassageRanker, RANK_TOP_K, RANK_CHAR_BUDGET
+
+if TYPE_CHECKING:
+    from tavily import TavilyClient
 
 # Load environment variables
 load_dotenv()
 
+# Maximum number of Tavily requests in flight at once for multi-query searches
+TAVILY_MAX_CONCURRENCY = int(os.getenv("TAVILY_MAX_CONCURRENCY", 4))
+# Token limit for the JSON context returned by context searches
+CONTEXT_MAX_TOKENS = int(os.getenv("TAVILY_CONTEXT_MAX_TOKENS", 4000))
+
+_tavily_client = None
+_tavily_client_key = None
+_tavily_client_lock = threading.Lock()
+
+
+def get_tavily_client() -> "TavilyClient":
+    """
+    Return the shared Tavily client, creating it on first use.
+    
+    The client keeps a pooled session, so repeated and concurrent searches reuse
+    connections instead of opening a new one per call. It is rebuilt only if
+    TAVILY_API_KEY or TAVILY_API_BASE_URL changes.
+    
+    Returns:
+        TavilyClient: The shared client
+    """
+    global _tavily_client, _tavily_client_key
+    
+    # Get API key from environment variable
+    api_key = os.getenv('TAVILY_API_KEY')
+    if not api_key:
+        raise ValueError("TAVILY_API_KEY environment variable not found. Please add it to your .env file.")
+    
+    base_url = os.getenv("TAVILY_API_BASE_URL")
+    with _tavily_client_lock:
+        if _tavily_client is None or _tavily_client_key != (api_key, base_url):
+            # tavily pulls in httpx and its async client; only pay for that once a search actually runs
+            from tavily import TavilyClient
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=TAVILY_MAX_CONCURRENCY, pool_maxsize=TAVILY_MAX_CONCURRENCY)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _tavily_client = TavilyClient(api_key=api_key, session=session, api_base_url=base_url)
+            _tavily_client_key = (api_key, base_url)
+        return _tavily_client
 
 
+@cached_search("tavily_search_and_scrape", cache_if=lambda result: "error" not in result)
 def tavily_search_and_scrape(
     query: str, 
     max_results: int = 3,
@@ -20,7 +73,9 @@ def tavily_search_and_scrape(
     topic: str = "general",
     time_range: str = None,
     include_domains: list = None,
-    exclude_domains: list = None
+    exclude_domains: list = None,
+    top_k: int = RANK_TOP_K,
+    char_budget: int = RANK_CHAR_BUDGET
 ):
     """
     Search using Tavily AI and extract content from results.
@@ -36,19 +91,18 @@ def tavily_search_and_scrape(
         time_range (str): Time filter - "day", "week", "month", "year" or None (default: None)
         include_domains (list): List of domains to specifically include (default: None)
         exclude_domains (list): List of domains to specifically exclude (default: None)
+        top_k (int): With raw content, return only this many of the most relevant
+            passages across all pages as "passages" instead of each page's
+            "raw_content"; 0 keeps the whole pages (default: RANK_TOP_K)
+        char_budget (int): Maximum characters across the returned passages (default: RANK_CHAR_BUDGET)
     
     Returns:
         dict: Dictionary containing search results, answer (if requested), and metadata
     """
     
-    # Get API key from environment variable
-    api_key = os.getenv('TAVILY_API_KEY')
-    if not api_key:
-        raise ValueError("TAVILY_API_KEY environment variable not found. Please add it to your .env file.")
-    
-    # Initialize Tavily client
+    # Get the shared Tavily client
     try:
-        tavily_client = TavilyClient(api_key=api_key)
+        tavily_client = get_tavily_client()
     except Exception as e:
         return {"error": f"Failed to initialize Tavily client: {str(e)}"}
     
@@ -77,6 +131,7 @@ def tavily_search_and_scrape(
         
         # Process results for easier consumption
         processed_results = []
+        ranker = PassageRanker(query) if include_raw_content and top_k else None
         
         if "results" in response:
             for result in response["results"]:
@@ -87,8 +142,10 @@ def tavily_search_and_scrape(
                     "score": result.get("score", 0.0)
                 }
                 
-                # Include raw content if available and requested
-                if include_raw_content and "raw_content" in result:
+                # Rank raw content into passages, or include it whole if requested
+                if ranker:
+                    ranker.add(result.get("raw_content") or "", processed_result["url"])
+                elif include_raw_content and "raw_content" in result:
                     processed_result["raw_content"] = result["raw_content"]
                 
                 processed_results.append(processed_result)
@@ -101,6 +158,9 @@ def tavily_search_and_scrape(
             "response_time": response.get("response_time", "N/A")
         }
         
+        if ranker:
+            final_response["passages"] = ranker.top(top_k, char_budget)
+        
         # Include answer if requested
         if include_answer and "answer" in response:
             final_response["answer"] = response["answer"]
@@ -126,26 +186,104 @@ def tavily_context_search(query: str, max_results: int = 5):
         str: Formatted context string ready for RAG applications
     """
     
-    # Get API key from environment variable
-    api_key = os.getenv('TAVILY_API_KEY')
-    if not api_key:
-        raise ValueError("TAVILY_API_KEY environment variable not found. Please add it to your .env file.")
+    tavily_client = get_tavily_client()
     
     try:
-        # Initialize Tavily client
-        tavily_client = TavilyClient(api_key=api_key)
-        
-        # Get search context (this is a specialized Tavily method for RAG)
-        context = tavily_client.get_search_context(
-            query=query,
-            max_results=max_results
-        )
-        
-        return context
-        
+        return _context_search(tavily_client, query, max_results)
     except Exception as e:
         return f"Context search failed: {str(e)}"
 
+# Failed searches raise, so whatever comes back is worth caching
+@cached_search("tavily_context", exclude=("tavily_client",))
+def _context_search(tavily_client: "TavilyClient", query: str, max_results: int,
+                    max_tokens: int = CONTEXT_MAX_TOKENS) -> str:
+    # Same output as TavilyClient.get_search_context, which is deprecated and
+    # downloads a tiktoken encoding on first use; tokens are counted with the
+    # agent's own counter instead
+    # Inside a tool call with a deadline, the request gives up when the call does (Tavily's default is 60s)
+    remaining = time_remaining()
+    response = tavily_client.search(query=query, max_results=max_results, include_answer=False,
+                                    include_raw_content=False, include_images=False,
+                                    timeout=60 if remaining is None else max(remaining, 0.1))
+    count_tokens = get_token_counter()
+    context, used = [], 0
+    for source in response.get("results", []):
+        item = {"url": source["url"], "content": source["content"]}
+        used += count_tokens(json.dumps(item))
+        if used > max_tokens:
+            break
+        context.append(item)
+    return json.dumps(context)
+
+def tavily_multi_search(queries: list[str], max_results: int = 5):
+    """
+    Search several queries at the same time using Tavily. Use this to research multiple subtopics in one step.
+    
+    Args:
+        queries (list[str]): Search queries
+        max_results (int): Maximum number of results to include in each query's context
+    
+    Returns:
+        list: One dict per query, in the same order, with "query" and either "context" or "error"
+    """
+    return search_many(queries, max_results=max_results)
+
+def search_many(queries: list, max_results: int = 5, max_concurrency: int = None, search=None) -> list:
+    """
+    Run many searches concurrently, collecting a result or error for each.
+    
+    A failing query never aborts the others.
+    
+    Args:
+        queries (list): Search queries
+        max_results (int): Maximum number of results per query
+        max_concurrency (int): Maximum searches in flight at once (default: TAVILY_MAX_CONCURRENCY)
+        search (callable): search(client, query, max_results) returning the result (default: context search)
+    
+    Returns:
+        list: One dict per query, in the same order, with "query" and either "context" or "error"
+    """
+    if isinstance(queries, str):
+        queries = [queries]
+    if not queries:
+        return []
+    
+    tavily_client = get_tavily_client()
+    search = search or _context_search
+    max_concurrency = max_concurrency or TAVILY_MAX_CONCURRENCY
+    
+    def run(query):
+        try:
+            return {"query": query, "context": search(tavily_client, query, max_results)}
+        except Exception as e:
+            return {"query": query, "error": f"Search failed: {str(e)}"}
+    
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(queries))) as pool:
+        # Each search runs in a copy of the caller's context, which carries the tool call's deadline
+        futures = [pool.submit(contextvars.copy_context().run, run, query) for query in queries]
+        return [future.result() for future in futures]
+
+def search_succeeded(result) -> bool:
+    """
+    Whether a search tool's result is a real answer rather than a reported failure.
+    
+    The search tools return their errors instead of raising, so result caches
+    use this to decide what is safe to keep.
+    
+    Args:
+        result: What a search tool returned
+    
+    Returns:
+        bool: False if the result, or any per-query result in it, is an error
+    """
+    if isinstance(result, str):
+        return not result.startswith(("Context search failed", "Q&A search failed"))
+    if isinstance(result, dict):
+        return "error" not in result
+    if isinstance(result, list):
+        return all(search_succeeded(item) for item in result)
+    return True
+
 def tavily_qna_search(query: str):
     """
     Get a direct answer to a question using Tavily's Q&A search.
@@ -157,15 +295,9 @@ def tavily_qna_search(query: str):
         str: Direct answer to the question
     """
     
-    # Get API key from environment variable
-    api_key = os.getenv('TAVILY_API_KEY')
-    if not api_key:
-        raise ValueError("TAVILY_API_KEY environment variable not found. Please add it to your .env file.")
+    tavily_client = get_tavily_client()
     
     try:
-        # Initialize Tavily client
-        tavily_client = TavilyClient(api_key=api_key)
-        
         # Get direct answer
         answer = tavily_client.qna_search(query=query)
         
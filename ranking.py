@@ -0,0 +1,191 @@
+import os
+import re
+import threading
+
+from search_cache import query_words
+
+# Passages returned per search, and the characters they may add up to
+RANK_TOP_K = int(os.getenv("RANK_TOP_K", 5))
+RANK_CHAR_BUDGET = int(os.getenv("RANK_CHAR_BUDGET", 4000))
+RANK_CHUNK_CHARS = int(os.getenv("RANK_CHUNK_CHARS", 800))
+# Standard BM25 parameters: term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_SPACE_RE = re.compile(r"\s*")
+
+
+def chunk_spans(text: str, size: int = RANK_CHUNK_CHARS) -> list:
+    """(start, end) offsets of passages of at most `size` characters.
+
+    Each passage is cut at the last paragraph break in the second half of its
+    window, else at the last sentence end, else at the last space, so short
+    paragraphs are packed together and long ones split between sentences.
+    """
+    spans, n, size = [], len(text), max(1, size)
+    start = _SPACE_RE.match(text, 0).end()
+    while start < n:
+        end = start + size
+        if end >= n:
+            spans.append((start, len(text.rstrip())))
+            break
+        half = start + size // 2
+        cut = text.rfind("\n", half, end)
+        if cut == -1:
+            cut = max(text.rfind(". ", half, end), text.rfind("? ", half, end), text.rfind("! ", half, end))
+            cut = cut + 1 if cut != -1 else text.rfind(" ", half, end)
+        if cut == -1:
+            cut = end
+        spans.append((start, cut))
+        start = _SPACE_RE.match(text, cut).end()
+    return spans
+
+
+def split_chunks(text: str, size: int = RANK_CHUNK_CHARS) -> list:
+    """Split text into passages of at most `size` characters (see `chunk_spans`)."""
+    return [text[start:end].strip() for start, end in chunk_spans(text, size)]
+
+
+class PassageRanker:
+    """Ranks passages of fetched pages against a query with BM25, keeping only the best.
+
+    Pages are added one at a time as they arrive, so chunking and counting
+    overlap with downloads still in flight. Each query term (singular or
+    plural, any case) is found with one regex scan of the page, and the
+    matches are assigned to passages with `searchsorted`. Only the
+    (passage, term) coordinates of the matches are kept: the non-zero
+    entries of the passage-term matrix, restricted to the query's terms.
+    `top` builds the count matrix from them with one `bincount` and scores
+    every passage at once.
+
+    Args:
+        query: The search query; its words, minus stopwords, are the terms.
+        chunk_chars: Longest passage in characters.
+        k1: BM25 term-frequency saturation.
+        b: BM25 length normalization.
+    """
+
+    def __init__(self, query: str, chunk_chars: int = RANK_CHUNK_CHARS, k1: float = BM25_K1, b: float = BM25_B):
+        self.terms = list(dict.fromkeys(query_words(query)))
+        self.chunk_chars = chunk_chars
+        self.k1 = k1
+        self.b = b
+        # A literal at the front lets the regex engine skip ahead to candidates; the word start is checked after
+        self._patterns = [re.compile(re.escape(term) + r"s?\b") for term in self.terms]
+        self._pages = []
+        self._spans = []
+        self._lengths = []
+        self._rows = []
+        self._cols = []
+        self._lock = threading.Lock()
+
+    def add(self, text: str, url: str = "") -> int:
+        """Chunk a page and count the query terms in each passage.
+
+        Returns:
+            int: The number of passages the page was split into.
+        """
+        import numpy as np
+        spans = chunk_spans(text or "", self.chunk_chars)
+        if not spans:
+            return 0
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters lowercase to two; keep offsets aligned with the original text
+            lowered = "".join(c.lower()[0] for c in text)
+        hits = []
+        for column, pattern in enumerate(self._patterns):
+            positions = [p for p in (m.start() for m in pattern.finditer(lowered))
+                         if p == 0 or not lowered[p - 1].isalnum()]
+            if positions:
+                hits.append((np.array(positions, dtype=np.int64), np.full(len(positions), column, dtype=np.int64)))
+        # Words are separated by spaces or newlines; counting them needs no copy of the text
+        lengths = [text.count(" ", s, e) + text.count("\n", s, e) + 1 for s, e in spans]
+        with self._lock:
+            first = len(self._spans)
+            page = len(self._pages)
+            self._pages.append((url, text))
+            self._spans.extend((page, s, e) for s, e in spans)
+            self._lengths.extend(lengths)
+            if hits:
+                positions, columns = (np.concatenate(arrays) for arrays in zip(*hits))
+                starts = np.fromiter((s for s, _ in spans), dtype=np.int64, count=len(spans))
+                self._rows.append(np.searchsorted(starts, positions, side="right") - 1 + first)
+                self._cols.append(columns)
+        return len(spans)
+
+    def scores(self):
+        """BM25 score of every passage added so far, in the order they were added."""
+        import numpy as np
+        with self._lock:
+            n, t = len(self._lengths), len(self.terms)
+            if not n or not self._rows:
+                return np.zeros(n, dtype=np.float32)
+            rows, cols = np.concatenate(self._rows), np.concatenate(self._cols)
+            lengths = np.asarray(self._lengths, dtype=np.float32)
+        tf = np.bincount(rows * t + cols, minlength=n * t).reshape(n, t).astype(np.float32)
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / lengths.mean())
+        return (tf * (self.k1 + 1) / (tf + norm[:, None])) @ idf
+
+    def top(self, k: int = RANK_TOP_K, char_budget: int = RANK_CHAR_BUDGET) -> list:
+        """The best passages, highest score first, within a character budget.
+
+        Passages are taken in score order, skipping any that would overflow
+        the budget; the best one is always returned, cut to the budget if it
+        has to be. When no passage mentions the query, the opening passages
+        are returned instead, so a page never comes back empty.
+
+        Returns:
+            list: Dictionaries with 'url', 'text' and 'score' keys.
+        """
+        import numpy as np
+        scores = self.scores()
+        if not len(scores) or k <= 0:
+            return []
+        if scores.max() > 0:
+            order = np.argsort(-scores, kind="stable")
+            order = order[scores[order] > 0]
+        else:
+            order = np.arange(len(scores))
+
+        passages, used = [], 0
+        for i in order:
+            if len(passages) >= k or used >= char_budget:
+                break
+            page, start, end = self._spans[i]
+            url, text = self._pages[page]
+            text = text[start:end].strip()
+            if used + len(text) > char_budget:
+                if passages:
+                    continue
+                text = text[:char_budget]
+            passages.append({"url": url, "text": text, "score": round(float(scores[i]), 4)})
+            used += len(text)
+        return passages
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._spans)
+
+
+def rank_passages(query: str, documents, top_k: int = RANK_TOP_K, char_budget: int = RANK_CHAR_BUDGET,
+                  chunk_chars: int = RANK_CHUNK_CHARS) -> list:
+    """Rank the passages of some documents against a query (see `PassageRanker`).
+
+    Args:
+        query: The search query.
+        documents: Dictionaries with 'url' and 'text' keys, or (url, text) pairs.
+        top_k: Most passages returned.
+        char_budget: Most characters returned across all passages.
+        chunk_chars: Longest passage in characters.
+
+    Returns:
+        list: Dictionaries with 'url', 'text' and 'score' keys, best first.
+    """
+    ranker = PassageRanker(query, chunk_chars)
+    for document in documents:
+        url, text = (document["url"], document["text"]) if isinstance(document, dict) else document
+        ranker.add(text, url)
+    return ranker.top(top_k, char_budget)
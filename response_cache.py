@@ -0,0 +1,206 @@
+import os
+import json
+import hashlib
+import threading
+from message_log import MessageLog, encode_json, encode_static
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "off")
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", os.path.join(_HERE, ".cache", "responses"))
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", 256))
+
+CACHE_MODES = ("off", "record", "replay", "readthrough")
+# The parts of a request that decide the response; everything else (stream, etc.) is ignored
+KEY_FIELDS = ("model", "messages", "tools", "tool_choice")
+
+
+class ResponseCacheMiss(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def request_key(payload: dict) -> str:
+    """Content hash of a chat completions request.
+
+    Hashes the KEY_FIELDS in a fixed order, so the payload's key order does
+    not matter. The JSON is the same as the request body's: a MessageLog
+    reuses the fragments it already encoded for earlier turns and the tools
+    list is cached by identity, so only new messages are encoded each turn.
+    """
+    digest = hashlib.sha256()
+    for field in KEY_FIELDS:
+        value = payload.get(field)
+        if field == "messages" and isinstance(value, MessageLog):
+            encoded = value.encode()
+        elif field == "tools" and value is not None:
+            encoded = encode_static(value)
+        else:
+            encoded = encode_json(value)
+        digest.update(encode_json(field) + b":" + encoded + b",")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Content-addressed, on-disk cache of model responses.
+
+    Each response is stored in its own file named by the request hash, written
+    atomically, so several processes can share one directory. Hits refresh the
+    file's mtime and eviction removes the least recently used files once the
+    directory grows past `max_bytes`.
+
+    Modes:
+        record: always call the model and store the response.
+        replay: only serve stored responses; a miss raises ResponseCacheMiss.
+        readthrough: serve stored responses and call the model on a miss.
+
+    Args:
+        directory: Directory holding the cached responses.
+        mode: One of "record", "replay" or "readthrough".
+        max_bytes: Size the directory is kept under (0 disables eviction).
+    """
+
+    def __init__(self, directory: str = RESPONSE_CACHE_DIR, mode: str = "readthrough",
+                 max_bytes: int = int(RESPONSE_CACHE_MAX_MB * 1024 * 1024)):
+        if mode not in CACHE_MODES or mode == "off":
+            raise ValueError(f"Unknown response cache mode '{mode}'. Choose from record, replay, readthrough")
+        self.directory = directory
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        # Bytes written since the directory size was last measured; None until the first measurement
+        self._written = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self.stats[stat] += n
+
+    def get(self, payload: dict):
+        """Return the stored response for a request, or None."""
+        path = self._path(request_key(payload))
+        try:
+            with open(path, encoding="utf-8") as f:
+                response = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            # Missing, evicted by another process mid-read, or a torn file from a crash
+            self._count("misses")
+            return None
+        self._count("hits")
+        return response
+
+    def put(self, payload: dict, response: dict):
+        """Store the response for a request."""
+        path = self._path(request_key(payload))
+        data = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self._count("stores")
+        self._maybe_evict(len(data))
+
+    def fetch(self, payload: dict, call):
+        """Return the response for a request, calling `call()` for it as the mode allows.
+
+        Only successful responses, ones with `choices`, are stored; anything
+        else (an error body) is returned to the caller without being cached.
+
+        Args:
+            payload: The chat completions request.
+            call: Function making the real model request and returning the response dict.
+        """
+        if self.mode != "record":
+            response = self.get(payload)
+            if response is not None:
+                return response
+            if self.mode == "replay":
+                raise ResponseCacheMiss(f"No recorded response for request {request_key(payload)[:12]} "
+                                        f"in {self.directory}")
+        response = call()
+        if isinstance(response, dict) and response.get("choices"):
+            self.put(payload, response)
+        return response
+
+    def _maybe_evict(self, written: int):
+        if not self.max_bytes:
+            return
+        with self._lock:
+            # Measuring the directory means a full scan, so it is only redone
+            # after a tenth of the budget has been written since the last one
+            if self._written is not None:
+                self._written += written
+                if self._written < self.max_bytes // 10:
+                    return
+            self._written = 0
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete the least recently used responses until the cache fits in `max_bytes`.
+
+        Returns:
+            int: Bytes currently used after eviction.
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if not self.max_bytes or total <= self.max_bytes:
+            return total
+        # Evict down to 90% so the next few writes do not trigger another scan
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Another process evicted it first
+                pass
+            total -= size
+            self._count("evictions")
+        return total
+
+
+_cache = None
+_cache_mode = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache(mode: str = None):
+    """Return the shared response cache, or None when caching is off.
+
+    Environment variables:
+        RESPONSE_CACHE: off (default), record, replay or readthrough
+        RESPONSE_CACHE_DIR: Cache directory (default: .cache/responses)
+        RESPONSE_CACHE_MAX_MB: Size limit before old responses are evicted (default: 256)
+
+    Args:
+        mode: Switch the shared cache to this mode instead of using the current
+            one (RESPONSE_CACHE until first switched).
+    """
+    global _cache, _cache_mode
+    with _cache_lock:
+        if mode is None:
+            mode = _cache_mode or RESPONSE_CACHE
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown response cache mode '{mode}'. Choose from {', '.join(CACHE_MODES)}")
+        if mode != _cache_mode:
+            _cache = None if mode == "off" else ResponseCache(mode=mode)
+            _cache_mode = mode
+        return _cache
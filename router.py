@@ -0,0 +1,280 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from transport import get_transport, _env_flag
+
+MODEL_HEDGE = _env_flag("MODEL_HEDGE")
+MODEL_HEDGE_MIN_SAMPLES = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", 20))
+MODEL_RETRIES = int(os.getenv("MODEL_RETRIES", 2))
+MODEL_RETRY_BACKOFF = float(os.getenv("MODEL_RETRY_BACKOFF", 0.25))
+MODEL_BREAKER_FAILURES = int(os.getenv("MODEL_BREAKER_FAILURES", 3))
+MODEL_BREAKER_COOLDOWN = float(os.getenv("MODEL_BREAKER_COOLDOWN", 30))
+MODEL_EWMA_ALPHA = float(os.getenv("MODEL_EWMA_ALPHA", 0.3))
+
+# Responses worth retrying on another endpoint: overloaded or briefly broken servers
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_endpoints(value: str) -> list:
+    """Split a comma-separated MODEL_BASE_URL into endpoint URLs."""
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+class Endpoint:
+    """Latency and health of one model endpoint."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ewma = None
+        self.in_flight = 0
+        self.latencies = deque(maxlen=200)
+        self.failures = 0
+        self.open_until = 0.0
+        # A request is out probing the endpoint after its cooldown
+        self.probing = False
+        self.requests = 0
+        self.errors = 0
+
+    def score(self) -> tuple:
+        # Failures only matter through the breaker, which keeps ejected endpoints out of the running.
+        # Endpoints without a measurement yet score 0, so each gets tried early.
+        return ((self.ewma or 0.0) * (self.in_flight + 1), self.in_flight)
+
+    def p95(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class ModelRouter:
+    """Spreads model requests over several OpenAI-compatible endpoints.
+
+    Each request goes to the endpoint with the lowest moving-average latency
+    weighted by its requests in flight. Connection errors, timeouts and
+    overload responses (RETRYABLE_STATUS) are retried at once on another
+    endpoint, or with exponential backoff when every endpoint has failed.
+    An endpoint that fails `failure_threshold` times in a row is ejected for
+    `cooldown` seconds; after that one request at a time is let through to
+    probe it, and it is back in the running once a probe succeeds.
+    When every endpoint is ejected, the one due back soonest is used rather
+    than failing outright.
+
+    With hedging on, a non-streaming request that has not answered within the
+    endpoint's p95 latency is sent again to the next best endpoint, and the
+    first answer wins. Hedging starts once `hedge_min_samples` latencies have
+    been seen.
+
+    Args:
+        urls: Endpoint URLs.
+        hedge: Send hedged duplicates of slow requests.
+        retries: Extra attempts after the first one fails.
+        backoff: Base delay in seconds before a retry, doubled every attempt.
+        failure_threshold: Consecutive failures that eject an endpoint.
+        cooldown: Seconds an ejected endpoint is skipped.
+        hedge_min_samples: Latency samples needed before hedging an endpoint.
+        transport: ModelTransport to send requests with (default: the shared one).
+    """
+
+    def __init__(self, urls: list, hedge: bool = MODEL_HEDGE, retries: int = MODEL_RETRIES,
+                 backoff: float = MODEL_RETRY_BACKOFF, failure_threshold: int = MODEL_BREAKER_FAILURES,
+                 cooldown: float = MODEL_BREAKER_COOLDOWN, hedge_min_samples: int = MODEL_HEDGE_MIN_SAMPLES,
+                 transport=None):
+        if not urls:
+            raise ValueError("ModelRouter needs at least one endpoint URL")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.hedge = hedge
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_min_samples = hedge_min_samples
+        self.transport = transport or get_transport()
+        self.stats = {"retries": 0, "hedges": 0, "hedge_wins": 0, "ejections": 0}
+        self._lock = threading.Lock()
+        self._hedge_pool = None
+
+        errors = (requests.ConnectionError, requests.Timeout)
+        if getattr(self.transport, "http2", False):
+            import httpx
+            errors += (httpx.TransportError,)
+        self._transport_errors = errors
+
+    def choose(self, exclude=()) -> Endpoint:
+        """Pick the endpoint for the next request and count it as in flight."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+            # Past its cooldown an ejected endpoint is half-open: it takes a single probe at a time
+            healthy = [e for e in candidates if e.open_until <= now
+                       and not (e.failures >= self.failure_threshold and e.probing)]
+            if healthy:
+                endpoint = min(healthy, key=Endpoint.score)
+                if endpoint.failures >= self.failure_threshold:
+                    endpoint.probing = True
+            else:
+                endpoint = min(candidates, key=lambda e: e.open_until)
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _finish(self, endpoint: Endpoint, latency: float = None):
+        """Record how a request ended: with its latency on success, or as a failure."""
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.probing = False
+            if latency is not None:
+                endpoint.failures = 0
+                endpoint.open_until = 0.0
+                endpoint.latencies.append(latency)
+                endpoint.ewma = latency if endpoint.ewma is None else \
+                    MODEL_EWMA_ALPHA * latency + (1 - MODEL_EWMA_ALPHA) * endpoint.ewma
+                return
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.failures >= self.failure_threshold:
+                if endpoint.open_until <= time.monotonic():
+                    self.stats["ejections"] += 1
+                endpoint.open_until = time.monotonic() + self.cooldown
+
+    def _send(self, endpoint: Endpoint, headers, json, data, stream: bool):
+        start = time.perf_counter()
+        try:
+            response = self.transport.post(endpoint.url, headers=headers, json=json, data=data, stream=stream)
+        except self._transport_errors:
+            self._finish(endpoint)
+            raise
+        if response.status_code in RETRYABLE_STATUS:
+            self._finish(endpoint)
+            raise _RetryableStatus(response)
+        if not stream:
+            self._finish(endpoint, time.perf_counter() - start)
+            return response
+
+        # A stream stays in flight until the caller closes it; its latency is the time to the headers
+        latency = time.perf_counter() - start
+        close = response.close
+        released = []
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    self._finish(endpoint, latency)
+
+        response.close = close_and_release
+        return response
+
+    def _hedged_send(self, primary: Endpoint, headers, json, data):
+        delay = primary.p95() if len(primary.latencies) >= self.hedge_min_samples else None
+        if delay is None:
+            return self._send(primary, headers, json, data, False)
+
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+        first = self._hedge_pool.submit(self._send, primary, headers, json, data, False)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        backup = self.choose(exclude=(primary,))
+        with self._lock:
+            self.stats["hedges"] += 1
+        second = self._hedge_pool.submit(self._send, backup, headers, json, data, False)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if future is second:
+                    with self._lock:
+                        self.stats["hedge_wins"] += 1
+                # The slower duplicate is left to finish in the background and then discarded
+                for other in pending:
+                    other.add_done_callback(lambda f: f.exception() or f.result().close())
+                return response
+        raise error
+
+    def post(self, headers: dict = None, json: dict = None, data: bytes = None, stream: bool = False):
+        """Send a chat completions request to the best endpoint, retrying failures elsewhere.
+
+        Returns:
+            The response. When every attempt got an overload status, the last
+            such response is returned so the caller sees the server's error.
+        """
+        tried = []
+        last_error = None
+        for attempt in range(self.retries + 1):
+            endpoint = self.choose(exclude=tried)
+            if attempt:
+                with self._lock:
+                    self.stats["retries"] += 1
+                # Moving on to an untried endpoint needs no wait; going back to a failed one does
+                if endpoint in tried:
+                    time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            try:
+                if self.hedge and not stream and len(self.endpoints) > 1:
+                    return self._hedged_send(endpoint, headers, json, data)
+                return self._send(endpoint, headers, json, data, stream)
+            except _RetryableStatus as e:
+                last_error = e
+                if attempt < self.retries:
+                    e.response.close()
+            except self._transport_errors as e:
+                last_error = e
+            tried.append(endpoint)
+
+        if isinstance(last_error, _RetryableStatus):
+            return last_error.response
+        raise last_error
+
+    def snapshot(self) -> list:
+        """Per-endpoint state: latency average and p95, requests in flight, errors and ejection."""
+        with self._lock:
+            now = time.monotonic()
+            return [{"url": e.url, "ewma": e.ewma, "p95": e.p95(), "in_flight": e.in_flight,
+                     "requests": e.requests, "errors": e.errors, "ejected": e.open_until > now}
+                    for e in self.endpoints]
+
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(base_url: str) -> ModelRouter:
+    """Return the shared router for a MODEL_BASE_URL value (one or more comma-separated endpoints).
+
+    Environment variables:
+        MODEL_HEDGE: Set to 1 to hedge slow requests (default: off)
+        MODEL_HEDGE_MIN_SAMPLES: Latencies seen before hedging starts (default: 20)
+        MODEL_RETRIES: Retries after a failed attempt (default: 2)
+        MODEL_RETRY_BACKOFF: Base retry delay in seconds (default: 0.25)
+        MODEL_BREAKER_FAILURES: Consecutive failures that eject an endpoint (default: 3)
+        MODEL_BREAKER_COOLDOWN: Seconds an ejected endpoint is skipped (default: 30)
+        MODEL_EWMA_ALPHA: Weight of the newest latency in the moving average (default: 0.3)
+    """
+    router = _routers.get(base_url)
+    if router is None:
+        with _routers_lock:
+            router = _routers.get(base_url)
+            if router is None:
+                router = _routers[base_url] = ModelRouter(parse_endpoints(base_url))
+    return router
@@ -0,0 +1,317 @@
+import os
+import re
+import json
+import time
+import zlib
+import inspect
+import hashlib
+import threading
+import functools
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+SEARCH_CACHE = os.getenv("SEARCH_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", os.path.join(_HERE, ".cache", "search"))
+SEARCH_CACHE_THRESHOLD = float(os.getenv("SEARCH_CACHE_THRESHOLD", 0.85))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 86400))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 2000))
+# Width of the hashed query vectors
+EMBEDDING_DIM = 512
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("a an and are as at be by for from how in is it of on or the to what when where which who "
+                      "why with about into near".split())
+# Words that change what a query asks for: embedded as features of their own rather than dropped
+QUESTION_WORDS = frozenset("who what when where why how which".split())
+DIRECTION_WORDS = frozenset("from to into".split())
+# Weight of those features next to a word's own (1.0)
+INTENT_WEIGHT = 2.0
+
+
+def _stem(word: str) -> str:
+    # Just enough stemming to match plurals: turtles -> turtle, but not glass -> glas
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def query_words(query: str) -> list:
+    """Lowercased, singular words of a query without stopwords, sorted so word order does not matter."""
+    return sorted(_stem(w) for w in _WORD_RE.findall(query.lower()) if w not in STOPWORDS)
+
+
+def exact_key(query: str) -> str:
+    """The query lowercased with its whitespace collapsed."""
+    return " ".join(query.lower().split())
+
+
+def _intent_features(query: str) -> list:
+    # Question words, and direction words tied to the word they point at, so
+    # "where ..." stays apart from "when ..." and "from Paris to London" from "from London to Paris"
+    tokens = _WORD_RE.findall(query.lower())
+    features = []
+    for i, word in enumerate(tokens):
+        if word in QUESTION_WORDS:
+            features.append((f"q:{word}", INTENT_WEIGHT))
+        elif word in DIRECTION_WORDS and i + 1 < len(tokens):
+            features.append((f"d:{word}>{_stem(tokens[i + 1])}", INTENT_WEIGHT))
+    return features
+
+
+def embed(queries: list, dim: int = EMBEDDING_DIM):
+    """Embed queries as L2-normalized hashed n-gram vectors.
+
+    Each word and each character trigram of a word (padded with '#') is
+    hashed to a signed position, as are question words and each direction
+    word paired with the word after it. Queries sharing most of their words, or
+    differing only in word order, plurals or stopwords, point the same way;
+    queries asking a different question or going the other way do not.
+
+    Returns:
+        numpy.ndarray: float32 array of shape (len(queries), dim)
+    """
+    import numpy as np
+    vectors = np.zeros((len(queries), dim), dtype=np.float32)
+    for row, query in enumerate(queries):
+        features = _intent_features(query)
+        for word in query_words(query):
+            padded = f"#{word}#"
+            features += [(f"w:{word}", 1.0)] + [(padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+        for feature, weight in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vectors[row, h % dim] += weight if h & 0x80000000 else -weight
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _scope(namespace: str, params: dict) -> str:
+    # Results are only shared between calls with the same options (max_results, depth, ...)
+    canonical = json.dumps([namespace, params], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class SearchCache:
+    """Caches search results by query, matching near-identical queries as well as exact ones.
+
+    The exact tier matches the query lowercased with its whitespace
+    collapsed. The similarity tier embeds queries with `embed`
+    and finds the nearest cached query by cosine similarity over a NumPy
+    matrix; it is a hit at `threshold` or above, as long as neither query has
+    a word the other lacks (stopwords aside). A word more or less usually
+    asks something else: "new mexico turtles" never matches "mexico turtles",
+    nor "python 3.11" "python 3.12". Only calls with identical options share
+    results.
+
+    Entries expire after `ttl` seconds; past `max_entries` the least recently
+    used are dropped. The index is saved to `directory` after every insert:
+    the vectors as a .npy file, memory-mapped when loaded, and the entries as
+    JSON.
+
+    Args:
+        directory: Where the index is kept ("" keeps it in memory only).
+        threshold: Cosine similarity needed for a match between different queries.
+        ttl: Seconds a result is served for.
+        max_entries: Entries kept.
+    """
+
+    def __init__(self, directory: str = SEARCH_CACHE_DIR, threshold: float = SEARCH_CACHE_THRESHOLD,
+                 ttl: float = SEARCH_CACHE_TTL, max_entries: int = SEARCH_CACHE_SIZE):
+        self.directory = directory
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {"exact": 0, "similar": 0, "misses": 0}
+        self._entries = None
+        self._vectors = None
+        self._exact = {}
+        self._lock = threading.Lock()
+
+    def _paths(self) -> tuple:
+        return os.path.join(self.directory, "vectors.npy"), os.path.join(self.directory, "entries.json")
+
+    def _load(self):
+        # Called with the lock held
+        import numpy as np
+        self._entries, self._vectors = [], np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        if self.directory:
+            vectors_path, entries_path = self._paths()
+            try:
+                with open(entries_path, encoding="utf-8") as f:
+                    entries = json.load(f)
+                vectors = np.load(vectors_path, mmap_mode="r")
+                if vectors.shape == (len(entries), EMBEDDING_DIM):
+                    self._entries, self._vectors = entries, vectors
+            except (OSError, ValueError):
+                pass
+        self._reindex()
+        self._drop(lambda entry: entry["expires"] <= time.time())
+
+    def _reindex(self):
+        self._exact = {(e["scope"], e["key"]): i for i, e in enumerate(self._entries)}
+
+    def _drop(self, condition) -> bool:
+        keep = [i for i, entry in enumerate(self._entries) if not condition(entry)]
+        if len(keep) == len(self._entries):
+            return False
+        self._entries = [self._entries[i] for i in keep]
+        # Indexing copies, so a memory-mapped matrix is never written to
+        self._vectors = self._vectors[keep]
+        self._reindex()
+        return True
+
+    def _save(self):
+        # Called with the lock held
+        import numpy as np
+        if not self.directory:
+            return
+        vectors_path, entries_path = self._paths()
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(vectors_path + suffix, "wb") as f:
+                np.save(f, np.ascontiguousarray(self._vectors))
+            with open(entries_path + suffix, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            # Entries last: a reader that sees them finds vectors with as many rows, or rejects the pair
+            os.replace(vectors_path + suffix, vectors_path)
+            os.replace(entries_path + suffix, entries_path)
+        except (TypeError, ValueError, OSError):
+            for path in (vectors_path + suffix, entries_path + suffix):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def get(self, namespace: str, query: str, params: dict = None) -> tuple:
+        """Look up a result.
+
+        Returns:
+            tuple: (result, "exact" or "similar"), or (None, None) on a miss.
+        """
+        import numpy as np
+        scope = _scope(namespace, params or {})
+        words = query_words(query)
+        now = time.time()
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            index = self._exact.get((scope, exact_key(query)))
+            kind = "exact"
+            if index is None and len(self._entries):
+                scores = np.asarray(self._vectors @ embed([query])[0])
+                for candidate in np.argsort(-scores):
+                    if scores[candidate] < self.threshold:
+                        break
+                    entry = self._entries[candidate]
+                    # Indexes written before entries kept their words fall back to the query
+                    cached_words = entry["words"] if "words" in entry else query_words(entry["query"])
+                    if entry["scope"] == scope and set(cached_words) == set(words):
+                        index, kind = int(candidate), "similar"
+                        break
+            if index is not None and self._entries[index]["expires"] <= now:
+                self._drop(lambda entry: entry["expires"] <= now)
+                index = None
+            if index is None:
+                self.stats["misses"] += 1
+                return None, None
+            entry = self._entries[index]
+            entry["used"] = now
+            self.stats[kind] += 1
+            return entry["result"], kind
+
+    def put(self, namespace: str, query: str, params: dict, result):
+        """Store a result, replacing one cached for the same normalized query."""
+        import numpy as np
+        scope = _scope(namespace, params or {})
+        words = query_words(query)
+        key = exact_key(query)
+        now = time.time()
+        vector = embed([query])
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            self._drop(lambda entry: (entry["scope"], entry["key"]) == (scope, key) or entry["expires"] <= now)
+            self._entries.append({"scope": scope, "key": key, "query": query, "created": now, "used": now,
+                                  "expires": now + self.ttl, "result": result, "words": words})
+            self._vectors = np.concatenate([self._vectors, vector])
+            if len(self._entries) > self.max_entries:
+                by_use = sorted(range(len(self._entries)), key=lambda i: self._entries[i]["used"])
+                stale = {id(self._entries[i]) for i in by_use[:len(self._entries) - self.max_entries]}
+                self._drop(lambda entry: id(entry) in stale)
+            self._reindex()
+            self._save()
+
+    def call(self, namespace: str, query: str, params: dict, compute, cache_if=None) -> tuple:
+        """Return a cached result for the query, running `compute()` on a miss.
+
+        Returns:
+            tuple: (result, "exact", "similar" or None for a miss)
+        """
+        result, kind = self.get(namespace, query, params)
+        if kind:
+            return result, kind
+        result = compute()
+        if cache_if is None or cache_if(result):
+            self.put(namespace, query, params, result)
+        return result, None
+
+    def clear(self):
+        """Forget every entry, in memory and on disk."""
+        with self._lock:
+            self._entries = None
+            if self.directory:
+                for path in self._paths():
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            return len(self._entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Return the shared search cache.
+
+    Environment variables:
+        SEARCH_CACHE: Set to 0 to send every search (default: on)
+        SEARCH_CACHE_DIR: Directory of the saved index (default: .cache/search; empty for memory only)
+        SEARCH_CACHE_THRESHOLD: Cosine similarity for a near-identical query to match (default: 0.85)
+        SEARCH_CACHE_TTL: Seconds results are served for (default: 86400)
+        SEARCH_CACHE_SIZE: Entries kept (default: 2000)
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchCache()
+        return _cache
+
+
+def cached_search(namespace: str, query_arg: str = "query", exclude: tuple = (), cache_if=None):
+    """Decorator putting the shared search cache in front of a search function.
+
+    Args:
+        namespace: Name keeping this function's results apart from other searches.
+        query_arg: The parameter holding the query.
+        exclude: Parameters that are not search options (clients, deadlines, ...).
+        cache_if: Function of the result deciding whether it may be cached.
+    """
+    def decorate(search):
+        signature = inspect.signature(search)
+
+        @functools.wraps(search)
+        def wrapper(*args, **kwargs):
+            if not SEARCH_CACHE:
+                return search(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k != query_arg and k not in exclude}
+            query = bound.arguments[query_arg]
+            return get_search_cache().call(namespace, str(query), params, lambda: search(*args, **kwargs),
+                                           cache_if=cache_if)[0]
+        return wrapper
+    return decorate
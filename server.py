@@ -0,0 +1,411 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import contextlib
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from rich.console import Console
+from rich.panel import Panel
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", 8765))
+# Sessions running at once, and sessions allowed to wait for a slot before new ones get 429
+SERVER_CONCURRENCY = int(os.getenv("SERVER_CONCURRENCY", 8))
+SERVER_QUEUE_SIZE = int(os.getenv("SERVER_QUEUE_SIZE", 32))
+# Finished sessions kept for GET /sessions/<id>; the oldest are forgotten first
+SERVER_SESSIONS_KEPT = int(os.getenv("SERVER_SESSIONS_KEPT", 1000))
+MAX_BODY_BYTES = 1024 * 1024
+# Seconds between keep-alive comments on an idle event stream
+HEARTBEAT_SECONDS = 15
+
+# Options a client may set per session, with their types
+SESSION_OPTIONS = {"stream": bool, "parallel_tools": bool, "max_loops": int, "context_budget": int,
+                   "convergence": bool}
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 429: "Too Many Requests", 503: "Service Unavailable"}
+
+console = Console()
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _response(status: int, body, content_type: str = "application/json", headers: dict = None,
+              keep_alive: bool = True) -> bytes:
+    if not isinstance(body, (bytes, str)):
+        body = json.dumps(body, ensure_ascii=False, default=str)
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """Read one HTTP/1.1 request: (method, path, query, headers, body), or None when the client is gone."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Content-Length must be a number")
+    if length < 0:
+        raise HTTPError(400, "Content-Length must not be negative")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"Request body over {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return method.upper(), url.path.rstrip("/") or "/", parse_qs(url.query), headers, body
+
+
+class Session:
+    """One agent run submitted to the server, with the progress events it has produced.
+
+    The session id is also the run id, so a session interrupted by a server
+    restart can be continued with `python main.py --resume <id>`.
+    """
+
+    def __init__(self, prompt: str, options: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.prompt = prompt
+        self.options = options
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.events = []
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = asyncio.Event()
+        self._listeners = set()
+
+    def publish(self, event: dict):
+        """Record an event and pass it to every open event stream (event loop thread only)."""
+        event = {**event, "seq": len(self.events)}
+        self.events.append(event)
+        for queue in self._listeners:
+            queue.put_nowait(event)
+
+    def listen(self, after: int = -1) -> tuple:
+        """(events already published after sequence number `after`, queue receiving the rest)."""
+        queue = asyncio.Queue()
+        self._listeners.add(queue)
+        return self.events[after + 1:], queue
+
+    def unlisten(self, queue: asyncio.Queue):
+        self._listeners.discard(queue)
+
+    def close(self, status: str, result: dict = None, error: str = None):
+        self.status, self.result, self.error = status, result, error
+        self.finished = time.time()
+        if error:
+            self.publish({"type": "error", "run_id": self.id, "message": error})
+        self.done.set()
+        for queue in self._listeners:
+            queue.put_nowait(None)
+
+    def to_dict(self, messages: bool = False) -> dict:
+        summary = {"id": self.id, "status": self.status, "prompt": self.prompt, "options": self.options,
+                   "created": self.created, "started": self.started, "finished": self.finished,
+                   "events": len(self.events)}
+        if self.error:
+            summary["error"] = self.error
+        if self.result:
+            summary.update({key: self.result[key] for key in ("loops", "convergence", "partial")
+                            if key in self.result})
+            history = self.result["messages"]
+            summary["answer"] = next((m.get("content") for m in reversed(history)
+                                      if m.get("role") == "assistant" and m.get("content")), None)
+            if messages:
+                summary["messages"] = history
+        return summary
+
+
+class AgentServer:
+    """Serves the agent loop over a local HTTP API, running many sessions in one warm process.
+
+    Sessions are queued and picked up by `concurrency` workers. Each runs
+    `run_agent` on a thread, so every session shares the same warm state:
+    - the model connection pool,
+    - the tool registry, executor pools and caches,
+    - the search cache and the artifact store.
+    Once `queue_size` sessions are waiting, new ones are refused with 429
+    instead of piling up. Progress reaches clients as server-sent events.
+
+    Endpoints:
+        POST /sessions: {"prompt": ..., options from SESSION_OPTIONS}. 202
+            with the session, or the finished session with "wait": true.
+        GET /sessions: every session kept, newest last.
+        GET /sessions/<id>: status and result (?messages=1 adds the history).
+        GET /sessions/<id>/events: the session's events as server-sent
+            events, from the start or after Last-Event-ID, until it ends.
+        GET /health: running, queued and session counts.
+        GET /metrics: the Prometheus metrics of every session so far.
+
+    Args:
+        run: The agent loop (default: main.run_agent); called with the
+            prompt, the session's options, run_id and on_event.
+        concurrency: Sessions running at once.
+        queue_size: Sessions waiting for a slot before new ones are refused.
+        sessions_kept: Finished sessions kept for lookups.
+    """
+
+    def __init__(self, run=None, concurrency: int = SERVER_CONCURRENCY, queue_size: int = SERVER_QUEUE_SIZE,
+                 sessions_kept: int = SERVER_SESSIONS_KEPT):
+        self.run = run
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.sessions_kept = sessions_kept
+        self.sessions = OrderedDict()
+        self.stats = {"accepted": 0, "rejected": 0, "finished": 0, "errors": 0}
+        self.running = 0
+        self.port = None
+        self._queue = None
+        self._pool = None
+        self._server = None
+        self._workers = []
+        self._connections = set()
+
+    async def start(self, host: str = SERVER_HOST, port: int = SERVER_PORT):
+        """Start the workers and listen for requests; `port` 0 picks a free one (see `self.port`)."""
+        if self.run is None:
+            import main
+            self.run = main.run_agent
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="session")
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop accepting requests and drop queued sessions; running sessions finish on their threads."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        # Idle keep-alive connections and event streams would otherwise outlive the loop
+        tasks = [*self._workers, *self._connections]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, prompt: str, options: dict = None) -> Session:
+        """Queue a session.
+
+        Raises:
+            HTTPError: 429 when the queue is full.
+        """
+        session = Session(prompt, options or {})
+        try:
+            self._queue.put_nowait(session)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise HTTPError(429, f"{self.queue_size} sessions are already waiting; retry later",
+                            {"Retry-After": "1"})
+        self.stats["accepted"] += 1
+        self.sessions[session.id] = session
+        self._forget_old()
+        return session
+
+    def _forget_old(self):
+        finished = [sid for sid, s in self.sessions.items() if s.done.is_set()]
+        for sid in finished[:max(0, len(self.sessions) - self.sessions_kept)]:
+            del self.sessions[sid]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            session = await self._queue.get()
+            session.status, session.started = "running", time.time()
+            self.running += 1
+            console.print(f"[dim]▶ {session.id} started ({self._queue.qsize()} waiting)[/dim]")
+            try:
+                result = await loop.run_in_executor(self._pool, self._run_session, session, loop)
+                session.close(result["status"], result)
+                self.stats["finished"] += 1
+            except Exception as e:
+                session.close("error", error=f"{type(e).__name__}: {e}")
+                self.stats["errors"] += 1
+            finally:
+                self.running -= 1
+            console.print(f"[bold]{session.id}[/bold]: {session.status} in "
+                          f"{session.finished - session.started:.1f}s")
+
+    def _run_session(self, session: Session, loop) -> dict:
+        # On a session thread: events are handed to the event loop, which owns the session
+        def on_event(event):
+            loop.call_soon_threadsafe(session.publish, event)
+        return self.run(session.prompt, show_progress=False, run_id=session.id, on_event=on_event,
+                        **session.options)
+
+    def health(self) -> dict:
+        return {"running": self.running, "queued": self._queue.qsize(), "concurrency": self.concurrency,
+                "queue_size": self.queue_size, "sessions": len(self.sessions), **self.stats}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # One connection may carry many requests; an event stream keeps it until the session ends
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    keep_alive = request[3].get("connection", "").lower() != "close"
+                    if await self._route(*request, writer):
+                        break
+                except HTTPError as e:
+                    keep_alive = e.status not in (400, 413)
+                    writer.write(_response(e.status, {"error": str(e)}, headers=e.headers, keep_alive=keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            # Tool worker processes forked while this connection was open share its socket;
+            # only an explicit FIN tells the client the response is over
+            with contextlib.suppress(OSError, RuntimeError):
+                writer.write_eof()
+            writer.close()
+
+    async def _route(self, method: str, path: str, query: dict, headers: dict, body: bytes, writer) -> bool:
+        """Answer a request; returns True when the response used up the connection."""
+        parts = path.strip("/").split("/")
+        if path == "/sessions" and method == "POST":
+            return await self._create(body, writer)
+        if path == "/sessions" and method == "GET":
+            writer.write(_response(200, [s.to_dict() for s in self.sessions.values()]))
+        elif parts[0] == "sessions" and len(parts) in (2, 3) and method == "GET":
+            session = self.sessions.get(parts[1])
+            if session is None:
+                raise HTTPError(404, f"No session {parts[1]}")
+            if len(parts) == 3:
+                if parts[2] != "events":
+                    raise HTTPError(404, f"No such endpoint {path}")
+                await self._stream_events(session, headers, writer)
+                return True
+            writer.write(_response(200, session.to_dict(messages=query.get("messages") == ["1"])))
+        elif path == "/health" and method == "GET":
+            writer.write(_response(200, self.health()))
+        elif path == "/metrics" and method == "GET":
+            import main
+            writer.write(_response(200, main.tracer.prometheus(), "text/plain; version=0.0.4"))
+        elif path in ("/sessions", "/health", "/metrics") or parts[0] == "sessions":
+            raise HTTPError(405, f"{method} is not allowed on {path}")
+        else:
+            raise HTTPError(404, f"No such endpoint {path}")
+        return False
+
+    async def _create(self, body: bytes, writer) -> bool:
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(request, dict) or not isinstance(request.get("prompt"), str) or not request["prompt"]:
+            raise HTTPError(400, "A non-empty 'prompt' is required")
+        wait = request.pop("wait", False)
+        if not isinstance(wait, bool):
+            raise HTTPError(400, "Option 'wait' must be bool")
+        options = {k: v for k, v in request.items() if k != "prompt"}
+        for key, value in options.items():
+            expected = SESSION_OPTIONS.get(key)
+            if expected is None:
+                raise HTTPError(400, f"Unknown option '{key}'; expected one of {sorted(SESSION_OPTIONS)}")
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                raise HTTPError(400, f"Option '{key}' must be {expected.__name__}")
+        session = self.submit(request["prompt"], options)
+        if wait:
+            await session.done.wait()
+            writer.write(_response(200, session.to_dict(messages=True)))
+        else:
+            writer.write(_response(202, session.to_dict(), headers={"Location": f"/sessions/{session.id}"}))
+        return False
+
+    async def _stream_events(self, session: Session, headers: dict, writer):
+        writer.write(("HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\nCache-Control: no-cache\r\n"
+                      "Connection: close\r\n\r\n").encode("latin-1"))
+        try:
+            # Anything below -1 would slice from the end of the backlog
+            after = max(-1, int(headers.get("last-event-id", -1)))
+        except ValueError:
+            after = -1
+        backlog, queue = session.listen(after)
+        try:
+            pending = list(backlog)
+            while True:
+                for event in pending:
+                    writer.write(f"id: {event['seq']}\nevent: {event['type']}\n"
+                                 f"data: {json.dumps(event, default=str)}\n\n".encode("utf-8"))
+                await writer.drain()
+                if session.done.is_set() and queue.empty():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                    pending = []
+                    continue
+                if event is None:
+                    break
+                pending = [event]
+        finally:
+            session.unlisten(queue)
+
+
+async def serve(host: str = SERVER_HOST, port: int = SERVER_PORT, concurrency: int = SERVER_CONCURRENCY,
+                queue_size: int = SERVER_QUEUE_SIZE):
+    """Run the agent server until cancelled."""
+    # Every running session should keep its own model connection alive
+    os.environ.setdefault("MODEL_POOL_SIZE", str(max(concurrency, 10)))
+    import main
+    # Session output would interleave; the server logs one line per session instead
+    main.console.quiet = True
+    main.warm_up()
+    server = AgentServer(main.run_agent, concurrency, queue_size)
+    await server.start(host, port)
+    console.print(Panel(f"🤖 Agent server on http://{host}:{server.port} ({concurrency} sessions at a time, "
+                        f"{queue_size} queued)", style="bold blue"))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the AI Tool Assistant over a local HTTP API")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("-c", "--concurrency", type=int, default=SERVER_CONCURRENCY,
+                        help="Sessions running at once")
+    parser.add_argument("-q", "--queue-size", type=int, default=SERVER_QUEUE_SIZE,
+                        help="Sessions waiting for a slot before new ones get 429")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.concurrency, args.queue_size))
+    except KeyboardInterrupt:
+        console.print("\n[red]Server stopped; sessions that were running can be resumed with main.py --resume[/red]")
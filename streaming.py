@@ -0,0 +1,143 @@
+import json
+import time
+
+
+def iter_sse_events(lines):
+    """Yield decoded JSON events from a server-sent events line stream.
+
+    Args:
+        lines: Iterable of raw lines (bytes or str) from a `stream: true` response.
+
+    Yields:
+        dict: Each `data:` payload, until the `[DONE]` sentinel.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line.startswith("data:"):
+            # Blank keep-alive lines, comments and event names
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            yield json.loads(data)
+        except ValueError:
+            continue
+
+
+def _arguments_complete(arguments: str) -> bool:
+    """A streamed arguments string is complete once it parses as a JSON object."""
+    if not arguments.rstrip().endswith("}"):
+        return False
+    try:
+        return isinstance(json.loads(arguments), dict)
+    except ValueError:
+        return False
+
+
+class ToolCallAssembler:
+    """Assembles streamed tool-call deltas and reports each call as soon as it is complete.
+
+    Args:
+        on_tool_call: Called with the assembled tool call dict the moment its
+            arguments are complete, before the rest of the stream arrives.
+    """
+
+    def __init__(self, on_tool_call=None):
+        self.on_tool_call = on_tool_call
+        self.calls = {}
+        self.dispatched = set()
+
+    def add(self, deltas: list):
+        """Merge a list of `delta.tool_calls` entries into the calls being built."""
+        for delta in deltas:
+            index = delta.get("index", len(self.calls))
+            call = self.calls.setdefault(index, {"id": None, "type": "function",
+                                                 "function": {"name": "", "arguments": ""}})
+            if delta.get("id"):
+                call["id"] = delta["id"]
+            function = delta.get("function") or {}
+            if function.get("name"):
+                call["function"]["name"] += function["name"]
+            if function.get("arguments"):
+                arguments = function["arguments"]
+                # Some servers send the whole arguments object instead of a string fragment
+                if not isinstance(arguments, str):
+                    arguments = json.dumps(arguments)
+                call["function"]["arguments"] += arguments
+
+            # A later index starting means every earlier call is finished
+            for earlier in sorted(self.calls):
+                if earlier < index:
+                    self._dispatch(earlier)
+            if _arguments_complete(call["function"]["arguments"]):
+                self._dispatch(index)
+
+    def finish(self):
+        """Dispatch any call that was still open when the stream ended."""
+        for index in sorted(self.calls):
+            self._dispatch(index)
+
+    def _dispatch(self, index: int):
+        if index in self.dispatched or not self.calls[index]["function"]["name"]:
+            return
+        self.dispatched.add(index)
+        if self.on_tool_call:
+            self.on_tool_call(self.calls[index])
+
+    def tool_calls(self) -> list:
+        return [self.calls[i] for i in sorted(self.calls)]
+
+
+def consume_stream(lines, start_time: float, on_text=None, on_tool_call=None):
+    """Consume a streamed chat completion.
+
+    Args:
+        lines: Raw SSE lines from the response.
+        start_time: `time.perf_counter()` value taken when the request was sent.
+        on_text: Called with each assistant text fragment as it arrives.
+        on_tool_call: Called with each tool call as soon as its arguments are complete.
+
+    Returns:
+        tuple: (message, metrics) where message has the same shape as a
+        non-streamed `choices[0].message`, and metrics holds
+        `time_to_first_token` and `time_to_tool_dispatch` in seconds (None if
+        it never happened).
+    """
+    metrics = {"time_to_first_token": None, "time_to_tool_dispatch": None, "usage": None}
+
+    def dispatch(tool_call):
+        if metrics["time_to_tool_dispatch"] is None:
+            metrics["time_to_tool_dispatch"] = time.perf_counter() - start_time
+        if on_tool_call:
+            on_tool_call(tool_call)
+
+    assembler = ToolCallAssembler(dispatch)
+    content = []
+
+    for event in iter_sse_events(lines):
+        if event.get("usage"):
+            metrics["usage"] = event["usage"]
+        for choice in event.get("choices", []):
+            delta = choice.get("delta") or {}
+            text = delta.get("content")
+            if (text or delta.get("tool_calls")) and metrics["time_to_first_token"] is None:
+                metrics["time_to_first_token"] = time.perf_counter() - start_time
+            if text:
+                content.append(text)
+                if on_text:
+                    on_text(text)
+            if delta.get("tool_calls"):
+                assembler.add(delta["tool_calls"])
+            if choice.get("finish_reason"):
+                assembler.finish()
+
+    assembler.finish()
+
+    message = {"role": "assistant", "content": "".join(content)}
+    tool_calls = assembler.tool_calls()
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return message, metrics
@@ -0,0 +1,255 @@
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_completion(content: str = "Hello from the stub server.", tool_calls: list = None) -> dict:
+    """Build an OpenAI-style chat completion response."""
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms per reused connection
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # Simulate the cost of a fresh TCP/TLS handshake once per connection
+        self.server.stub.connections += 1
+        if self.server.stub.handshake_delay:
+            time.sleep(self.server.stub.handshake_delay)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        stub = self.server.stub
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            payload = {}
+
+        if self.path.rstrip("/").endswith("/search"):
+            # Tavily-compatible search endpoint
+            stub.searches += 1
+            if stub.search_latency:
+                time.sleep(stub.search_latency)
+            self._send_json(stub.search(payload))
+            return
+
+        stub.requests += 1
+        delay = stub.next_latency()
+        if delay:
+            time.sleep(delay)
+
+        completion = stub.respond(payload)
+        if isinstance(completion, tuple):
+            # (status, body) from respond() simulates an error response
+            self._send_json(completion[1], status=completion[0])
+            return
+        if payload.get("stream"):
+            self._send_stream(completion)
+            return
+        self._send_json(completion)
+
+    def _send_json(self, body: dict, status: int = 200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, completion: dict):
+        """Replay a completion as `stream: true` server-sent events using chunked encoding."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in completion_to_chunks(completion, self.server.stub.chunk_size):
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            if self.server.stub.token_delay:
+                time.sleep(self.server.stub.token_delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connects from many concurrent sessions, costing each a 1 s SYN retry
+    request_queue_size = 128
+
+
+def completion_to_chunks(completion: dict, chunk_size: int = 8) -> list:
+    """Split a chat completion into the delta events a streaming server would send."""
+    message = completion["choices"][0]["message"]
+    base = {"id": completion["id"], "object": "chat.completion.chunk", "model": completion["model"]}
+    chunks = []
+    content = message.get("content") or ""
+    for i in range(0, len(content), chunk_size):
+        delta = {"content": content[i:i + chunk_size]}
+        chunks.append({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+    for index, call in enumerate(message.get("tool_calls") or []):
+        arguments = call["function"]["arguments"]
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments)
+        head = {"index": index, "id": call.get("id"), "type": "function",
+                "function": {"name": call["function"]["name"], "arguments": ""}}
+        chunks.append({**base, "choices": [{"index": 0, "delta": {"tool_calls": [head]}, "finish_reason": None}]})
+        for i in range(0, len(arguments), chunk_size):
+            piece = {"index": index, "function": {"arguments": arguments[i:i + chunk_size]}}
+            chunks.append({**base, "choices": [{"index": 0, "delta": {"tool_calls": [piece]}, "finish_reason": None}]})
+    finish = completion["choices"][0].get("finish_reason", "stop")
+    chunks.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish}],
+                   "usage": completion.get("usage")})
+    return chunks
+
+
+def make_search_results(query: str, max_results: int = 5) -> dict:
+    """Build a Tavily-style search response with deterministic results for a query."""
+    results = []
+    for i in range(max_results):
+        results.append({
+            "title": f"{query} - result {i + 1}",
+            "url": f"https://example.com/{i + 1}?q={query.replace(' ', '+')}",
+            "content": f"Stub result {i + 1} about {query}. " * 8,
+            "score": round(1.0 - i / (max_results + 1), 3),
+            "raw_content": None,
+        })
+    return {"query": query, "answer": None, "images": [], "results": results, "response_time": 0.0}
+
+
+class StubServer:
+    """Local OpenAI-compatible chat completions server for offline testing and benchmarks.
+
+    It also answers Tavily-style POST /search requests, so the search tools can
+    run offline by pointing TAVILY_API_BASE_URL at `base_url`.
+
+    Args:
+        host: Interface to bind to.
+        port: Port to bind to (0 picks a free port).
+        latency: Seconds to wait before answering each chat completions request.
+        handshake_delay: Seconds to wait once per new connection, simulating TCP/TLS setup.
+        token_delay: Seconds between streamed chunks when the client sets `stream: true`.
+        chunk_size: Characters per streamed content or arguments chunk.
+        jitter: Each request's latency varies uniformly by up to this many seconds either way.
+        search_latency: Seconds to wait before answering each search request.
+        seed: Seed for the jitter, so runs are repeatable.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 handshake_delay: float = 0.0, token_delay: float = 0.0, chunk_size: int = 8,
+                 jitter: float = 0.0, search_latency: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.handshake_delay = handshake_delay
+        self.token_delay = token_delay
+        self.chunk_size = chunk_size
+        self.jitter = jitter
+        self.search_latency = search_latency
+        self.connections = 0
+        self.requests = 0
+        self.searches = 0
+        self._rng = random.Random(seed)
+        self._httpd = _StubHTTPServer((host, port), _StubHandler)
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/v1/chat/completions"
+
+    def next_latency(self) -> float:
+        """Seconds to wait before answering the next chat completions request."""
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def respond(self, payload: dict) -> dict:
+        """Return the response body for a chat completions request, or a (status, body) tuple for an error."""
+        return make_completion()
+
+    def search(self, payload: dict) -> dict:
+        """Return the response body for a Tavily search request."""
+        return make_search_results(payload.get("query", ""), payload.get("max_results", 5))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class ScriptedStubServer(StubServer):
+    """Stub server that plays back a fixed sequence of turns for every conversation.
+
+    The turn is worked out from the request's message history, so any number
+    of concurrent sessions can share one server. Once the script is used up,
+    the model calls all_work_is_finished.
+
+    Args:
+        script: One entry per turn: either text for a reply without tool calls,
+            or a list of (tool_name, arguments) tuples for the calls to make.
+        **kwargs: StubServer options (latency, jitter, token_delay, ...).
+    """
+
+    def __init__(self, script: list, **kwargs):
+        super().__init__(**kwargs)
+        self.script = script
+
+    @staticmethod
+    def turn_index(messages: list) -> int:
+        """Turns already taken: each adds one user message (tool results) or one assistant message (parallel tools)."""
+        return sum(1 for m in messages[2:] if m.get("role") in ("user", "assistant"))
+
+    def respond(self, payload: dict) -> dict:
+        turn = self.turn_index(payload.get("messages", []))
+        step = self.script[turn] if turn < len(self.script) else [("all_work_is_finished", {"is_finished": True})]
+        if isinstance(step, str):
+            return make_completion(step)
+        tool_calls = [{"id": f"call_{turn}_{i}", "type": "function",
+                       "function": {"name": name, "arguments": json.dumps(arguments)}}
+                      for i, (name, arguments) in enumerate(step)]
+        return make_completion("", tool_calls=tool_calls)
+
+
+if __name__ == "__main__":
+    server = StubServer(port=8765).start()
+    print(f"Stub server listening on {server.url}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
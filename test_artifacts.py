@@ -0,0 +1,64 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from artifacts import ArtifactStore, is_handle
+
+
+def test_large_results_become_handles_with_previews():
+    store = ArtifactStore(inline_chars=100, preview_chars=20)
+    assert store.shrink("short") == "short"
+    text = "turtle " * 1000
+    shrunk = store.shrink(text, source="search")
+    handle = shrunk.split()[0]
+    assert is_handle(handle) and len(shrunk) < 300 and "turtle turtle" in shrunk
+    # Handles come from the content, so the same output maps to the same handle
+    assert store.put(text) == handle and store.stats()["stored"] == 1
+    assert store.resolve(handle) == text and store.resolve("plain text") == "plain text"
+    assert "".join(store.chunks(handle, size=64)) == text
+    assert store.shrink(handle).startswith(f"{handle} (7000 chars from search)")
+
+
+def test_eviction_and_file_artifacts():
+    store = ArtifactStore(max_bytes=2500, inline_chars=10)
+    first = store.put("a" * 1000)
+    store.put("b" * 1000)
+    store.put("c" * 1000)
+    try:
+        store.resolve(first)
+        assert False, "the oldest artifact should have been evicted"
+    except KeyError:
+        pass
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "table.csv")
+        with open(path, "w") as f:
+            f.write("x,result\n1,2\n")
+        handle = store.put_file(path, source="table")
+        assert store.resolve(handle) == "x,result\n1,2\n"
+
+
+def test_tools_take_handles_instead_of_text():
+    poem = "Box turtles amble through the leaves,\n" * 100
+    result = main.call_tool("encode_a_secret", {"secret_to_encode": poem})
+    # The encoded poem is too long to inline; the model gets a handle
+    handle = result.split("Result: ")[1].split()[0]
+    assert is_handle(handle) and len(result) < 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "encoded.txt")
+        main.call_tool("write_to_file", {"filename": path, "content": handle})
+        with open(path) as f:
+            assert f.read() == main.encode_a_secret(poem)
+
+        source = main.artifacts.put(poem)
+        assert main.encode_a_secret(source) == main.encode_a_secret(poem)
+
+
+if __name__ == "__main__":
+    test_large_results_become_handles_with_previews()
+    test_eviction_and_file_artifacts()
+    test_tools_take_handles_instead_of_text()
+    print("✅ artifact store tests passed")
@@ -0,0 +1,57 @@
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+import batch
+import checkpoint
+from search_cache import get_search_cache
+from stub_server import ScriptedStubServer
+
+SCRIPT = [
+    [("encode_a_secret", {"secret_to_encode": "ab"})],
+    [("my_super_cool_function", {"x_int": 1, "y_int": 2})],
+]
+
+
+def test_batch_runs_tasks_and_writes_their_results():
+    original = (main.MODEL_BASE_URL, checkpoint.CHECKPOINT_DIR)
+    batch.console.quiet = main.console.quiet = True
+    search_cache = get_search_cache()
+    search_cache.directory = ""
+    try:
+        with tempfile.TemporaryDirectory() as directory, \
+                ScriptedStubServer(SCRIPT, latency=0.01) as server:
+            checkpoint.CHECKPOINT_DIR = directory
+            main.MODEL_BASE_URL = server.url
+            prompts_path = os.path.join(directory, "prompts.jsonl")
+            with open(prompts_path, "w") as f:
+                f.write(json.dumps({"id": "first", "prompt": "encode ab"}) + "\n\n")
+                f.write(json.dumps({"request_id": "second", "title": "Encode", "body": "ab, please"}) + "\n")
+            prompts = batch.load_prompts(prompts_path)
+            assert prompts == [("first", "encode ab"), ("second", "Encode\n\nab, please")]
+
+            output_path = os.path.join(directory, "results.jsonl")
+            assert batch.run_batch(prompts, output_path, concurrency=2) == {"finished": 2}
+            with open(output_path) as f:
+                records = {record["id"]: record for record in map(json.loads, f)}
+            assert sorted(records) == ["first", "second"]
+            for record in records.values():
+                assert record["status"] == "finished" and record["loops"] == len(SCRIPT) + 1
+                assert "xxaxxb" in json.dumps(record["messages"])
+                assert len(record["run_id"]) == 12
+            # Each task gets its own run id, which names its checkpoint; finished runs leave none behind
+            assert records["first"]["run_id"] != records["second"]["run_id"]
+            assert sorted(os.listdir(directory)) == ["prompts.jsonl", "results.jsonl"]
+            assert server.requests == 2 * (len(SCRIPT) + 1)
+    finally:
+        main.MODEL_BASE_URL, checkpoint.CHECKPOINT_DIR = original
+        batch.console.quiet = main.console.quiet = False
+        search_cache.clear()
+
+
+if __name__ == "__main__":
+    test_batch_runs_tasks_and_writes_their_results()
+    print("✅ batch tests passed")
@@ -0,0 +1,155 @@
+import sys
+import os
+import hashlib
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+import checkpoint
+from checkpoint import RunCheckpoint, load_run
+from search_cache import get_search_cache
+from stub_server import ScriptedStubServer
+
+SCRIPT = [
+    [("encode_a_secret", {"secret_to_encode": "ab"})],
+    "Thinking it over.",
+    [("my_super_cool_function", {"x_int": 0, "y_int": 0}), ("encode_a_secret", {"secret_to_encode": "c"})],
+]
+
+
+def test_history_is_rebuilt_from_appended_records():
+    with tempfile.TemporaryDirectory() as directory:
+        messages = [{"role": "system", "content": "s"}, {"role": "user", "content": "task"}]
+        run = RunCheckpoint.start("r1", "task", {"max_loops": 5}, directory=directory)
+        run.begin_turn(0, messages)
+        run.record_response({"role": "assistant", "content": "first"})
+        messages.append({"role": "user", "content": "x" * 1000})
+        run.begin_turn(1, messages)
+        # Compaction replaces an entry; only the replacement is written, nothing is rewritten
+        messages[2] = {"role": "user", "content": "x…"}
+        messages.append({"role": "user", "content": "more"})
+        run.begin_turn(2, messages)
+        run.record_response({"role": "assistant", "tool_calls": []})
+        run.record_tool("encode_a_secret", {"secret_to_encode": "a"}, "✅ xxa")
+        with open(run.path, encoding="utf-8") as f:
+            # Each message is written once, however many turns follow it
+            assert f.read().count("x" * 1000) == 1
+        with open(run.path, "a", encoding="utf-8") as f:
+            f.write('{"type": "tool", "tu')  # cut short by a crash
+
+        state = load_run("r1", directory)
+        assert state["task"] == "task" and state["options"] == {"max_loops": 5}
+        assert state["messages"] == messages and state["turn"] == 2 and state["status"] is None
+        assert state["response"] == {"role": "assistant", "tool_calls": []}
+        assert list(state["tools"].values()) == [["✅ xxa"]]
+
+        resumed = RunCheckpoint("r1", state, directory=directory)
+        resumed.begin_turn(2, state["messages"])
+        assert resumed.replay_tool("encode_a_secret", {"secret_to_encode": "a"}) == "✅ xxa"
+        assert resumed.replay_tool("encode_a_secret", {"secret_to_encode": "a"}) is None
+        assert resumed.replay_response() == {"role": "assistant", "tool_calls": []}
+        assert resumed.replay_response() is None
+        resumed.end("finished", 3, state["messages"])
+        # An ended run has nothing to resume
+        assert not os.path.exists(resumed.path)
+
+
+def test_interrupted_run_resumes_without_redoing_work():
+    original = (main.MODEL_BASE_URL, main._run_tool, checkpoint.CHECKPOINT_DIR)
+    ran = []
+    crash = {"armed": True}
+
+    def flaky_run_tool(tool_name, arguments):
+        ran.append(tool_name)
+        if crash["armed"] and arguments.get("secret_to_encode") == "c":
+            raise KeyboardInterrupt
+        return original[1](tool_name, arguments)
+
+    main.console.quiet = True
+    main._run_tool = flaky_run_tool
+    search_cache = get_search_cache()
+    search_cache.directory = ""
+    try:
+        with tempfile.TemporaryDirectory() as directory, \
+                ScriptedStubServer(SCRIPT, latency=0.01, jitter=0.005) as server:
+            checkpoint.CHECKPOINT_DIR = directory
+            main.MODEL_BASE_URL = server.url
+            try:
+                main.run_agent("script", show_progress=False, parallel_tools=True, run_id="interrupted",
+                               checkpoint=True)
+                assert False, "the run should have been interrupted"
+            except KeyboardInterrupt:
+                pass
+            assert server.requests == 3
+            assert sorted(ran) == ["encode_a_secret", "encode_a_secret", "my_super_cool_function"]
+
+            crash["armed"] = False
+            ran.clear()
+            state = load_run("interrupted")
+            assert state["turn"] == 2 and state["response"]["tool_calls"]
+            result = main.run_agent(state["task"], show_progress=False, run_id="interrupted", checkpoint=True,
+                                    restore=state, **state["options"])
+            # Turn 3's response and its finished call are replayed; only the interrupted call and turn 4 are new
+            assert server.requests == 4
+            assert ran == ["encode_a_secret", "all_work_is_finished"]
+            assert result["status"] == "finished" and result["loops"] == len(SCRIPT) + 1
+            assert result["checkpoint"] == {"replayed_responses": 1, "replayed_tools": 1}
+            contents = " ".join(m.get("content") or "" for m in result["messages"])
+            assert "xxaxxb" in contents and "Result: 0.0" in contents and "xxc" in contents
+            assert os.listdir(directory) == []
+    finally:
+        main.MODEL_BASE_URL, main._run_tool, checkpoint.CHECKPOINT_DIR = original
+        main.console.quiet = False
+        search_cache.clear()
+
+
+def test_resumed_run_can_pass_artifact_handles_from_before_the_interruption():
+    secret = "turtle " * 300
+    encoded = "".join(f"xx{a}" for a in secret)
+    handle = "artifact:" + hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:12]
+    original = (main.MODEL_BASE_URL, main._run_tool, checkpoint.CHECKPOINT_DIR)
+    crash = {"armed": True}
+
+    def flaky_run_tool(tool_name, arguments):
+        if crash["armed"] and tool_name == "write_to_file":
+            raise KeyboardInterrupt
+        return original[1](tool_name, arguments)
+
+    main.console.quiet = True
+    main._run_tool = flaky_run_tool
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            target = os.path.join(directory, "poem.txt")
+            script = [[("encode_a_secret", {"secret_to_encode": secret})],
+                      [("write_to_file", {"filename": target, "content": handle})]]
+            with ScriptedStubServer(script, latency=0.01) as server:
+                checkpoint.CHECKPOINT_DIR = directory
+                main.MODEL_BASE_URL = server.url
+                try:
+                    main.run_agent("artifacts", show_progress=False, run_id="shrunk", checkpoint=True)
+                    assert False, "the run should have been interrupted"
+                except KeyboardInterrupt:
+                    pass
+                state = load_run("shrunk")
+                assert handle in " ".join(m.get("content") or "" for m in state["messages"])
+                assert state["artifacts"][handle]["text"] == encoded
+
+                # A new process: the artifact only survives in the checkpoint
+                main.artifacts._entries.clear()
+                main.artifacts._bytes = 0
+                crash["armed"] = False
+                result = main.run_agent(state["task"], show_progress=False, run_id="shrunk", checkpoint=True,
+                                        restore=state, **state["options"])
+                assert result["status"] == "finished"
+                with open(target, encoding="utf-8") as f:
+                    assert f.read() == encoded
+    finally:
+        main.MODEL_BASE_URL, main._run_tool, checkpoint.CHECKPOINT_DIR = original
+        main.console.quiet = False
+
+
+if __name__ == "__main__":
+    test_history_is_rebuilt_from_appended_records()
+    test_interrupted_run_resumes_without_redoing_work()
+    test_resumed_run_can_pass_artifact_handles_from_before_the_interruption()
+    print("✅ checkpoint tests passed")
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from context import ContextManager, estimate_tokens, summarize_text
+
+
+def _history(turns=8, size=4000):
+    messages = [{"role": "system", "content": "system prompt"}, {"role": "user", "content": "the task"}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"turn {i} " + "turtle facts. " * (size // 14)})
+    return messages
+
+
+def test_compaction_fits_budget_and_protects_head_and_recent_turns():
+    messages = _history()
+    original = list(messages)
+    context = ContextManager(budget=4000, keep_turns=2, strategy="truncate", keep_chars=200)
+    before, after = context.compact(messages)
+
+    assert before > 4000 >= after
+    assert after == context.total_tokens(messages)
+    assert messages[0] is original[0] and messages[1] is original[1]
+    assert messages[-1] is original[-1] and messages[-2] is original[-2]
+    assert "[truncated" in messages[2]["content"]
+    # Compacted messages are new objects; the originals are untouched
+    assert "[truncated" not in original[2]["content"]
+
+
+def test_compaction_stops_once_under_budget():
+    messages = _history()
+    context = ContextManager(budget=7000, keep_turns=1, strategy="drop")
+    context.compact(messages)
+    dropped = [m for m in messages if m["content"].startswith("[older output removed")]
+    # Only as many of the oldest turns as needed, in order
+    assert 0 < len(dropped) < 7
+    assert all(m["content"].startswith("[older output removed") for m in messages[2:2 + len(dropped)])
+
+
+def test_tokens_are_counted_once_per_message():
+    calls = []
+
+    def counting(text):
+        calls.append(text)
+        return estimate_tokens(text)
+
+    messages = _history(turns=3)
+    context = ContextManager(budget=10 ** 6, count_tokens=counting)
+    context.compact(messages)
+    messages.append({"role": "user", "content": "new"})
+    context.compact(messages)
+    assert len(calls) == len(messages)
+
+
+def test_summarize_keeps_topical_sentences_in_order():
+    text = ("Desert box turtles live in New Mexico. The weather was nice. "
+            "Box turtles dig burrows in the desert. Lunch was sandwiches.")
+    summary = summarize_text(text, max_chars=90)
+    assert summary == "Desert box turtles live in New Mexico. Box turtles dig burrows in the desert."
+
+
+if __name__ == "__main__":
+    test_compaction_fits_budget_and_protects_head_and_recent_turns()
+    test_compaction_stops_once_under_budget()
+    test_tokens_are_counted_once_per_message()
+    test_summarize_keeps_topical_sentences_in_order()
+    print("✅ context tests passed")
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from convergence import ConvergenceMonitor
+from stub_server import ScriptedStubServer
+
+
+def _call(name, **arguments):
+    return {"function": {"name": name, "arguments": arguments}}
+
+
+def test_escalates_from_nudge_to_forced_tool_choice_to_stop():
+    monitor = ConvergenceMonitor(max_loops=15, patience=2)
+    assert monitor.observe("", [_call("search", query="turtles")], ["Result: a"]) == "continue"
+    assert monitor.observe("I think that's it.", [], []) == "nudge"
+    assert "without calling a tool" in monitor.nudge() and monitor.tool_choice() == "auto"
+    assert monitor.observe("I think that's it.", [], []) == "nudge"
+    assert "repeated the previous response" in monitor.nudge()
+    assert monitor.observe("Done.", [], []) == "force"
+    assert monitor.tool_choice() == "required"
+    assert monitor.observe("Done.", [], []) == "stop"
+    assert monitor.partial_result() == "Done."
+    assert monitor.report(loops=5, stopped=True) == {"stalled_turns": 4, "nudges": 2, "forced": 1,
+                                                     "stopped_early": True, "turns_saved": 10}
+
+
+def test_repeated_calls_and_stale_outputs_stall_but_progress_resets():
+    monitor = ConvergenceMonitor(max_loops=10, patience=1)
+    monitor.observe("", [_call("search", query="a")], ["✅ Called search with a. Result: x"])
+    # Same call with its arguments in another order
+    assert monitor.observe("", [{"function": {"name": "search", "arguments": '{"query": "a"}'}}], ["Result: x"]) == "nudge"
+    assert "repeated tool calls" in monitor.nudge()
+    # A new call is progress even though the stall count was up
+    assert monitor.observe("", [_call("search", query="b")], ["Result: y"]) == "continue"
+    assert monitor.tool_choice() == "auto"
+    # A different call that only turns up an output already seen
+    assert monitor.observe("", [_call("search", query="c")], ["Result: y"]) == "nudge"
+    assert "no tool output" in monitor.nudge()
+
+
+def test_different_calls_returning_none_are_progress():
+    monitor = ConvergenceMonitor(max_loops=10, patience=1)
+    monitor.observe("", [_call("write_to_file", filename="a.txt", content="one")],
+                    ["✅ Called write_to_file with a.txt. Result: None"])
+    assert monitor.observe("", [_call("write_to_file", filename="b.txt", content="two")],
+                           ["✅ Called write_to_file with b.txt. Result: None"]) == "continue"
+    assert monitor.observe("", [_call("all_work_is_finished", is_finished=False)], ["Result: None"]) == "continue"
+
+
+def test_agent_stops_a_model_that_keeps_talking():
+    with ScriptedStubServer(["Let me think."] * 20) as server:
+        original = main.MODEL_BASE_URL
+        main.MODEL_BASE_URL = server.url
+        try:
+            result = main.run_agent("Say hi", max_loops=10, show_progress=False, checkpoint=False)
+        finally:
+            main.MODEL_BASE_URL = original
+    assert result["status"] == "stalled" and result["loops"] == 4
+    assert result["convergence"]["turns_saved"] == 6
+    assert result["partial"] == "Let me think."
+    assert "No progress" in result["messages"][-1]["content"]
+
+
+if __name__ == "__main__":
+    test_escalates_from_nudge_to_forced_tool_choice_to_stop()
+    test_repeated_calls_and_stale_outputs_stall_but_progress_resets()
+    test_different_calls_returning_none_are_progress()
+    test_agent_stops_a_model_that_keeps_talking()
+    print("✅ convergence tests passed")
@@ -0,0 +1,44 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from extract import extract_text, EXTRACTORS
+
+PAGE = b"""<!DOCTYPE html><html><head><title>T</title><script>var s = "<p>not text</p>";</script>
+<style>p { color: red; }</style></head><body><nav><a href="/">Home</a></nav>
+<h1>Turtles &amp; tortoises</h1><p>Box <b>turtles</b> <i>live</i> in New Mexico.</p>
+<SCRIPT type="text/javascript">tracker();</SCRIPT><!-- <p>hidden</p> -->
+<ul><li>one</li><li>two</li></ul><footer>(c) 2024</footer></body></html>"""
+
+
+def test_fast_engine_drops_boilerplate():
+    text = extract_text(PAGE, engine="fast")
+    assert text == "Turtles & tortoises Box turtles live in New Mexico. one two"
+
+
+def test_fast_engine_stops_at_budget():
+    text = extract_text(PAGE, engine="fast", max_chars=12)
+    assert text == "Turtles & to"
+
+
+def test_every_engine_finds_the_article_text():
+    for name in EXTRACTORS:
+        try:
+            text = extract_text(PAGE, engine=name, max_chars=None)
+        except ImportError:
+            continue
+        assert "Box turtles live in New Mexico." in text
+        assert "not text" not in text and "tracker" not in text
+
+
+def test_fast_engine_reads_declared_charset():
+    page = '<meta charset="windows-1252"><p>Caf\xe9</p>'.encode("cp1252")
+    assert extract_text(page, engine="fast") == "Caf\xe9"
+
+
+if __name__ == "__main__":
+    test_fast_engine_drops_boilerplate()
+    test_fast_engine_stops_at_budget()
+    test_every_engine_finds_the_article_text()
+    test_fast_engine_reads_declared_charset()
+    print("✅ extract tests passed")
@@ -0,0 +1,91 @@
+import sys
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fetcher import fetch_pages, HostRateLimiter
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """Serves /slow/<seconds>, /big, /pdf and plain pages."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        content_type = "text/html; charset=utf-8"
+        body = f"<html><body><p>{self.path}</p></body></html>".encode()
+        if self.path.startswith("/slow/"):
+            time.sleep(float(self.path.split("/")[-1]))
+        elif self.path == "/big":
+            body = b"<p>" + b"x" * 500_000 + b"</p>"
+        elif self.path == "/pdf":
+            content_type = "application/pdf"
+            body = b"%PDF-1.4" + b"0" * 100_000
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _serve():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def test_pages_download_concurrently():
+    # Every URL is on one host, so turn the per-host limiter off to measure concurrency alone
+    httpd = _serve()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        start = time.perf_counter()
+        pages = fetch_pages([f"{base}/slow/0.3" for _ in range(5)], host_interval=0)
+        elapsed = time.perf_counter() - start
+    finally:
+        httpd.shutdown()
+    assert all("content" in page for page in pages)
+    assert elapsed < 1.0
+
+
+def test_size_cap_content_type_and_deadline():
+    httpd = _serve()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        start = time.perf_counter()
+        big, pdf, slow, ok = fetch_pages([f"{base}/big", f"{base}/pdf", f"{base}/slow/3", f"{base}/ok"],
+                                         host_interval=0, max_bytes=100_000, deadline=0.5)
+        elapsed = time.perf_counter() - start
+    finally:
+        httpd.shutdown()
+
+    assert big["truncated"] and len(big["content"]) == 100_000
+    assert "non-HTML" in pdf["error"]
+    assert "Deadline" in slow["error"]
+    assert b"/ok" in ok["content"]
+    assert elapsed < 1.0
+
+
+def test_host_rate_limiter_spaces_same_host_only():
+    limiter = HostRateLimiter(min_interval=0.2)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire("a.example")
+    limiter.acquire("b.example")
+    elapsed = time.monotonic() - start
+    assert 0.35 < elapsed < 0.6
+    # A slot past the deadline is refused instead of waited for
+    assert limiter.acquire("a.example", deadline=time.monotonic()) is False
+
+
+if __name__ == "__main__":
+    test_pages_download_concurrently()
+    test_size_cap_content_type_and_deadline()
+    test_host_rate_limiter_spaces_same_host_only()
+    print("✅ fetcher tests passed")
@@ -0,0 +1,51 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import message_log
+from message_log import MessageLog, encode_payload
+
+
+def _payload(messages):
+    return {"model": "m", "messages": messages, "tools": [{"type": "function"}], "tool_choice": "auto"}
+
+
+def test_body_matches_plain_json():
+    messages = MessageLog([{"role": "system", "content": "sys"}, {"role": "user", "content": "río 🐢 \"quoted\""}])
+    body = encode_payload(_payload(messages))
+    assert json.loads(body) == json.loads(json.dumps(_payload(list(messages))))
+
+
+def test_only_new_messages_are_encoded():
+    messages = MessageLog([{"role": "system", "content": "sys"}, {"role": "user", "content": "task"}])
+    tools = [{"type": "function", "function": {"name": "t"}}]
+    encode_payload({"messages": messages, "tools": tools})
+
+    encoded = []
+    original = message_log.encode_json
+    message_log.encode_json = lambda value: encoded.append(value) or original(value)
+    try:
+        messages.append({"role": "user", "content": "turn 1"})
+        encode_payload({"messages": messages, "tools": tools})
+    finally:
+        message_log.encode_json = original
+
+    # The new message plus the two field names; the old messages and the tools are reused
+    assert {"role": "user", "content": "turn 1"} in encoded
+    assert tools not in encoded
+    assert len([v for v in encoded if isinstance(v, dict)]) == 1
+
+
+def test_replaced_message_is_re_encoded():
+    messages = MessageLog([{"role": "user", "content": "long tool output"}])
+    messages.encode()
+    messages[0] = {"role": "user", "content": "short"}
+    assert json.loads(messages.encode()) == [{"role": "user", "content": "short"}]
+
+
+if __name__ == "__main__":
+    test_body_matches_plain_json()
+    test_only_new_messages_are_encoded()
+    test_replaced_message_is_re_encoded()
+    print("✅ message log tests passed")
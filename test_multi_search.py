@@ -0,0 +1,50 @@
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import mysearch2
+
+
+def _fake_search(client, query, max_results):
+    time.sleep(0.2)
+    if query == "bad":
+        raise RuntimeError("boom")
+    return f"context for {query} ({max_results})"
+
+
+def test_search_many_isolates_failures_and_keeps_order():
+    os.environ.setdefault("TAVILY_API_KEY", "test-key")
+    start = time.perf_counter()
+    results = mysearch2.search_many(["turtles", "bad", "lizards", "frogs"], max_results=2,
+                                    max_concurrency=4, search=_fake_search)
+    elapsed = time.perf_counter() - start
+
+    assert [r["query"] for r in results] == ["turtles", "bad", "lizards", "frogs"]
+    assert results[0]["context"] == "context for turtles (2)"
+    assert "boom" in results[1]["error"]
+    assert "context" in results[2] and "context" in results[3]
+    # Four 0.2 s searches run side by side
+    assert elapsed < 0.6
+
+
+def test_shared_client_is_reused():
+    os.environ.setdefault("TAVILY_API_KEY", "test-key")
+    assert mysearch2.get_tavily_client() is mysearch2.get_tavily_client()
+
+
+def test_missing_key_is_reported_as_an_error():
+    original = os.environ.pop("TAVILY_API_KEY", None)
+    try:
+        result = mysearch2.tavily_search_and_scrape("missing key check")
+        assert result["error"].startswith("Failed to initialize Tavily client: TAVILY_API_KEY")
+    finally:
+        if original is not None:
+            os.environ["TAVILY_API_KEY"] = original
+
+
+if __name__ == "__main__":
+    test_search_many_isolates_failures_and_keeps_order()
+    test_shared_client_is_reused()
+    test_missing_key_is_reported_as_an_error()
+    print("✅ multi search tests passed")
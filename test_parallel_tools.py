@@ -0,0 +1,67 @@
+import sys
+import os
+import json
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from stub_server import StubServer, make_completion
+
+
+def _call(call_id, name, arguments):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+
+class ParallelStub(StubServer):
+    """Asks for three slow calls in one turn, then finishes."""
+
+    def respond(self, payload):
+        if payload["messages"][-1]["role"] == "user":
+            return make_completion("", tool_calls=[
+                _call("a", "slow_echo", {"text": "one"}),
+                _call("b", "slow_echo", {"text": "two"}),
+                _call("c", "slow_echo", {"text": "three"}),
+            ])
+        return make_completion("", tool_calls=[_call("d", "all_work_is_finished", {"is_finished": True})])
+
+
+def slow_echo(text: str) -> str:
+    time.sleep(0.3)
+    return text.upper()
+
+
+def _run(stream: bool) -> tuple:
+    original_url, original_map = main.MODEL_BASE_URL, dict(main.tool_map)
+    main.tool_map["slow_echo"] = slow_echo
+    main.console.quiet = True
+    try:
+        with ParallelStub() as server:
+            main.MODEL_BASE_URL = server.url
+            start = time.perf_counter()
+            result = main.run_agent("echo three things", stream=stream, show_progress=False, checkpoint=False,
+                                    parallel_tools=True)
+            return result, time.perf_counter() - start
+    finally:
+        main.MODEL_BASE_URL = original_url
+        main.tool_map.clear()
+        main.tool_map.update(original_map)
+        main.console.quiet = False
+
+
+def test_parallel_tool_calls_run_concurrently_and_keep_order():
+    for stream in (False, True):
+        result, elapsed = _run(stream)
+        assert result["status"] == "finished"
+        assert result["loops"] == 2
+
+        tool_messages = [m for m in result["messages"] if m["role"] == "tool"]
+        assert [m["tool_call_id"] for m in tool_messages] == ["a", "b", "c", "d"]
+        assert ["ONE" in tool_messages[0]["content"], "TWO" in tool_messages[1]["content"],
+                "THREE" in tool_messages[2]["content"]] == [True, True, True]
+        # Three 0.3 s calls run side by side instead of back to back
+        assert elapsed < 0.8
+
+
+if __name__ == "__main__":
+    test_parallel_tool_calls_run_concurrently_and_keep_order()
+    print("✅ test_parallel_tool_calls_run_concurrently_and_keep_order")
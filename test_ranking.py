@@ -0,0 +1,106 @@
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ranking import PassageRanker, chunk_spans, split_chunks, rank_passages
+from fetcher import iter_pages
+
+FILLER = "The weather was mild and the trail was quiet that morning. "
+
+
+def test_chunks_respect_size_and_boundaries():
+    text = "\n".join(f"Paragraph {i}. " + FILLER * 3 for i in range(20))
+    chunks = split_chunks(text, 400)
+    assert all(len(chunk) <= 400 for chunk in chunks)
+    # Cut between paragraphs, never inside a word
+    assert all(chunk.startswith("Paragraph") for chunk in chunks)
+    assert "".join("".join(chunks).split()) == "".join(text.split())
+    # A paragraph longer than the window is split after a sentence
+    long = FILLER * 30
+    assert all(chunk.endswith(".") for chunk in split_chunks(long, 300))
+    assert chunk_spans("   ") == []
+    assert split_chunks("x" * 50, 20) == ["x" * 20, "x" * 20, "x" * 10]
+
+
+def test_relevant_passages_rank_first_within_budget():
+    pages = [
+        {"url": "a", "text": FILLER * 20 + "\nBox turtles nest in sandy soil near the river. " + FILLER * 20},
+        {"url": "b", "text": FILLER * 40},
+        {"url": "c", "text": "Box turtle nesting season starts in June; each box turtle digs a nest. " + FILLER * 20},
+    ]
+    passages = rank_passages("where do box turtles nest", pages, top_k=3, char_budget=1700)
+    assert [p["url"] for p in passages][:2] == ["c", "a"]
+    assert passages[0]["score"] > passages[1]["score"] > 0
+    assert "turtle" in passages[0]["text"].lower()
+    assert sum(len(p["text"]) for p in passages) <= 1700
+    # Passages without any query term are never returned while others match
+    assert all("turtle" in p["text"].lower() for p in passages)
+
+
+def test_budget_cut_and_fallback():
+    ranker = PassageRanker("river")
+    ranker.add("The river " + "runs " * 300, "a")
+    passages = ranker.top(5, char_budget=100)
+    assert len(passages) == 1 and len(passages[0]["text"]) == 100
+    # No passage mentions the query: the opening passages come back instead of nothing
+    ranker = PassageRanker("glacier")
+    ranker.add(FILLER * 40, "b")
+    passages = ranker.top(2, char_budget=10_000)
+    assert [p["score"] for p in passages] == [0.0, 0.0]
+    assert passages[0]["text"].startswith("The weather")
+    assert PassageRanker("river").top() == []
+
+
+def test_rare_terms_and_length_are_weighted():
+    ranker = PassageRanker("snapping turtle")
+    # "turtle" is everywhere, "snapping" only in one passage
+    for i in range(10):
+        ranker.add(f"Turtle notes {i}. " + "A turtle rests. " * 5, f"common{i}")
+    ranker.add("A snapping turtle rests. " + FILLER, "rare")
+    assert ranker.top(1)[0]["url"] == "rare"
+    assert len(ranker) == 11
+    assert ranker.scores().shape == (11,)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/slow":
+            threading.Event().wait(0.5)
+        body = f"<html><body><p>Turtle page {self.path}</p></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_pages_stream_as_they_arrive():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        urls = [f"{base}/slow", f"{base}/fast"]
+        order = [page["url"] for page in iter_pages(urls, host_interval=0)]
+        late = list(iter_pages([f"{base}/slow"], host_interval=0, deadline=0.1))
+    finally:
+        httpd.shutdown()
+    # The fast page is handed over first, not held back behind the slow one
+    assert order == [f"{base}/fast", f"{base}/slow"]
+    assert late[0]["error"] == "Deadline exceeded"
+
+
+if __name__ == "__main__":
+    test_chunks_respect_size_and_boundaries()
+    test_relevant_passages_rank_first_within_budget()
+    test_budget_cut_and_fallback()
+    test_rare_terms_and_length_are_weighted()
+    test_pages_stream_as_they_arrive()
+    print("✅ ranking tests passed")
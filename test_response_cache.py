@@ -0,0 +1,136 @@
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+import response_cache
+import message_log
+from message_log import MessageLog, encode_payload
+from response_cache import ResponseCache, ResponseCacheMiss, request_key
+from stub_server import StubServer, make_completion
+
+PAYLOAD = {"model": "stub", "messages": [{"role": "user", "content": "hi"}], "tools": [], "tool_choice": "auto"}
+
+
+def _counting_call(response):
+    calls = []
+
+    def call():
+        calls.append(1)
+        return response
+    return call, calls
+
+
+def test_key_ignores_key_order_and_non_content_fields():
+    reordered = {"tool_choice": "auto", "tools": [], "messages": [{"role": "user", "content": "hi"}],
+                 "model": "stub", "stream": False}
+    assert request_key(reordered) == request_key(PAYLOAD)
+    assert request_key({**PAYLOAD, "model": "other"}) != request_key(PAYLOAD)
+
+
+def test_key_reuses_the_encoded_messages():
+    log = MessageLog(PAYLOAD["messages"])
+    assert request_key({**PAYLOAD, "messages": log}) == request_key(PAYLOAD)
+    log.append({"role": "assistant", "content": "hello"})
+    key = request_key({**PAYLOAD, "messages": log})
+    assert key != request_key(PAYLOAD)
+
+    encoded = []
+    original = message_log.encode_json
+    message_log.encode_json = lambda value: encoded.append(value) or original(value)
+    try:
+        log.append({"role": "user", "content": "again"})
+        request_key({**PAYLOAD, "messages": log})
+        encode_payload({**PAYLOAD, "messages": log})
+    finally:
+        message_log.encode_json = original
+    # Of the messages, only the new one was encoded, once for the key and the body together
+    assert [value for value in encoded if isinstance(value, dict)] == [{"role": "user", "content": "again"}]
+
+
+def test_modes():
+    with tempfile.TemporaryDirectory() as tmp:
+        call, calls = _counting_call({"choices": [{"message": {"content": "1"}}]})
+        replay = ResponseCache(tmp, mode="replay")
+        try:
+            replay.fetch(PAYLOAD, call)
+            assert False, "replay should not call the model"
+        except ResponseCacheMiss:
+            pass
+
+        assert ResponseCache(tmp, mode="readthrough").fetch(PAYLOAD, call) == {"choices": [{"message": {"content": "1"}}]}
+        assert ResponseCache(tmp, mode="readthrough").fetch(PAYLOAD, call) == {"choices": [{"message": {"content": "1"}}]}
+        assert replay.fetch(PAYLOAD, call) == {"choices": [{"message": {"content": "1"}}]}
+        assert len(calls) == 1
+
+        # Record always calls through and overwrites
+        call, calls = _counting_call({"choices": [{"message": {"content": "2"}}]})
+        ResponseCache(tmp, mode="record").fetch(PAYLOAD, call)
+        assert replay.fetch(PAYLOAD, call) == {"choices": [{"message": {"content": "2"}}]} and len(calls) == 1
+
+
+def test_error_responses_are_not_stored():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(tmp, mode="readthrough")
+        call, calls = _counting_call({"error": "busy"})
+        assert cache.fetch(PAYLOAD, call) == {"error": "busy"}
+        assert cache.fetch(PAYLOAD, call) == {"error": "busy"}
+        assert len(calls) == 2 and cache.stats["stores"] == 0
+        assert cache.get(PAYLOAD) is None
+
+
+def test_eviction_removes_least_recently_used():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(tmp, mode="readthrough", max_bytes=3000)
+        payloads = [{**PAYLOAD, "model": f"m{i}"} for i in range(10)]
+        for i, payload in enumerate(payloads):
+            cache.put(payload, {"content": "x" * 500})
+            # Keep the first entry recently used
+            os.utime(cache._path(request_key(payloads[0])), (1e10, 1e10))
+        assert cache.evict() <= 3000
+        assert cache.get(payloads[0]) is not None
+        assert cache.get(payloads[1]) is None
+        assert cache.stats["evictions"] > 0
+
+
+class FinishingStub(StubServer):
+    def respond(self, payload):
+        if len(payload["messages"]) <= 2:
+            return make_completion("encoding", tool_calls=[{"id": "a", "type": "function", "function": {
+                "name": "encode_a_secret", "arguments": json.dumps({"secret_to_encode": "abc"})}}])
+        return make_completion("", tool_calls=[{"id": "b", "type": "function", "function": {
+            "name": "all_work_is_finished", "arguments": '{"is_finished": true}'}}])
+
+
+def test_run_agent_replays_offline():
+    original_url = main.MODEL_BASE_URL
+    main.console.quiet = True
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            response_cache._cache, response_cache._cache_mode = ResponseCache(tmp, mode="readthrough"), "readthrough"
+            with FinishingStub() as server:
+                main.MODEL_BASE_URL = server.url
+                recorded = main.run_agent("encode abc", show_progress=False, checkpoint=False)
+
+            # The server is gone: every turn has to come from the cache
+            response_cache._cache, response_cache._cache_mode = ResponseCache(tmp, mode="replay"), "replay"
+            replayed = main.run_agent("encode abc", show_progress=False, checkpoint=False)
+            assert replayed["status"] == recorded["status"] == "finished"
+            assert replayed["messages"] == recorded["messages"]
+            assert response_cache._cache.stats["hits"] == 2
+    finally:
+        response_cache.get_response_cache("off")
+        main.MODEL_BASE_URL = original_url
+        main.console.quiet = False
+
+
+if __name__ == "__main__":
+    test_key_ignores_key_order_and_non_content_fields()
+    test_key_reuses_the_encoded_messages()
+    test_modes()
+    test_error_responses_are_not_stored()
+    test_eviction_removes_least_recently_used()
+    test_run_agent_replays_offline()
+    print("✅ response cache tests passed")
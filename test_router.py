@@ -0,0 +1,128 @@
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+import main
+from router import ModelRouter, parse_endpoints
+from stub_server import StubServer
+from transport import ModelTransport
+
+HEADERS = {"Content-Type": "application/json"}
+BODY = b'{"model": "stub", "messages": []}'
+DEAD_URL = "http://127.0.0.1:1/v1/chat/completions"
+
+
+class OverloadedStub(StubServer):
+    """Answers 503 to the first `failures` requests."""
+
+    def __init__(self, failures: int, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def respond(self, payload):
+        if self.requests <= self.failures:
+            return 503, {"error": "busy"}
+        return super().respond(payload)
+
+
+def _router(urls, **kwargs):
+    return ModelRouter(urls, transport=ModelTransport(pool_size=4), backoff=0.01, **kwargs)
+
+
+def test_parse_endpoints():
+    assert parse_endpoints(" http://a/v1 ,http://b/v1,") == ["http://a/v1", "http://b/v1"]
+
+
+def test_prefers_the_faster_endpoint():
+    with StubServer(latency=0.04) as slow, StubServer(latency=0.002) as fast:
+        router = _router([slow.url, fast.url])
+        for _ in range(20):
+            assert router.post(headers=HEADERS, data=BODY).status_code == 200
+        assert fast.requests > 3 * slow.requests
+
+
+def test_dead_endpoint_is_ejected_and_requests_fail_over():
+    with StubServer() as live:
+        router = _router([DEAD_URL, live.url], failure_threshold=1, cooldown=60)
+        for _ in range(5):
+            assert router.post(headers=HEADERS, data=BODY).status_code == 200
+        dead, healthy = router.snapshot()
+        assert dead["ejected"] and dead["requests"] == 1
+        assert healthy["requests"] == 5
+
+
+def test_endpoint_gets_traffic_again_after_a_failure():
+    with OverloadedStub(failures=1) as flaky, StubServer() as steady:
+        router = _router([flaky.url, steady.url], failure_threshold=3)
+        for _ in range(20):
+            assert router.post(headers=HEADERS, data=BODY).status_code == 200
+        # One overload does not rank the endpoint last for good: it is tried again and recovers
+        assert flaky.requests >= 2
+        assert router.endpoints[0].failures == 0 and router.endpoints[0].ewma is not None
+        assert not router.snapshot()[0]["ejected"]
+
+    with OverloadedStub(failures=1) as flaky, StubServer() as steady:
+        router = _router([flaky.url, steady.url], failure_threshold=1, cooldown=0.1)
+        router.post(headers=HEADERS, data=BODY)
+        assert router.snapshot()[0]["ejected"] and router.stats["ejections"] == 1
+        for _ in range(5):
+            router.post(headers=HEADERS, data=BODY)
+        assert flaky.requests == 1
+        # After the cooldown a probe goes through, and once it succeeds the endpoint is back
+        time.sleep(0.15)
+        assert router.post(headers=HEADERS, data=BODY).status_code == 200
+        assert flaky.requests == 2
+        assert not router.snapshot()[0]["ejected"] and router.endpoints[0].failures == 0
+
+
+def test_retries_overload_with_backoff():
+    with OverloadedStub(failures=2) as server:
+        router = _router([server.url], retries=2, failure_threshold=10)
+        assert router.post(headers=HEADERS, data=BODY).status_code == 200
+        assert router.stats["retries"] == 2
+
+    with OverloadedStub(failures=5) as server:
+        # Out of retries: the last overload response is handed back
+        assert _router([server.url], retries=1).post(headers=HEADERS, data=BODY).status_code == 503
+
+
+def test_run_agent_stops_on_an_error_response():
+    original_url = main.MODEL_BASE_URL
+    main.console.quiet = True
+    try:
+        with OverloadedStub(failures=100) as server:
+            main.MODEL_BASE_URL = server.url
+            try:
+                main.run_agent("encode abc", show_progress=False, checkpoint=False)
+                assert False, "an error response should not be taken as an empty turn"
+            except requests.HTTPError as e:
+                assert e.response.status_code == 503
+    finally:
+        main.MODEL_BASE_URL = original_url
+        main.console.quiet = False
+
+
+def test_hedges_a_slow_request():
+    with StubServer() as a, StubServer() as b:
+        router = _router([a.url, b.url], hedge=True, hedge_min_samples=5)
+        # a has a history of answering within 20 ms, still looks best, but is now slow
+        router.endpoints[0].latencies.extend([0.02] * 10)
+        router.endpoints[0].ewma = 0.0
+        a.latency = 0.5
+        start = time.perf_counter()
+        assert router.post(headers=HEADERS, data=BODY).status_code == 200
+        assert time.perf_counter() - start < 0.4
+        assert router.stats["hedges"] == 1 and router.stats["hedge_wins"] == 1
+
+
+if __name__ == "__main__":
+    test_parse_endpoints()
+    test_prefers_the_faster_endpoint()
+    test_dead_endpoint_is_ejected_and_requests_fail_over()
+    test_endpoint_gets_traffic_again_after_a_failure()
+    test_retries_overload_with_backoff()
+    test_run_agent_stops_on_an_error_response()
+    test_hedges_a_slow_request()
+    print("✅ router tests passed")
@@ -0,0 +1,112 @@
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import search_cache
+from search_cache import SearchCache, cached_search
+
+
+def _miss():
+    raise AssertionError("should have been served from the cache")
+
+
+def test_exact_and_similar_queries_share_results():
+    cache = SearchCache(directory="")
+    assert cache.call("web", "new mexico turtles", {"max_results": 3}, lambda: "NM turtles") == ("NM turtles", None)
+    assert cache.call("web", "New  Mexico TURTLES", {"max_results": 3}, _miss) == ("NM turtles", "exact")
+    # Word order, plurals and stopwords do not matter
+    assert cache.call("web", "Turtle in New Mexico", {"max_results": 3}, _miss) == ("NM turtles", "similar")
+    cache.put("web", "box turtle habitat", {}, "habitat")
+    assert cache.get("web", "the habitat of box turtles", {}) == ("habitat", "similar")
+    # Related but different questions, other numbers and other options all miss
+    assert cache.get("web", "box turtle habitat facts", {}) == (None, None)
+    assert cache.get("web", "box turtle diet", {}) == (None, None)
+    cache.put("web", "python 3.11 release notes", {}, "3.11")
+    assert cache.get("web", "python 3.12 release notes", {}) == (None, None)
+    assert cache.get("web", "new mexico turtles", {"max_results": 5}) == (None, None)
+    assert cache.get("news", "new mexico turtles", {"max_results": 3}) == (None, None)
+    assert cache.stats == {"exact": 1, "similar": 2, "misses": 6}
+
+
+def test_question_and_direction_words_keep_queries_apart():
+    cache = SearchCache(directory="")
+    cache.put("web", "where was Einstein born", {}, "Ulm, Germany")
+    assert cache.get("web", "when was Einstein born", {}) == (None, None)
+    assert cache.get("web", "Where was Einstein born?", {}) == ("Ulm, Germany", "similar")
+    cache.put("web", "flights from Paris to London", {}, "Paris to London")
+    assert cache.get("web", "flights from London to Paris", {}) == (None, None)
+    assert cache.get("web", "flights  from paris to london", {}) == ("Paris to London", "exact")
+
+
+def test_a_word_more_or_less_is_a_different_query():
+    cache = SearchCache(directory="")
+    for cached, asked in [("mexico turtles", "new mexico turtles"),
+                          ("cheap flights london", "cheap flights london paris"),
+                          ("apple stock price", "apple stock price today")]:
+        cache.put("web", cached, {}, cached)
+        assert cache.get("web", asked, {}) == (None, None), asked
+        cache.put("web", asked, {}, asked)
+        assert cache.get("web", cached, {}) == (cached, "exact")
+
+
+def test_ttl_and_lru_eviction():
+    cache = SearchCache(directory="", ttl=0.05, max_entries=2)
+    cache.put("web", "alpha", {}, 1)
+    time.sleep(0.06)
+    assert cache.get("web", "alpha", {}) == (None, None) and len(cache) == 0
+
+    cache = SearchCache(directory="", max_entries=2)
+    cache.put("web", "alpha", {}, 1)
+    cache.put("web", "bravo", {}, 2)
+    time.sleep(0.01)
+    cache.get("web", "alpha", {})
+    cache.put("web", "charlie", {}, 3)
+    # bravo was the least recently used
+    assert cache.get("web", "bravo", {}) == (None, None)
+    assert cache.get("web", "alpha", {}) == (1, "exact") and cache.get("web", "charlie", {}) == (3, "exact")
+
+
+def test_index_persists_and_loads_memory_mapped():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SearchCache(directory=directory)
+        cache.put("web", "box turtle habitat", {"max_results": 2}, [{"url": "u", "content": "c"}])
+        reloaded = SearchCache(directory=directory)
+        assert reloaded.get("web", "box turtles habitat", {"max_results": 2})[1] == "similar"
+        assert isinstance(reloaded._vectors, np.memmap)
+        reloaded.put("web", "painted turtle", {"max_results": 2}, "painted")
+        assert len(SearchCache(directory=directory)) == 2
+
+
+def test_decorator_fronts_search_functions():
+    calls = []
+
+    @cached_search("test_decorator", exclude=("client",), cache_if=lambda result: result != "error")
+    def search(client, query, max_results=3):
+        calls.append(query)
+        return "error" if query == "broken" else f"{query}:{max_results}"
+
+    cache = search_cache.get_search_cache()
+    directory, cache.directory = cache.directory, ""
+    cache.clear()
+    try:
+        assert search(object(), "box turtles") == "box turtles:3"
+        assert search(object(), query="Box turtle", max_results=3) == "box turtles:3"
+        assert search(None, "box turtles", max_results=4) == "box turtles:4"
+        search(None, "broken")
+        search(None, "broken")
+        assert calls == ["box turtles", "box turtles", "broken", "broken"]
+    finally:
+        cache.directory = directory
+
+
+if __name__ == "__main__":
+    test_exact_and_similar_queries_share_results()
+    test_question_and_direction_words_keep_queries_apart()
+    test_a_word_more_or_less_is_a_different_query()
+    test_ttl_and_lru_eviction()
+    test_index_persists_and_loads_memory_mapped()
+    test_decorator_fronts_search_functions()
+    print("✅ search cache tests passed")
@@ -0,0 +1,142 @@
+import sys
+import os
+import json
+import socket
+import asyncio
+import tempfile
+import threading
+import contextlib
+import requests
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+import checkpoint
+from server import AgentServer
+from search_cache import get_search_cache
+from stub_server import ScriptedStubServer
+
+SCRIPT = [
+    [("encode_a_secret", {"secret_to_encode": "ab"})],
+    [("my_super_cool_function", {"x_int": 1, "y_int": 2})],
+]
+
+
+@contextlib.contextmanager
+def running(server: AgentServer):
+    """Run `server` on its own event loop thread and yield its base URL."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start("127.0.0.1", 0), loop).result(5)
+    try:
+        yield f"http://127.0.0.1:{server.port}"
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+
+def read_events(url: str, **headers) -> list:
+    events = []
+    with requests.get(url, stream=True, timeout=10, headers=headers) as response:
+        assert response.headers["Content-Type"].startswith("text/event-stream")
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("data: "):
+                events.append(json.loads(line[len("data: "):]))
+    return events
+
+
+def test_sessions_run_concurrently_and_stream_progress():
+    original = (main.MODEL_BASE_URL, checkpoint.CHECKPOINT_DIR)
+    main.console.quiet = True
+    search_cache = get_search_cache()
+    search_cache.directory = ""
+    try:
+        with tempfile.TemporaryDirectory() as directory, \
+                ScriptedStubServer(SCRIPT, latency=0.05) as stub, \
+                running(AgentServer(main.run_agent, concurrency=4, queue_size=8)) as base:
+            checkpoint.CHECKPOINT_DIR = directory
+            main.MODEL_BASE_URL = stub.url
+            created = [requests.post(f"{base}/sessions", json={"prompt": f"task {i}", "parallel_tools": True})
+                       for i in range(4)]
+            assert [r.status_code for r in created] == [202] * 4
+            ids = [r.json()["id"] for r in created]
+            assert created[0].headers["Location"] == f"/sessions/{ids[0]}"
+
+            events = read_events(f"{base}/sessions/{ids[0]}/events")
+            kinds = [e["type"] for e in events]
+            assert kinds[0] == "turn" and kinds[-1] == "done" and kinds.count("turn") == len(SCRIPT) + 1
+            assert [e["seq"] for e in events] == list(range(len(events)))
+            assert all(e["run_id"] == ids[0] for e in events)
+            tools = [e for e in events if e["type"] == "tools"]
+            assert "xxaxxb" in json.dumps(tools[0]["results"])
+            # Reconnecting with Last-Event-ID only sends what came after it
+            assert read_events(f"{base}/sessions/{ids[0]}/events", **{"Last-Event-ID": "1"}) == events[2:]
+
+            for sid in ids[1:]:
+                read_events(f"{base}/sessions/{sid}/events")
+            summaries = [requests.get(f"{base}/sessions/{sid}").json() for sid in ids]
+            assert all(s["status"] == "finished" and s["loops"] == len(SCRIPT) + 1 for s in summaries)
+            assert "messages" not in summaries[0]
+            detail = requests.get(f"{base}/sessions/{ids[0]}", params={"messages": 1}).json()
+            assert detail["messages"][1]["content"] == "task 0"
+            # 4 sessions x 3 turns in about 3 turns' time: they ran side by side
+            assert stub.requests == 4 * (len(SCRIPT) + 1)
+
+            waited = requests.post(f"{base}/sessions", json={"prompt": "wait for me", "wait": True})
+            assert waited.status_code == 200 and waited.json()["status"] == "finished"
+            health = requests.get(f"{base}/health").json()
+            assert health["finished"] == 5 and health["running"] == 0 and health["sessions"] == 5
+            assert "agent_tool_calls_total" in requests.get(f"{base}/metrics").text
+    finally:
+        main.MODEL_BASE_URL, checkpoint.CHECKPOINT_DIR = original
+        main.console.quiet = False
+        search_cache.clear()
+
+
+def test_full_queue_is_refused_and_bad_requests_rejected():
+    release = threading.Event()
+
+    def blocked_run(prompt, run_id, on_event, **options):
+        on_event({"type": "turn", "run_id": run_id, "turn": 0})
+        release.wait(10)
+        if prompt == "boom":
+            raise RuntimeError("model went away")
+        return {"status": "finished", "loops": 1, "messages": [{"role": "assistant", "content": prompt}]}
+
+    with running(AgentServer(blocked_run, concurrency=1, queue_size=1)) as base:
+        first = requests.post(f"{base}/sessions", json={"prompt": "boom"}).json()
+        second = requests.post(f"{base}/sessions", json={"prompt": "two"}).json()
+        refused = requests.post(f"{base}/sessions", json={"prompt": "three"})
+        assert refused.status_code == 429 and refused.headers["Retry-After"] == "1"
+        health = requests.get(f"{base}/health").json()
+        assert (health["running"], health["queued"], health["rejected"]) == (1, 1, 1)
+
+        assert requests.post(f"{base}/sessions", data="not json").status_code == 400
+        assert requests.post(f"{base}/sessions", json={"prompt": ""}).status_code == 400
+        assert requests.post(f"{base}/sessions", json={"prompt": "x", "max_loops": "3"}).status_code == 400
+        assert requests.post(f"{base}/sessions", json={"prompt": "x", "model": "y"}).status_code == 400
+        assert requests.post(f"{base}/sessions", json={"prompt": "x", "wait": "yes"}).status_code == 400
+        for length in ("abc", "-5"):
+            with socket.create_connection(("127.0.0.1", int(base.rsplit(":", 1)[1])), timeout=5) as sock:
+                sock.sendall(f"POST /sessions HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode("latin-1"))
+                assert sock.recv(1024).startswith(b"HTTP/1.1 400 ")
+        assert requests.get(f"{base}/sessions/missing").status_code == 404
+        assert requests.delete(f"{base}/sessions").status_code == 405
+
+        release.set()
+        events = read_events(f"{base}/sessions/{first['id']}/events")
+        assert [e["type"] for e in events] == ["turn", "error"]
+        # A negative Last-Event-ID replays everything rather than the tail
+        assert read_events(f"{base}/sessions/{first['id']}/events", **{"Last-Event-ID": "-5"}) == events
+        failed = requests.get(f"{base}/sessions/{first['id']}").json()
+        assert failed["status"] == "error" and "model went away" in failed["error"]
+        read_events(f"{base}/sessions/{second['id']}/events")
+        assert requests.get(f"{base}/sessions/{second['id']}").json()["answer"] == "two"
+
+
+if __name__ == "__main__":
+    test_sessions_run_concurrently_and_stream_progress()
+    test_full_queue_is_refused_and_bad_requests_rejected()
+    print("✅ server tests passed")
@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_startup import load_budget, loaded_modules, parse_importtime, parse_statement_time
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 | site
+import time:       300 |        500 |     urllib3
+import time:       200 |        900 |   requests
+import time:        50 |         50 |   json
+import time:       400 |       1350 | main
+"""
+
+
+def test_parse_importtime_direct_dependencies():
+    total, children = parse_importtime(SAMPLE)
+    assert total == 1350
+    assert children == {"requests": 900, "json": 50}
+
+
+def test_parse_statement_time_sums_top_level_imports():
+    # requests and json are imported by main, so only main counts; so does a second top-level import
+    sample = SAMPLE + "import time:       200 |        700 | rich\n"
+    assert parse_statement_time(sample) == 1350 + 700
+
+
+def test_import_main_defers_heavy_modules():
+    # Checked in a fresh interpreter: other tests may already have imported these
+    assert loaded_modules("main", load_budget()["deferred_modules"]) == []
+
+
+if __name__ == "__main__":
+    test_parse_importtime_direct_dependencies()
+    test_parse_statement_time_sums_top_level_imports()
+    test_import_main_defers_heavy_modules()
+    print("✅ startup tests passed")
@@ -0,0 +1,84 @@
+import sys
+import os
+import json
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from streaming import consume_stream, iter_sse_events
+from stub_server import StubServer, make_completion, completion_to_chunks
+from transport import ModelTransport
+
+
+def _sse_lines(events):
+    lines = [f"data: {json.dumps(e)}".encode() for e in events]
+    return lines + [b"", b"data: [DONE]"]
+
+
+def test_iter_sse_events_skips_comments_and_stops_at_done():
+    lines = [b": keep-alive", b"", b'data: {"a": 1}', b"data: [DONE]", b'data: {"b": 2}']
+    assert list(iter_sse_events(lines)) == [{"a": 1}]
+
+
+def test_tool_call_arguments_are_assembled_from_deltas():
+    completion = make_completion("", tool_calls=[
+        {"id": "call_1", "type": "function",
+         "function": {"name": "encode_a_secret", "arguments": json.dumps({"secret_to_encode": "turtles"})}},
+    ])
+    message, metrics = consume_stream(_sse_lines(completion_to_chunks(completion, chunk_size=3)), time.perf_counter())
+
+    call = message["tool_calls"][0]
+    assert call["id"] == "call_1"
+    assert call["function"]["name"] == "encode_a_secret"
+    assert json.loads(call["function"]["arguments"]) == {"secret_to_encode": "turtles"}
+    assert metrics["time_to_first_token"] is not None
+    assert metrics["time_to_tool_dispatch"] is not None
+
+
+def test_tool_is_dispatched_before_the_stream_ends():
+    completion = make_completion("", tool_calls=[
+        {"id": "a", "type": "function", "function": {"name": "first", "arguments": '{"x": 1}'}},
+        {"id": "b", "type": "function", "function": {"name": "second", "arguments": '{"y": 2}'}},
+    ])
+    events = completion_to_chunks(completion, chunk_size=2)
+    seen = []
+
+    def lines():
+        for line in _sse_lines(events):
+            seen.append(line)
+            yield line
+
+    dispatched_at = []
+    consume_stream(lines(), time.perf_counter(),
+                   on_tool_call=lambda call: dispatched_at.append((call["function"]["name"], len(seen))))
+
+    assert [name for name, _ in dispatched_at] == ["first", "second"]
+    # The first call went out while the second call's arguments were still streaming
+    assert dispatched_at[0][1] < dispatched_at[1][1] < len(seen)
+
+
+def test_streamed_text_is_rendered_as_it_arrives():
+    completion = make_completion("Turtles are reptiles.")
+    fragments = []
+    message, _ = consume_stream(_sse_lines(completion_to_chunks(completion, chunk_size=4)), time.perf_counter(),
+                                on_text=fragments.append)
+    assert len(fragments) > 1
+    assert "".join(fragments) == message["content"] == "Turtles are reptiles."
+    assert "tool_calls" not in message
+
+
+def test_stream_against_stub_server():
+    with StubServer(chunk_size=5) as server:
+        transport = ModelTransport(pool_size=1)
+        response = transport.post(server.url, json={"model": "stub", "messages": [], "stream": True}, stream=True)
+        message, metrics = consume_stream(response.iter_lines(), time.perf_counter())
+        response.close()
+        transport.close()
+    assert message["content"] == "Hello from the stub server."
+    assert metrics["time_to_tool_dispatch"] is None
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
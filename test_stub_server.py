@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+import mysearch2
+from search_cache import get_search_cache
+from stub_server import ScriptedStubServer
+
+SCRIPT = [
+    [("encode_a_secret", {"secret_to_encode": "ab"})],
+    "Thinking it over.",
+    [("my_super_cool_function", {"x_int": 0, "y_int": 0}), ("encode_a_secret", {"secret_to_encode": "c"})],
+]
+
+
+def _run(parallel_tools: bool) -> dict:
+    original_url = main.MODEL_BASE_URL
+    main.console.quiet = True
+    try:
+        with ScriptedStubServer(SCRIPT, latency=0.01, jitter=0.005) as server:
+            main.MODEL_BASE_URL = server.url
+            result = main.run_agent("script", show_progress=False, checkpoint=False, parallel_tools=parallel_tools)
+            assert server.requests == len(SCRIPT) + 1
+            return result
+    finally:
+        main.MODEL_BASE_URL = original_url
+        main.console.quiet = False
+
+
+def test_scripted_session_plays_every_turn():
+    for parallel_tools in (False, True):
+        result = _run(parallel_tools)
+        assert result["status"] == "finished"
+        assert result["loops"] == len(SCRIPT) + 1
+        contents = " ".join(m.get("content") or "" for m in result["messages"])
+        assert "xxaxxb" in contents and "Result: 0.0" in contents
+        # The second call of the last scripted turn runs only when parallel tools are on
+        assert ("xxc" in contents) == parallel_tools
+
+
+def test_search_stub_serves_tavily_client():
+    original = {key: os.environ.get(key) for key in ("TAVILY_API_KEY", "TAVILY_API_BASE_URL")}
+    cache = get_search_cache()
+    directory, cache.directory = cache.directory, ""
+    cache.clear()
+    try:
+        with ScriptedStubServer([]) as server:
+            os.environ["TAVILY_API_KEY"] = "tvly-stub"
+            os.environ["TAVILY_API_BASE_URL"] = server.base_url
+            context = mysearch2.tavily_context_search("box turtles", max_results=2)
+            assert "box turtles - result 1" in context or "Stub result 1 about box turtles" in context
+            assert server.searches == 1
+            # A near-identical query is answered from the search cache
+            assert mysearch2.tavily_context_search("Box turtle", max_results=2) == context
+            assert server.searches == 1
+    finally:
+        cache.directory = directory
+        for key, value in original.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+if __name__ == "__main__":
+    test_scripted_session_plays_every_turn()
+    test_search_stub_serves_tavily_client()
+    print("✅ stub server tests passed")
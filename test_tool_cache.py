@@ -0,0 +1,82 @@
+import sys
+import os
+import time
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from mysearch2 import search_succeeded
+from tool_cache import ToolCache
+
+
+def _counter(result="done", delay=0.0):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(delay)
+        return result
+    return compute, calls
+
+
+def test_lru_ttl_and_argument_order():
+    cache = ToolCache(max_entries=2, directory="")
+    compute, calls = _counter()
+    assert cache.call("t", {"a": 1, "b": 2}, compute) == ("done", False)
+    assert cache.call("t", {"b": 2, "a": 1}, compute) == ("done", True)
+    cache.call("t", {"a": 2}, compute)
+    cache.call("t", {"a": 3}, compute)
+    # {"a": 1, "b": 2} was least recently used and got dropped
+    assert cache.call("t", {"a": 1, "b": 2}, compute)[1] is False
+    assert cache.stats() == {"t": {"hits": 1, "misses": 4}}
+
+    compute, calls = _counter()
+    cache.call("ttl", {}, compute, ttl=0.05)
+    assert cache.call("ttl", {}, compute, ttl=0.05)[1] is True
+    time.sleep(0.06)
+    assert cache.call("ttl", {}, compute, ttl=0.05)[1] is False
+
+
+def test_persistent_tier_errors_and_versions():
+    with tempfile.TemporaryDirectory() as tmp:
+        compute, calls = _counter(["a", "b"])
+        ToolCache(directory=tmp).call("search", {"q": "x"}, compute, persist=True, version="v1")
+        # A new process (fresh memory tier) still hits, unless the tool's code changed
+        assert ToolCache(directory=tmp).call("search", {"q": "x"}, compute, persist=True, version="v1") == (["a", "b"], True)
+        assert ToolCache(directory=tmp).call("search", {"q": "x"}, compute, persist=True, version="v2")[1] is False
+
+        failed, _ = _counter("Context search failed: timeout")
+        cache = ToolCache(directory=tmp)
+        cache.call("search", {"q": "y"}, failed, persist=True, cache_if=search_succeeded)
+        assert cache.call("search", {"q": "y"}, failed, persist=True, cache_if=search_succeeded)[1] is False
+
+
+def test_concurrent_identical_calls_run_once():
+    cache = ToolCache(directory="")
+    compute, calls = _counter(delay=0.1)
+    threads = [threading.Thread(target=cache.call, args=("slow", {"x": 1}, compute)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert cache.stats()["slow"] == {"hits": 3, "misses": 1}
+
+
+def test_call_tool_serves_repeats_from_cache():
+    main.tool_cache.clear()
+    before = main.tool_cache.stats().get("encode_a_secret", {"hits": 0})["hits"]
+    first = main.call_tool("encode_a_secret", {"secret_to_encode": "shell"})
+    assert main.call_tool("encode_a_secret", {"secret_to_encode": "shell"}) == first
+    assert main.tool_cache.stats()["encode_a_secret"]["hits"] == before + 1
+    # Tools not registered as cacheable always run
+    assert not main.registry.options("write_to_file").get("cacheable")
+
+
+if __name__ == "__main__":
+    test_lru_ttl_and_argument_order()
+    test_persistent_tier_errors_and_versions()
+    test_concurrent_identical_calls_run_once()
+    test_call_tool_serves_repeats_from_cache()
+    print("✅ tool cache tests passed")
@@ -0,0 +1,79 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from tool_call_parser import ToolCallParser, repair_value, strip_thinking
+from stub_server import ScriptedStubServer
+
+SCHEMAS = [
+    {"type": "function", "function": {"name": "search", "parameters": {
+        "type": "object", "required": ["query"],
+        "properties": {"query": {"type": "string"}, "max_results": {"type": "integer"},
+                       "tags": {"type": "array", "items": {"type": "string"}}}}}},
+    {"type": "function", "function": {"name": "finish", "parameters": {
+        "type": "object", "required": ["done"], "properties": {"done": {"type": "boolean"}}}}},
+]
+
+
+def _parsed(parser, text):
+    return [(c["function"]["name"], json.loads(c["function"]["arguments"])) for c in parser.parse(text)]
+
+
+def test_finds_calls_in_tags_fences_and_inline_json():
+    parser = ToolCallParser(SCHEMAS)
+    assert strip_thinking("<think>plan {\"name\": \"finish\"}</think>ok<think>unclosed") == "ok"
+    text = ('<think>I should search. {"name": "finish", "arguments": {"done": true}}</think>\n'
+            '<tool_call>\n{"name": "search", "arguments": {"query": "box turtles"}}\n</tool_call>')
+    assert _parsed(parser, text) == [("search", {"query": "box turtles"})]
+    fenced = 'Here you go:\n```json\n[{"name": "search", "parameters": {"query": "a"}}, {"name": "finish", "args": {"done": 1}}]\n```'
+    assert _parsed(parser, fenced) == [("search", {"query": "a"}), ("finish", {"done": True})]
+    inline = 'Calling {"function": {"name": "Search", "arguments": "{\\"query\\": \\"b\\", \\"max_results\\": \\"3\\"}"}} now.'
+    assert _parsed(parser, inline) == [("search", {"query": "b", "max_results": 3})]
+    # Unknown tools, missing required arguments and plain prose are not calls
+    assert parser.parse('{"name": "Alice", "age": 3} and {"name": "search", "arguments": {}}') == []
+    assert parser.parse("No JSON here.") == []
+    assert parser.stats()["rejected"] == 2
+
+
+def test_repairs_common_type_mistakes():
+    assert repair_value("2", {"type": "integer"}) == 2
+    assert repair_value("no", {"type": "boolean"}) is False
+    assert repair_value(7, {"type": "string"}) == "7"
+    assert repair_value("x", {"type": "array", "items": {"type": "string"}}) == ["x"]
+    assert repair_value('["1", "2"]', {"type": "array", "items": {"type": "number"}}) == [1.0, 2.0]
+    number_or_list = {"anyOf": [{"type": "number"}, {"type": "array", "items": {"type": "number"}}]}
+    assert repair_value([1, 2], number_or_list) == [1, 2] and repair_value("4", number_or_list) == 4.0
+    for value, schema in (("2.5", {"type": "integer"}), ("maybe", {"type": "boolean"}), ({}, {"type": "string"})):
+        try:
+            repair_value(value, schema)
+            assert False, value
+        except ValueError:
+            pass
+    parser = ToolCallParser(SCHEMAS)
+    # Unknown arguments are dropped
+    assert parser.validate("search", {"query": "q", "verbose": True}) == ("search", {"query": "q"}, True)
+
+
+def test_agent_runs_calls_written_as_text():
+    reply = '<think>Encode it.</think><tool_call>{"name": "encode_a_secret", "arguments": {"secret_to_encode": "hi"}}</tool_call>'
+    before = main.tool_call_parser.stats()["recovered_turns"]
+    with ScriptedStubServer([reply]) as server:
+        original = main.MODEL_BASE_URL
+        main.MODEL_BASE_URL = server.url
+        try:
+            result = main.run_agent("Encode hi", max_loops=5, show_progress=False, checkpoint=False)
+        finally:
+            main.MODEL_BASE_URL = original
+    # The recovered call ran on the first turn; the second turn finished
+    assert result["status"] == "finished" and result["loops"] == 2
+    assert "xxhxxi" in result["messages"][2]["content"]
+    assert main.tool_call_parser.stats()["recovered_turns"] == before + 1
+
+
+if __name__ == "__main__":
+    test_finds_calls_in_tags_fences_and_inline_json()
+    test_repairs_common_type_mistakes()
+    test_agent_runs_calls_written_as_text()
+    print("✅ tool call parser tests passed")
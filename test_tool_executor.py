@@ -0,0 +1,114 @@
+import sys
+import os
+import json
+import math
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from tool_executor import ToolExecutor, ToolError, time_remaining
+
+
+def sleepy(seconds: float = 0.0):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def remaining():
+    return time_remaining()
+
+
+def crash():
+    os._exit(1)
+
+
+def _expect_error(kind, fn, *args, **kwargs):
+    try:
+        fn(*args, **kwargs)
+    except ToolError as e:
+        assert e.kind == kind, e.to_dict()
+        return e
+    assert False, f"expected a {kind} error"
+
+
+def test_thread_calls_have_deadlines():
+    executor = ToolExecutor({"sleepy": sleepy, "remaining": remaining}, timeout=5)
+    assert executor.run("sleepy") == os.getpid()
+    assert 4 < executor.run("remaining") <= 5
+    assert executor.run("remaining", timeout=0) is None
+    error = _expect_error("timeout", executor.run, "sleepy", timeout=0.1, kwargs={"seconds": 1})
+    assert error.to_dict() == {"error": "timeout", "tool": "sleepy", "timeout_s": 0.1,
+                               "message": "sleepy did not finish within 0.1s and was stopped"}
+    assert executor.stats["timeouts"] == 1
+    executor.shutdown()
+
+
+def test_process_workers_start_once_and_are_replaced_after_a_timeout():
+    executor = ToolExecutor({"sleepy": sleepy, "crash": crash}, process_workers=1, timeout=5)
+    executor.start()
+    worker = executor.run("sleepy", "process")
+    assert worker != os.getpid()
+    # The same pre-forked worker serves later calls
+    assert executor.run("sleepy", "process") == worker
+
+    start = time.perf_counter()
+    _expect_error("timeout", executor.run, "sleepy", "process", timeout=0.2, kwargs={"seconds": 30})
+    assert time.perf_counter() - start < 5
+    # The stuck worker was killed and a fresh one forked
+    assert executor.run("sleepy", "process") not in (worker, os.getpid())
+    assert executor.stats["process_restarts"] == 1
+
+    _expect_error("crashed", executor.run, "crash", "process")
+    executor.restart_processes()
+    assert executor.run("sleepy", "process") != os.getpid()
+
+    call = executor.submit("sleepy", "process", kwargs={"seconds": 30})
+    time.sleep(0.1)
+    assert call.cancel()
+    _expect_error("cancelled", call.result)
+    executor.shutdown()
+
+
+def test_a_timeout_does_not_fail_other_process_calls():
+    executor = ToolExecutor({"sleepy": sleepy}, process_workers=2, timeout=5)
+    executor.start()
+    healthy = executor.submit("sleepy", "process", kwargs={"seconds": 1.5})
+    queued = [executor.submit("sleepy", "process", kwargs={"seconds": 0.1}) for _ in range(2)]
+    _expect_error("timeout", executor.run, "sleepy", "process", timeout=0.3, kwargs={"seconds": 30})
+    # The calls sharing the pool were moved to the new workers rather than failed
+    assert healthy.result() != os.getpid()
+    assert all(call.result() != os.getpid() for call in queued)
+    assert executor.stats["process_restarts"] == 1 and not executor._running
+    executor.shutdown()
+
+
+def test_spawned_workers_get_the_tool_functions():
+    executor = ToolExecutor({"sqrt": math.sqrt, "sleepy": sleepy}, process_workers=1, timeout=30,
+                            start_method="spawn")
+    assert executor.run("sqrt", "process", args=(4.0,)) == 2.0
+    assert executor.run("sleepy", "process") != os.getpid()
+    executor.shutdown()
+
+
+def test_agent_tools_run_on_their_executors():
+    result = main.call_tool("my_super_cool_function", {"x_int": [0, 1], "y_int": 0})
+    assert result.endswith("Result: [0.0, 0.8414709848078965]")
+    # A bad argument comes back as a structured error
+    result = main.call_tool("my_super_cool_function", {"x_int": [0, 1], "y_int": [1, 2, 3]})
+    error = json.loads(result.split(": ", 1)[1])
+    assert error["error"] == "exception" and error["type"] == "ValueError"
+    assert main.registry.options("all_work_is_finished")["executor"] == "inline"
+    try:
+        main.call_tool("all_work_is_finished", {"is_finished": True})
+        assert False, "all_work_is_finished should end the run"
+    except SystemExit:
+        pass
+
+
+if __name__ == "__main__":
+    test_thread_calls_have_deadlines()
+    test_process_workers_start_once_and_are_replaced_after_a_timeout()
+    test_a_timeout_does_not_fail_other_process_calls()
+    test_spawned_workers_get_the_tool_functions()
+    test_agent_tools_run_on_their_executors()
+    print("✅ tool executor tests passed")
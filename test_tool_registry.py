@@ -0,0 +1,83 @@
+import sys
+import os
+import tempfile
+from typing import Literal, Optional
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import help
+from help import generate_schema
+from tool_registry import ToolRegistry
+
+
+def survey(species: Literal["box", "ornate"], counts: list[int], region: Optional[str] = None,
+           max_results: int = 5, strict=False):
+    """Record a turtle survey.
+
+    Args:
+        species: Which species was seen
+        counts (list[int]): Turtles counted per site,
+            one entry per site
+        region (str): County name
+    """
+
+
+def test_richer_type_mapping():
+    schema = generate_schema(survey)["function"]
+    props = schema["parameters"]["properties"]
+
+    assert schema["description"] == "Record a turtle survey."
+    assert props["species"] == {"enum": ["box", "ornate"], "type": "string", "description": "Which species was seen"}
+    assert props["counts"] == {"type": "array", "items": {"type": "integer"},
+                               "description": "Turtles counted per site, one entry per site"}
+    assert props["region"] == {"type": "string", "description": "County name"}
+    assert props["max_results"] == {"type": "integer", "default": 5}
+    # No annotation, but the default is a bool
+    assert props["strict"] == {"type": "boolean", "default": False}
+    assert schema["parameters"]["required"] == ["species", "counts"]
+
+
+def test_schemas_are_memoized_and_cached_on_disk():
+    calls = []
+    original = help.generate_schema
+
+    def counting(fn):
+        calls.append(fn)
+        return original(fn)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "schemas.json")
+        help.generate_schema = counting
+        try:
+            registry = ToolRegistry(cache_path=cache)
+            registry.register(survey)
+            first = registry.schemas()
+            assert registry.schemas() is first
+            assert len(calls) == 1
+
+            # A new process (registry) with unchanged sources reads the disk cache
+            fresh = ToolRegistry(cache_path=cache)
+            fresh.register(survey)
+            assert fresh.schemas() == first
+            assert len(calls) == 1
+        finally:
+            help.generate_schema = original
+
+
+def test_register_as_decorator_with_options():
+    registry = ToolRegistry(cache_path="")
+
+    @registry.register(cacheable=True)
+    def ping() -> str:
+        """Ping."""
+        return "pong"
+
+    assert "ping" in registry
+    assert registry.options("ping") == {"cacheable": True}
+    assert registry.schemas()[0]["function"]["name"] == "ping"
+
+
+if __name__ == "__main__":
+    test_richer_type_mapping()
+    test_schemas_are_memoized_and_cached_on_disk()
+    test_register_as_decorator_with_options()
+    print("✅ tool registry tests passed")
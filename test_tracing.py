@@ -0,0 +1,73 @@
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from stub_server import ScriptedStubServer
+from tracing import Tracer
+
+
+class UsageStub(ScriptedStubServer):
+    """Reports token usage with every response."""
+
+    def respond(self, payload):
+        completion = super().respond(payload)
+        completion["usage"] = {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+        return completion
+
+
+def test_spans_histograms_and_prometheus():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.jsonl")
+        tracer = Tracer(path)
+        with tracer.bind(run_id="r1", turn=1):
+            with tracer.span("tool", tool="ping") as span:
+                span["status"] = "ok"
+        tracer.record("model_request", 0.0, 0.3)
+        tracer.count("agent_tokens_total", 20, kind="completion")
+        tracer.close()
+
+        with open(path) as f:
+            spans = [json.loads(line) for line in f]
+        assert spans[0]["span"] == "tool" and spans[0]["run_id"] == "r1" and spans[0]["status"] == "ok"
+
+        text = tracer.prometheus()
+        assert 'agent_span_seconds_bucket{span="model_request",le="0.25"} 0' in text
+        assert 'agent_span_seconds_bucket{span="model_request",le="0.5"} 1' in text
+        assert 'agent_span_seconds_count{span="tool"} 1' in text
+        assert 'agent_tokens_total{kind="completion"} 20' in text
+
+
+def test_run_agent_traces_every_turn():
+    original_url = main.MODEL_BASE_URL
+    main.console.quiet = True
+    script = [[("encode_a_secret", {"secret_to_encode": "a"}), ("encode_a_secret", {"secret_to_encode": "b"})]]
+    try:
+        with tempfile.TemporaryDirectory() as tmp, UsageStub(script, latency=0.02) as server:
+            main.MODEL_BASE_URL = server.url
+            path = os.path.join(tmp, "trace.jsonl")
+            main.get_tracer(path)
+            result = main.run_agent("trace me", show_progress=False, checkpoint=False, parallel_tools=True)
+            main.get_tracer("")
+            with open(path) as f:
+                spans = [json.loads(line) for line in f]
+    finally:
+        main.MODEL_BASE_URL = original_url
+        main.console.quiet = False
+
+    names = [s["span"] for s in spans]
+    assert names.count("turn") == 2 and names.count("model_request") == 2 and names.count("tool") == 3
+    # Tool spans from the tool threads still carry the run and turn
+    tools = [s for s in spans if s["span"] == "tool"]
+    assert all(s["run_id"] == result["run_id"] for s in tools)
+    assert [s["turn"] for s in tools] == [1, 1, 2]
+    turn = next(s for s in spans if s["span"] == "turn")
+    assert turn["completion_tokens"] == 20 and 0 < turn["tokens_per_s"] < 20 / 0.02
+
+
+if __name__ == "__main__":
+    test_spans_histograms_and_prometheus()
+    test_run_agent_traces_every_turn()
+    print("✅ tracing tests passed")
@@ -0,0 +1,86 @@
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import main
+import vectorize
+from vectorize import broadcast_arguments, run_batched
+
+
+def test_schema_advertises_array_and_range_forms():
+    schema = main.registry.schemas()[0]["function"]
+    assert schema["name"] == "my_super_cool_function"
+    forms = schema["parameters"]["properties"]["x_int"]["anyOf"]
+    assert {"type": "number"} in forms
+    assert {"type": "array", "items": {"type": "number"}} in forms
+    assert any(f.get("required") == ["start", "stop", "num"] for f in forms)
+
+
+def test_scalars_lists_and_broadcasting():
+    tool = main.my_super_cool_function
+    assert tool(3, 4) == float(np.sin(3) * np.cos(4))
+    assert tool([1, 2], 0) == [float(np.sin(1)), float(np.sin(2))]
+    arrays, scalar = broadcast_arguments({"x": {"start": 0, "stop": 1, "num": 5}, "y": 2})
+    assert not scalar and arrays["y"].tolist() == [2.0] * 5
+    for bad in ({"x": [1, 2], "y": [1, 2, 3]}, {"x": {"start": 0, "stop": 1}, "y": 1}, {"x": [[1]], "y": 1}):
+        try:
+            broadcast_arguments(bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_large_results_become_summary_and_artifact():
+    default = vectorize.ARTIFACT_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        vectorize.ARTIFACT_DIR = directory
+        try:
+            result = main.my_super_cool_function({"start": 0, "stop": 2 * np.pi, "num": 10_000}, 0)
+        finally:
+            vectorize.ARTIFACT_DIR = default
+        assert result["count"] == 10_000
+        assert abs(result["max"] - 1) < 1e-6 and abs(result["argmax"]["x_int"] - np.pi / 2) < 1e-3
+        table = np.loadtxt(result["file"], delimiter=",", skiprows=1)
+        assert main.artifacts.resolve(result["artifact"]).startswith("x_int,y_int,result\n")
+        assert table.shape == (10_000, 3)
+        # The summary stays small enough to go back to the model
+        assert len(json.dumps(result)) < 1000
+
+
+def test_same_tool_calls_in_a_turn_run_as_one_batch():
+    kernel_calls = []
+    tool = main.my_super_cool_function
+
+    def counting_kernel(x_int, y_int):
+        kernel_calls.append(len(x_int))
+        return tool.kernel(x_int, y_int)
+
+    class Counted:
+        kernel = staticmethod(counting_kernel)
+
+    results = run_batched(Counted, [{"x_int": 1, "y_int": 2}, {"x_int": [1, 2, 3], "y_int": 0},
+                                    {"x_int": [1, 2], "y_int": [1, 2, 3]}])
+    assert kernel_calls == [4]
+    assert results[0] == tool(1, 2) and results[1] == tool([1, 2, 3], 0)
+    assert isinstance(results[2], ValueError)
+
+    calls = main.ParallelToolCalls()
+    for x in [0.5, 1.0, 1.5]:
+        calls.submit({"function": {"name": "my_super_cool_function",
+                                   "arguments": json.dumps({"x_int": x, "y_int": 0})}})
+    calls.submit({"function": {"name": "encode_a_secret", "arguments": {"secret_to_encode": "ab"}}})
+    results = calls.results()
+    assert len(results) == 4 and "xxaxxb" in results[3]
+    for x, result in zip([0.5, 1.0, 1.5], results):
+        assert f"Result: {float(np.sin(x))}" in result
+
+
+if __name__ == "__main__":
+    test_schema_advertises_array_and_range_forms()
+    test_scalars_lists_and_broadcasting()
+    test_large_results_become_summary_and_artifact()
+    test_same_tool_calls_in_a_turn_run_as_one_batch()
+    print("✅ vectorize tests passed")
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+TOOL_CACHE = os.getenv("TOOL_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", 256))
+TOOL_CACHE_DIR = os.getenv("TOOL_CACHE_DIR", os.path.join(_HERE, ".cache", "tool_results"))
+
+
+def call_key(tool_name: str, arguments: dict, version: str = "") -> str:
+    """Hash of a tool call: the tool, its canonical (key-sorted) arguments and the tool's code version."""
+    canonical = json.dumps([tool_name, version, arguments], sort_keys=True, separators=(",", ":"),
+                           ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ToolCache:
+    """Memoizes the results of tools registered as cacheable.
+
+    Results live in an in-memory LRU. Tools registered with `persist=True`
+    also keep their results on disk, one JSON file per call, so later runs
+    can reuse them. A `ttl` (seconds) limits how long a result is served.
+    Concurrent identical calls share one execution.
+
+    Args:
+        max_entries: Results kept in memory (least recently used are dropped).
+        directory: Directory of the persistent tier ("" disables it).
+    """
+
+    def __init__(self, max_entries: int = TOOL_CACHE_SIZE, directory: str = TOOL_CACHE_DIR):
+        self.max_entries = max_entries
+        self.directory = directory
+        # key -> (expires or None, result)
+        self._memory = OrderedDict()
+        self._pending = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, tool_name: str, stat: str):
+        # Called with the lock held
+        counts = self._stats.setdefault(tool_name, {"hits": 0, "misses": 0})
+        counts[stat] += 1
+
+    def stats(self) -> dict:
+        """Hit and miss counts per tool."""
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._stats.items()}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _load(self, key: str):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires") is not None and entry["expires"] <= time.time():
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _save(self, key: str, tool_name: str, expires, result):
+        path = self._path(key)
+        try:
+            data = json.dumps({"tool": tool_name, "expires": expires, "result": result}, ensure_ascii=False)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except (TypeError, ValueError, OSError):
+            # Results that are not JSON (or a full disk) stay memory-only
+            pass
+
+    def _remember(self, key: str, expires, result):
+        # Called with the lock held
+        self._memory[key] = (expires, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def call(self, tool_name: str, arguments: dict, compute, ttl: float = None, persist: bool = False,
+             cache_if=None, version: str = "") -> tuple:
+        """Return the cached result of a tool call, running `compute()` on a miss.
+
+        Args:
+            tool_name: The tool's name.
+            arguments: The call's arguments.
+            compute: Function running the tool and returning its result.
+            ttl: Seconds a result may be served for (None: no limit).
+            persist: Also store the result on disk for later runs.
+            cache_if: Function of the result deciding whether to keep it, for
+                tools that report failures as results instead of raising.
+            version: Changes whenever the tool's code does, so stale results are not served.
+
+        Returns:
+            tuple: (result, hit)
+        """
+        key = call_key(tool_name, arguments, version)
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and (cached[0] is None or cached[0] > now):
+                self._memory.move_to_end(key)
+                self._count(tool_name, "hits")
+                return cached[1], True
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = Future()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            # The same call is already running on another thread; share its result
+            result = pending.result()
+            with self._lock:
+                self._count(tool_name, "hits")
+            return result, True
+
+        try:
+            entry = self._load(key) if persist and self.directory else None
+            if entry is not None:
+                with self._lock:
+                    self._remember(key, entry["expires"], entry["result"])
+                    self._count(tool_name, "hits")
+                pending.set_result(entry["result"])
+                return entry["result"], True
+
+            with self._lock:
+                self._count(tool_name, "misses")
+            try:
+                result = compute()
+            except BaseException as e:
+                pending.set_exception(e)
+                raise
+            pending.set_result(result)
+
+            if cache_if is None or cache_if(result):
+                expires = now + ttl if ttl else None
+                with self._lock:
+                    self._remember(key, expires, result)
+                if persist and self.directory:
+                    self._save(key, tool_name, expires, result)
+            return result, False
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def clear(self):
+        """Forget the in-memory results (the persistent tier is left alone)."""
+        with self._lock:
+            self._memory.clear()
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import threading
+
+TOOL_CALL_FALLBACK = os.getenv("TOOL_CALL_FALLBACK", "1").strip().lower() not in ("0", "false", "no", "off")
+
+_THINK_RE = re.compile(r"<think>.*?(?:</think>|$)", re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r"<tool_call>\s*(.*?)\s*(?:</tool_call>|$)", re.DOTALL | re.IGNORECASE)
+_FENCE_RE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+_TRUE = {"true", "yes", "1", "on"}
+_FALSE = {"false", "no", "0", "off"}
+
+_decoder = json.JSONDecoder()
+
+
+def strip_thinking(text: str) -> str:
+    """Remove <think>...</think> blocks, including one left open at the end."""
+    return _THINK_RE.sub("", text or "")
+
+
+def _json_values(text: str) -> list:
+    """Every top-level JSON object or array found in the text, in order."""
+    values, i = [], 0
+    while True:
+        starts = [p for p in (text.find("{", i), text.find("[", i)) if p != -1]
+        if not starts:
+            return values
+        start = min(starts)
+        try:
+            value, end = _decoder.raw_decode(text, start)
+        except ValueError:
+            i = start + 1
+            continue
+        if isinstance(value, (dict, list)):
+            values.append(value)
+        i = end
+
+
+def _candidates(text: str) -> list:
+    """JSON values that may hold tool calls: <tool_call> blocks, then fenced blocks, then inline JSON."""
+    for pattern in (_TAG_RE, _FENCE_RE):
+        blocks = pattern.findall(text)
+        values = [v for block in blocks for v in _json_values(block)]
+        if values:
+            return values
+    return _json_values(text)
+
+
+def _as_calls(value) -> list:
+    """(name, arguments) pairs from the shapes models use to write tool calls as JSON."""
+    if isinstance(value, list):
+        return [call for item in value for call in _as_calls(item)]
+    if not isinstance(value, dict):
+        return []
+    if isinstance(value.get("tool_calls"), list):
+        return _as_calls(value["tool_calls"])
+    if isinstance(value.get("function"), dict):
+        return _as_calls(value["function"])
+    name = value.get("name") or value.get("tool") or value.get("function")
+    if not isinstance(name, str):
+        return []
+    arguments = next((value[k] for k in ("arguments", "parameters", "args", "input") if k in value), {})
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        except ValueError:
+            return []
+    return [(name, arguments)] if isinstance(arguments, dict) else []
+
+
+class _Invalid(ValueError):
+    pass
+
+
+def repair_value(value, schema: dict):
+    """Coerce a value to a JSON Schema fragment, fixing the type mistakes small models make.
+
+    Numbers and booleans sent as strings, numbers sent for strings, a single
+    value where a list is expected and lists sent as JSON text are repaired.
+
+    Raises:
+        ValueError: When the value cannot be made to fit.
+    """
+    if "anyOf" in schema:
+        # Prefer an option the value already fits, then the first one it can be repaired into
+        for strict in (True, False):
+            for option in schema["anyOf"]:
+                try:
+                    repaired = repair_value(value, option)
+                except ValueError:
+                    continue
+                if not strict or repaired == value and type(repaired) is type(value):
+                    return repaired
+        raise _Invalid(f"{value!r} matches none of the allowed types")
+    if "enum" in schema:
+        if value in schema["enum"]:
+            return value
+        matches = [v for v in schema["enum"] if str(v).lower() == str(value).lower()]
+        if matches:
+            return matches[0]
+        raise _Invalid(f"{value!r} is not one of {schema['enum']}")
+
+    kind = schema.get("type")
+    if kind == "string":
+        if isinstance(value, (dict, list)):
+            raise _Invalid(f"expected text, got {type(value).__name__}")
+        return value if isinstance(value, str) else json.dumps(value)
+    if kind == "boolean":
+        if isinstance(value, bool):
+            return value
+        if str(value).strip().lower() in _TRUE:
+            return True
+        if str(value).strip().lower() in _FALSE:
+            return False
+        raise _Invalid(f"expected true or false, got {value!r}")
+    if kind in ("integer", "number"):
+        if isinstance(value, bool) or isinstance(value, (dict, list)):
+            raise _Invalid(f"expected a number, got {value!r}")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise _Invalid(f"expected a number, got {value!r}")
+        if kind == "integer":
+            if number != int(number):
+                raise _Invalid(f"expected a whole number, got {value!r}")
+            return int(number)
+        return value if isinstance(value, (int, float)) else number
+    if kind == "array":
+        if isinstance(value, str) and value.strip().startswith("["):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if not isinstance(value, list):
+            value = [value]
+        items = schema.get("items")
+        return [repair_value(v, items) for v in value] if items else value
+    if kind == "object":
+        if isinstance(value, str) and value.strip().startswith("{"):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if not isinstance(value, dict):
+            raise _Invalid(f"expected an object, got {value!r}")
+        properties = schema.get("properties", {})
+        repaired = {k: repair_value(v, properties[k]) if k in properties else v for k, v in value.items()}
+        missing = [k for k in schema.get("required", []) if k not in repaired]
+        if missing:
+            raise _Invalid(f"missing {', '.join(missing)}")
+        return repaired
+    return value
+
+
+class ToolCallParser:
+    """Recovers tool calls that a model wrote into its message text instead of `tool_calls`.
+
+    `<think>` blocks are stripped first. Calls are then looked for in
+    `<tool_call>` blocks, fenced code blocks and finally any inline JSON. A
+    call is kept only if it names a known tool and its arguments can be
+    repaired to fit the tool's schema; unknown arguments are dropped.
+
+    Args:
+        schemas: The tool schemas, or a function returning them (e.g. `registry.schemas`).
+    """
+
+    def __init__(self, schemas):
+        self._schemas = schemas
+        self._lock = threading.Lock()
+        self._stats = {"turns": 0, "recovered_turns": 0, "calls": 0, "repaired": 0, "rejected": 0}
+
+    def _tools(self) -> dict:
+        schemas = self._schemas() if callable(self._schemas) else self._schemas
+        return {s["function"]["name"]: s["function"].get("parameters", {}) for s in schemas}
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._stats[name] += value
+
+    def validate(self, name: str, arguments: dict, tools: dict = None) -> tuple:
+        """Fit a call to its tool's schema.
+
+        Returns:
+            tuple: (tool name, repaired arguments, whether anything had to be repaired)
+
+        Raises:
+            ValueError: When the tool is unknown or the arguments cannot be repaired.
+        """
+        tools = tools if tools is not None else self._tools()
+        if name not in tools:
+            # Tolerate case and dash/space differences in the name
+            normalized = {n.lower(): n for n in tools}
+            name = normalized.get(name.strip().lower().replace("-", "_").replace(" ", "_"), name)
+            if name not in tools:
+                raise _Invalid(f"unknown tool {name!r}")
+        parameters = tools[name]
+        known = {k: v for k, v in arguments.items() if k in parameters.get("properties", {})}
+        repaired = repair_value(known, {**parameters, "type": "object"})
+        return name, repaired, repaired != arguments
+
+    def parse(self, content: str) -> list:
+        """Extract valid tool calls from message text, in the OpenAI `tool_calls` format."""
+        text = strip_thinking(content)
+        if "{" not in text and "[" not in text:
+            return []
+        tools = self._tools()
+        calls, repaired, rejected = [], 0, 0
+        for value in _candidates(text):
+            for name, arguments in _as_calls(value):
+                try:
+                    name, arguments, changed = self.validate(name, arguments, tools)
+                except ValueError:
+                    rejected += 1
+                    continue
+                repaired += changed
+                calls.append({"id": f"recovered_{len(calls)}", "type": "function",
+                              "function": {"name": name, "arguments": json.dumps(arguments)}})
+        self._count(repaired=repaired, rejected=rejected)
+        return calls
+
+    def recover(self, message: dict) -> list:
+        """Fallback for a response without `tool_calls`: parse its text and record the outcome.
+
+        Returns:
+            list: The recovered calls (empty when there were none).
+        """
+        calls = self.parse(message.get("content") or "")
+        self._count(turns=1, recovered_turns=bool(calls), calls=len(calls))
+        return calls
+
+    def stats(self) -> dict:
+        """Turns the fallback ran on, turns it recovered calls in, and calls recovered, repaired and rejected."""
+        with self._lock:
+            return dict(self._stats)
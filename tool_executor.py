@@ -0,0 +1,305 @@
+import os
+import sys
+import time
+import threading
+import contextvars
+import multiprocessing
+from concurrent.futures import CancelledError, Future, InvalidStateError, ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", 60))
+TOOL_THREAD_WORKERS = int(os.getenv("TOOL_THREAD_WORKERS", 16))
+TOOL_PROCESS_WORKERS = int(os.getenv("TOOL_PROCESS_WORKERS", 2))
+
+EXECUTORS = ("inline", "thread", "process")
+
+# Deadline (time.monotonic) of the tool call running in this context
+_deadline = contextvars.ContextVar("tool_deadline", default=None)
+
+# Tools the process workers can call by name; filled in each worker as it starts
+_worker_functions = {}
+
+
+def time_remaining():
+    """Seconds left before the current tool call's deadline (None outside a call or without one).
+
+    Tools doing slow I/O pass this on as their own timeout, so a call that
+    runs out of time also stops waiting on the network.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+class ToolError(Exception):
+    """A tool call that failed in a way the model should be told about in a structured form.
+
+    Args:
+        kind: "timeout", "cancelled", "crashed" or "exception".
+        tool: The tool's name.
+        message: What went wrong.
+        **details: Extra fields for the model, e.g. the timeout in seconds.
+    """
+
+    def __init__(self, kind: str, tool: str, message: str, **details):
+        super().__init__(message)
+        self.kind = kind
+        self.tool = tool
+        self.details = details
+
+    def to_dict(self) -> dict:
+        return {"error": self.kind, "tool": self.tool, "message": str(self), **self.details}
+
+
+def _call(tool, fn, args: tuple, kwargs: dict):
+    return fn(tool, *args, **kwargs) if fn else tool(*args, **kwargs)
+
+
+def _run_with_deadline(deadline, tool, fn, args, kwargs):
+    _deadline.set(deadline)
+    return _call(tool, fn, args, kwargs)
+
+
+def _init_worker(functions: dict):
+    # Runs in every worker, so the functions reach it whether it was forked or spawned
+    _worker_functions.clear()
+    _worker_functions.update(functions)
+
+
+def _run_in_worker(name: str, deadline, fn, args: tuple, kwargs: dict):
+    # time.monotonic is system-wide, so the parent's deadline holds here too
+    return _run_with_deadline(deadline, _worker_functions[name], fn, args, kwargs)
+
+
+class ToolCall:
+    """A tool call running on the executor: wait for it with `result()` or stop it with `cancel()`."""
+
+    def __init__(self, executor: "ToolExecutor", tool: str, future, mode: str, timeout: float, deadline,
+                 request: tuple = None):
+        self.executor = executor
+        self.tool = tool
+        self.future = future
+        self.mode = mode
+        self.timeout = timeout
+        self.deadline = deadline
+        self.cancelled = False
+        # Process calls: the arguments of _run_in_worker, and the pool future currently running them
+        self.request = request
+        self.attempt = None
+
+    def cancel(self) -> bool:
+        """Stop the call. A queued call never starts; a running one in a worker
+        process is killed with its worker. A running thread cannot be stopped,
+        so it is left to finish and its result is discarded."""
+        if self.future.done():
+            return False
+        self.cancelled = True
+        if self.mode != "process":
+            self.future.cancel()
+        elif self.attempt is not None and self.attempt.cancel():
+            self.future.cancel()
+        else:
+            self.executor.restart_processes(stopping=self)
+        return True
+
+    def result(self):
+        """Wait for the result until the deadline.
+
+        Raises:
+            ToolError: On timeout, cancellation or a crashed worker process.
+        """
+        timeout = None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+        try:
+            return self.future.result(timeout=timeout)
+        except FutureTimeout:
+            self.cancel()
+            # Stopped by its deadline: reported as a timeout rather than a cancellation
+            self.cancelled = False
+            raise ToolError("timeout", self.tool, f"{self.tool} did not finish within {self.timeout:g}s "
+                            "and was stopped", timeout_s=self.timeout)
+        except (BrokenProcessPool, CancelledError):
+            if self.cancelled:
+                raise ToolError("cancelled", self.tool, f"{self.tool} was cancelled")
+            raise ToolError("crashed", self.tool, f"The worker process running {self.tool} died")
+
+
+class ToolExecutor:
+    """Runs tool calls on the executor each tool was registered with, under a deadline.
+
+    "thread" tools (the default, for I/O-bound tools) run on a shared thread
+    pool. "process" tools (CPU-bound ones) run on a pool of forked worker
+    processes, so they neither hold the GIL nor stall other sessions.
+    "inline" tools run in the caller's thread; this is for tools that end the
+    run, like all_work_is_finished.
+
+    The process workers are started once, by `start()` or on first use, and
+    reused for every call. On Linux they are forked and inherit everything
+    the parent had imported; with other start methods the tool functions are
+    pickled to them, so process tools must be module-level functions.
+    A process call that runs past its deadline is killed along with the
+    pool's workers, which are started again at once; the other calls the pool
+    had are rerun on the new workers under their original deadlines. Thread calls cannot be killed: they are
+    abandoned at the deadline, and tools can read `time_remaining()` to give
+    up on their own.
+
+    Args:
+        functions: Tool name -> function (the registry's functions).
+        thread_workers: Size of the thread pool.
+        process_workers: Number of worker processes.
+        timeout: Default deadline of a call in seconds (0 for none).
+        start_method: multiprocessing start method of the workers (default:
+            fork on Linux, the platform's default elsewhere).
+    """
+
+    def __init__(self, functions: dict, thread_workers: int = TOOL_THREAD_WORKERS,
+                 process_workers: int = TOOL_PROCESS_WORKERS, timeout: float = TOOL_TIMEOUT,
+                 start_method: str = None):
+        self.functions = functions
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.timeout = timeout
+        # fork keeps the parent's imports and tool definitions; elsewhere workers re-import
+        self.start_method = start_method or ("fork" if sys.platform.startswith("linux") else None)
+        self.stats = {"timeouts": 0, "process_restarts": 0}
+        self._threads = None
+        self._processes = None
+        # Process calls not settled yet, to be moved to a new pool on a restart
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="tool-exec")
+            return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.process_workers,
+                                                      mp_context=multiprocessing.get_context(self.start_method),
+                                                      initializer=_init_worker, initargs=(dict(self.functions),))
+                # Start every worker now rather than during the first call
+                for future in [self._processes.submit(int) for _ in range(self.process_workers)]:
+                    future.result()
+            return self._processes
+
+    def start(self, processes: bool = True):
+        """Start the pools ahead of the first call."""
+        self._thread_pool()
+        if processes and self.process_workers:
+            self._process_pool()
+
+    def restart_processes(self, stopping: ToolCall = None):
+        """Kill the worker processes and start a fresh pool.
+
+        Args:
+            stopping: The call being stopped; it fails with the old pool. Every
+                other call the old pool was running or had queued is rerun on
+                the new one.
+        """
+        with self._lock:
+            pool, self._processes = self._processes, None
+            self.stats["process_restarts"] += 1
+            moving = [call for call in self._running if call is not stopping and not call.future.done()]
+            # Their attempts on the old pool are about to fail; that is no longer their outcome
+            for call in moving:
+                call.attempt = None
+        if pool is None:
+            return
+        # ProcessPoolExecutor cannot stop a running task, so its workers are terminated directly
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = self._process_pool()
+        for call in moving:
+            if not call.future.done():
+                self._send_to_pool(call, pool)
+
+    def _send_to_pool(self, call: ToolCall, pool: ProcessPoolExecutor):
+        attempt = pool.submit(_run_in_worker, *call.request)
+        with self._lock:
+            self._running.add(call)
+            call.attempt = attempt
+        attempt.add_done_callback(lambda done: self._settle(call, done))
+
+    def _settle(self, call: ToolCall, attempt):
+        error = CancelledError() if attempt.cancelled() else attempt.exception()
+        # A failed attempt that a restart replaced is not the call's outcome
+        if error is None or attempt is call.attempt:
+            try:
+                if error is None:
+                    call.future.set_result(attempt.result())
+                else:
+                    call.future.set_exception(error)
+            except InvalidStateError:
+                # Already cancelled, or settled by the attempt it was moved from
+                pass
+        if call.future.done():
+            with self._lock:
+                self._running.discard(call)
+
+    def submit(self, tool: str, mode: str = "thread", timeout: float = None, fn=None,
+               args: tuple = (), kwargs: dict = None) -> ToolCall:
+        """Start a tool call.
+
+        Args:
+            tool: The tool's name.
+            mode: "thread", "process" or "inline".
+            timeout: Deadline in seconds (default: the executor's; 0 for none).
+            fn: Run `fn(tool_function, *args, **kwargs)` instead of the tool
+                itself, e.g. a batched evaluation. For process calls it must be
+                picklable (a module-level function).
+            args: Positional arguments.
+            kwargs: Keyword arguments.
+        """
+        if mode not in EXECUTORS:
+            raise ValueError(f"Unknown executor '{mode}' for {tool}; expected one of {EXECUTORS}")
+        kwargs = kwargs or {}
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout else None
+
+        if mode == "process":
+            # Workers look the tool up by name in the functions they were started with; the call's
+            # own future outlives its attempt on the pool, so a restart can move it to the next pool
+            call = ToolCall(self, tool, Future(), mode, timeout, deadline,
+                            request=(tool, deadline, fn, args, kwargs))
+            self._send_to_pool(call, self._process_pool())
+            return call
+        if mode == "thread":
+            # The copied context carries the run's trace attributes into the worker thread
+            future = self._thread_pool().submit(contextvars.copy_context().run, _run_with_deadline, deadline,
+                                                self.functions[tool], fn, args, kwargs)
+        else:
+            # Inline calls finish before submit returns; SystemExit and friends propagate to the caller
+            future = Future()
+            try:
+                future.set_result(contextvars.copy_context().run(_run_with_deadline, deadline,
+                                                                  self.functions[tool], fn, args, kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        return ToolCall(self, tool, future, mode, timeout, deadline)
+
+    def run(self, tool: str, mode: str = "thread", timeout: float = None, fn=None, args: tuple = (),
+            kwargs: dict = None):
+        """Run a tool call and wait for its result (see `submit`).
+
+        Raises:
+            ToolError: When the call times out, is cancelled or its worker dies.
+        """
+        call = self.submit(tool, mode, timeout, fn, args, kwargs)
+        try:
+            return call.result()
+        except ToolError as e:
+            if e.kind == "timeout":
+                with self._lock:
+                    self.stats["timeouts"] += 1
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            threads, processes = self._threads, self._processes
+            self._threads = self._processes = None
+        if threads:
+            threads.shutdown(wait=False, cancel_futures=True)
+        if processes:
+            processes.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,140 @@
+import os
+import json
+import inspect
+import hashlib
+import threading
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+TOOL_SCHEMA_CACHE = os.getenv("TOOL_SCHEMA_CACHE", os.path.join(_HERE, ".cache", "tool_schemas.json"))
+# Schemas come from help.generate_schema, so editing it invalidates the cache
+_GENERATOR_SOURCE = os.path.join(_HERE, "help.py")
+
+_digests = {}
+
+
+def _file_digest(path: str) -> str:
+    """SHA-256 of a file's bytes, computed once per process."""
+    if path not in _digests:
+        try:
+            with open(path, "rb") as f:
+                _digests[path] = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            _digests[path] = None
+    return _digests[path]
+
+
+class ToolRegistry:
+    """Registry of the functions the model can call.
+
+    Schemas are generated lazily on first use and memoized by function
+    identity. They are also written to an on-disk cache keyed by a hash of the
+    tool's source file and of the schema generator's source, so a later
+    process with unchanged sources skips introspection entirely.
+
+    Args:
+        cache_path: JSON file for the on-disk schema cache ("" disables it).
+    """
+
+    def __init__(self, cache_path: str = TOOL_SCHEMA_CACHE):
+        self.cache_path = cache_path
+        self.functions = {}
+        self._options = {}
+        self._memo = {}
+        self._schema_list = None
+        self._disk = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def register(self, function: callable = None, **options):
+        """Register a tool. Usable directly or as a decorator, with optional per-tool options."""
+        if function is None:
+            return lambda fn: self.register(fn, **options)
+        with self._lock:
+            self.functions[function.__name__] = function
+            self._options[function.__name__] = options
+            self._schema_list = None
+        return function
+
+    def options(self, name: str) -> dict:
+        """Options the tool was registered with (empty if none)."""
+        return self._options.get(name, {})
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.functions
+
+    def get(self, name: str):
+        return self.functions.get(name)
+
+    def version(self, name: str) -> str:
+        """Digest of the tool's source file, which changes whenever its code may have ("" if unknown)."""
+        # Decorated tools (vectorize.elementwise, cached_search) are versioned by the code they wrap
+        code = getattr(inspect.unwrap(self.functions[name]) if name in self.functions else None, "__code__", None)
+        return (_file_digest(code.co_filename) or "") if code else ""
+
+    def _cache_key(self, function: callable):
+        code = getattr(inspect.unwrap(function), "__code__", None)
+        if code is None:
+            return None
+        source = _file_digest(code.co_filename)
+        generator = _file_digest(_GENERATOR_SOURCE)
+        if source is None or generator is None:
+            return None
+        return f"{function.__module__}.{function.__qualname__}:{source[:16]}:{generator[:16]}"
+
+    def _load_disk(self):
+        self._disk = {}
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path) as f:
+                self._disk = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def _save_disk(self):
+        if not self.cache_path or not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self._disk, f)
+            os.replace(tmp, self.cache_path)
+            self._dirty = False
+        except OSError:
+            pass
+
+    def schema(self, function: callable) -> dict:
+        """Return the tool schema for a function, generating it at most once."""
+        schema = self._memo.get(function)
+        if schema is not None:
+            return schema
+
+        if self._disk is None:
+            self._load_disk()
+        key = self._cache_key(function)
+        schema = self._disk.get(key) if key else None
+        if schema is None:
+            from help import generate_schema
+            schema = generate_schema(function)
+            if key:
+                # Replace entries for older versions of the same tool
+                prefix = key.split(":")[0] + ":"
+                for stale in [k for k in self._disk if k.startswith(prefix)]:
+                    del self._disk[stale]
+                self._disk[key] = schema
+                self._dirty = True
+        self._memo[function] = schema
+        return schema
+
+    def schemas(self) -> list:
+        """Schemas for every registered tool.
+
+        The same list object is returned until a tool is registered, so request
+        encoders can cache its JSON by identity.
+        """
+        with self._lock:
+            if self._schema_list is None:
+                self._schema_list = [self.schema(fn) for fn in self.functions.values()]
+                self._save_disk()
+            return self._schema_list
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_METRICS_FILE = os.getenv("TRACE_METRICS_FILE", "")
+
+# Upper bounds in seconds of the span duration histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Attributes added to every span recorded in this context (run id, turn)
+_bound = contextvars.ContextVar("trace_attributes", default={})
+
+
+class Tracer:
+    """Records timing spans and token usage for the agent loop.
+
+    Every span is folded into in-memory histograms and counters, which
+    `prometheus()` renders as a text snapshot. When a trace file is set, each
+    span is also appended to it as one JSON line.
+
+    Spans started inside `bind()` carry its attributes, and the context is
+    copied into tool threads, so spans from concurrent runs stay apart.
+
+    Args:
+        trace_path: JSONL file to append spans to ("" records metrics only).
+    """
+
+    def __init__(self, trace_path: str = TRACE_FILE):
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+        self._file = None
+        # span name -> [bucket counts..., count, sum]
+        self._histograms = {}
+        self._counters = {}
+
+    @contextmanager
+    def bind(self, **attributes):
+        """Add attributes to every span recorded inside the block."""
+        token = _bound.set({**_bound.get(), **attributes})
+        try:
+            yield
+        finally:
+            _bound.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block. The yielded dict can be filled with more attributes before the block ends."""
+        attributes = {**_bound.get(), **attributes}
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.record(name, start, time.perf_counter() - started, attributes)
+
+    def record(self, name: str, start: float, duration: float, attributes: dict = None):
+        """Record a finished span."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += 1
+            histogram[-1] += duration
+            if self.trace_path:
+                self._write({"span": name, "start": round(start, 6), "duration": round(duration, 6),
+                             **(attributes or {})})
+
+    def count(self, name: str, value: float = 1, **labels):
+        """Add to a counter, such as tokens used or tool calls made."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, name: str, **labels) -> float:
+        """Current value of a counter; without labels, the total over all of them."""
+        with self._lock:
+            return sum(value for (counter, counter_labels), value in self._counters.items()
+                       if counter == name and set(labels.items()) <= set(counter_labels))
+
+    def record_usage(self, usage: dict, seconds: float) -> dict:
+        """Count the token usage a response reported and work out its generation speed.
+
+        Args:
+            usage: The response's `usage` object (may be None or empty).
+            seconds: Time the model took to produce the response.
+
+        Returns:
+            dict: prompt_tokens, completion_tokens and tokens_per_s (None when unknown).
+        """
+        usage = usage or {}
+        prompt = usage.get("prompt_tokens") or 0
+        completion = usage.get("completion_tokens") or 0
+        self.count("agent_tokens_total", prompt, kind="prompt")
+        self.count("agent_tokens_total", completion, kind="completion")
+        speed = completion / seconds if completion and seconds else None
+        return {"prompt_tokens": prompt, "completion_tokens": completion,
+                "tokens_per_s": round(speed, 2) if speed else None}
+
+    def _write(self, record: dict):
+        # Called with the lock held
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.trace_path)), exist_ok=True)
+            self._file = open(self.trace_path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+    def snapshot(self) -> dict:
+        """Span totals per name: count, total seconds and mean seconds."""
+        with self._lock:
+            return {name: {"count": h[-2], "seconds": h[-1], "mean": h[-1] / h[-2] if h[-2] else 0.0}
+                    for name, h in self._histograms.items()}
+
+    def prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = ["# HELP agent_span_seconds Time spent in each part of the agent loop.",
+                 "# TYPE agent_span_seconds histogram"]
+        with self._lock:
+            histograms = {name: list(h) for name, h in self._histograms.items()}
+            counters = dict(self._counters)
+        for name, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, histogram):
+                cumulative += n
+                lines.append(f'agent_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'agent_span_seconds_bucket{{span="{name}",le="+Inf"}} {histogram[-2]}')
+            lines.append(f'agent_span_seconds_sum{{span="{name}"}} {histogram[-1]:.6f}')
+            lines.append(f'agent_span_seconds_count{{span="{name}"}} {histogram[-2]}')
+
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{name}{{{label_text}}} {value:g}" if label_text else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path: str):
+        """Write the Prometheus snapshot to a file, replacing it atomically."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer(trace_path: str = None) -> Tracer:
+    """Return the shared tracer.
+
+    Environment variables:
+        TRACE_FILE: JSONL file to append spans to (default: metrics only)
+        TRACE_METRICS_FILE: Where main.py and batch.py write the Prometheus snapshot when they finish
+
+    Args:
+        trace_path: Send spans to this JSONL file from now on.
+    """
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(TRACE_FILE)
+        if trace_path is not None and trace_path != _tracer.trace_path:
+            _tracer.close()
+            _tracer.trace_path = trace_path
+        return _tracer
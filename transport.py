@@ -0,0 +1,86 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _env_flag(name: str) -> bool:
+    """Return True if the environment variable is set to a truthy value."""
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class ModelTransport:
+    """Keep-alive HTTP transport for the model endpoint.
+
+    Holds one pooled session that is reused for every model request, so each
+    loop iteration skips the TCP connect and TLS handshake.
+
+    Args:
+        pool_size: Maximum number of pooled connections per host.
+        connect_timeout: Seconds to wait for a connection to be established.
+        read_timeout: Seconds to wait for the server to send a response.
+        http2: Use HTTP/2 via httpx when it (and h2) is installed.
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 10.0,
+                 read_timeout: float = 300.0, http2: bool = False):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.http2 = False
+        self._client = None
+
+        if http2:
+            try:
+                import httpx
+                import h2  # noqa: F401  (httpx needs it for HTTP/2)
+                limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+                timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+                self._client = httpx.Client(http2=True, limits=limits, timeout=timeout)
+                self.http2 = True
+            except ImportError:
+                print("⚠️ MODEL_HTTP2 requested but httpx[http2] is not installed. Falling back to HTTP/1.1.")
+
+        if self._client is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._client = session
+
+    def post(self, url: str, headers: dict = None, json: dict = None, data: bytes = None, stream: bool = False):
+        """POST to the model endpoint over a pooled connection."""
+        if self.http2:
+            request = self._client.build_request("POST", url, headers=headers, json=json, content=data)
+            return self._client.send(request, stream=stream)
+        return self._client.post(url, headers=headers, json=json, data=data,
+                                 timeout=self.timeout, stream=stream)
+
+    def close(self):
+        """Close every pooled connection."""
+        self._client.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> ModelTransport:
+    """Return the shared model transport, creating it from the environment on first use.
+
+    Environment variables:
+        MODEL_POOL_SIZE: Connection pool size (default: 10)
+        MODEL_CONNECT_TIMEOUT: Connect timeout in seconds (default: 10)
+        MODEL_READ_TIMEOUT: Read timeout in seconds (default: 300)
+        MODEL_HTTP2: Set to 1 to use HTTP/2 when httpx[http2] is installed
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = ModelTransport(
+                    pool_size=int(os.getenv("MODEL_POOL_SIZE", 10)),
+                    connect_timeout=float(os.getenv("MODEL_CONNECT_TIMEOUT", 10)),
+                    read_timeout=float(os.getenv("MODEL_READ_TIMEOUT", 300)),
+                    http2=_env_flag("MODEL_HTTP2"),
+                )
+    return _transport
@@ -0,0 +1,178 @@
+import os
+import inspect
+import threading
+import functools
+from typing import TypedDict
+from artifacts import get_artifact_store, file_id, ARTIFACT_DIR
+
+# Results with more values than this come back as a summary plus an artifact file
+NUMERIC_INLINE_LIMIT = int(os.getenv("NUMERIC_INLINE_LIMIT", 20))
+NUMERIC_MAX_POINTS = int(os.getenv("NUMERIC_MAX_POINTS", 1_000_000))
+
+
+class Linspace(TypedDict):
+    """Evenly spaced values from start to stop, both included."""
+    start: float
+    stop: float
+    num: int
+
+
+def to_array(value):
+    """Convert a number, a list of numbers or a Linspace dict to a flat float array."""
+    import numpy as np
+    if isinstance(value, dict):
+        try:
+            num = int(value["num"])
+            start, stop = float(value["start"]), float(value["stop"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("A range needs numeric 'start', 'stop' and 'num'")
+        if not 0 < num <= NUMERIC_MAX_POINTS:
+            raise ValueError(f"A range must have between 1 and {NUMERIC_MAX_POINTS} points")
+        return np.linspace(start, stop, num)
+    array = np.asarray(value, dtype=float)
+    if array.ndim > 1:
+        raise ValueError("Arguments must be numbers or flat lists of numbers")
+    return array
+
+
+def broadcast_arguments(arguments: dict) -> tuple:
+    """Convert every argument to a float array, broadcasting numbers against the arrays.
+
+    Returns:
+        tuple: ({name: 1-D array, all the same length}, True if every argument was a single number)
+    """
+    import numpy as np
+    arrays = {name: to_array(value) for name, value in arguments.items()}
+    scalar = all(array.ndim == 0 for array in arrays.values())
+    try:
+        shape = np.broadcast_shapes(*(array.shape for array in arrays.values()))
+    except ValueError:
+        lengths = ", ".join(f"{name}: {array.size}" for name, array in arrays.items() if array.ndim)
+        raise ValueError(f"List arguments must all have the same length ({lengths})")
+    if int(np.prod(shape)) > NUMERIC_MAX_POINTS:
+        raise ValueError(f"At most {NUMERIC_MAX_POINTS} points can be evaluated in one call")
+    return {name: np.broadcast_to(array, shape).reshape(-1) for name, array in arrays.items()}, scalar
+
+
+def save_table(name: str, columns: dict, directory: str = None) -> str:
+    """Write equal-length columns to a CSV file in the artifact directory and return its path.
+
+    The file is named after its artifact handle, so other processes can find it by handle.
+    """
+    import numpy as np
+    directory = directory or ARTIFACT_DIR
+    os.makedirs(directory, exist_ok=True)
+    names = list(columns)
+    table = np.column_stack([columns[n] for n in names])
+    tmp = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    np.savetxt(tmp, table, delimiter=",", header=",".join(names), comments="", fmt="%.10g")
+    path = os.path.join(directory, f"{name}-{file_id(tmp)}.csv")
+    os.replace(tmp, path)
+    return path
+
+
+def format_values(name: str, inputs: dict, values, scalar: bool):
+    """Shape a kernel's output for the model.
+
+    A single point comes back as a number and a few points as a list. Larger
+    results become a summary, with every point written to a CSV file that is
+    registered in the artifact store, so tools can take its handle.
+    """
+    import numpy as np
+    values = np.asarray(values, dtype=float).reshape(-1)
+    if scalar:
+        return float(values[0])
+    if values.size <= NUMERIC_INLINE_LIMIT:
+        return [float(v) for v in values]
+
+    finite = np.isfinite(values)
+    if not finite.any():
+        return {"count": int(values.size), "finite": 0, **_table_artifact(name, inputs, values)}
+    masked = np.where(finite, values, np.nan)
+    low, high = int(np.nanargmin(masked)), int(np.nanargmax(masked))
+    return {
+        "count": int(values.size),
+        "finite": int(finite.sum()),
+        "min": float(values[low]),
+        "max": float(values[high]),
+        "mean": float(np.nanmean(masked)),
+        "std": float(np.nanstd(masked)),
+        "argmin": {k: float(v[low]) for k, v in inputs.items()},
+        "argmax": {k: float(v[high]) for k, v in inputs.items()},
+        "first": [float(v) for v in values[:5]],
+        **_table_artifact(name, inputs, values),
+    }
+
+
+def _table_artifact(name: str, inputs: dict, values) -> dict:
+    path = save_table(name, {**inputs, "result": values})
+    return {"artifact": get_artifact_store().put_file(path, source=name), "file": path}
+
+
+def elementwise(kernel):
+    """Turn a NumPy kernel into a tool that evaluates one point or many in one call.
+
+    The kernel receives equal-length float arrays and returns an array of the
+    same length. The tool accepts, for each argument, a number, a list of
+    numbers or a Linspace range. Numbers are broadcast against lists. The
+    kernel's annotations should advertise those forms, e.g.
+    `float | list[float] | Linspace`.
+
+    The tool keeps the kernel as `tool.kernel`, so run_batched can merge
+    several calls into one evaluation.
+    """
+    signature = inspect.signature(kernel)
+
+    @functools.wraps(kernel)
+    def tool(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arrays, scalar = broadcast_arguments(bound.arguments)
+        return format_values(kernel.__name__, arrays, kernel(**arrays), scalar)
+
+    tool.kernel = kernel
+    return tool
+
+
+def run_batched(tool, calls: list) -> list:
+    """Evaluate several calls of an elementwise tool with a single kernel call.
+
+    Args:
+        tool: A tool made with `elementwise`.
+        calls: The argument dict of each call.
+
+    Returns:
+        list: Each call's result, or the exception raised for a call with bad arguments.
+    """
+    import numpy as np
+    kernel = tool.kernel
+    signature = inspect.signature(kernel)
+    prepared = []
+    for arguments in calls:
+        try:
+            bound = signature.bind(**arguments)
+            bound.apply_defaults()
+            prepared.append(broadcast_arguments(bound.arguments))
+        except Exception as e:
+            prepared.append(e)
+
+    valid = [p for p in prepared if not isinstance(p, Exception)]
+    if not valid:
+        return prepared
+    names = list(valid[0][0])
+    merged = {name: np.concatenate([arrays[name] for arrays, _ in valid]) for name in names}
+    if merged[names[0]].size > NUMERIC_MAX_POINTS:
+        error = ValueError(f"At most {NUMERIC_MAX_POINTS} points can be evaluated in one turn")
+        return [error] * len(calls)
+    values = np.asarray(kernel(**merged), dtype=float).reshape(-1)
+
+    results, offset = [], 0
+    for item in prepared:
+        if isinstance(item, Exception):
+            results.append(item)
+            continue
+        arrays, scalar = item
+        size = arrays[names[0]].size
+        results.append(format_values(kernel.__name__, arrays, values[offset:offset + size], scalar))
+        offset += size
+    return results